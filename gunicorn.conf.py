@@ -0,0 +1,64 @@
+"""
+Configuración de gunicorn para servir la aplicación en producción:
+
+    gunicorn -c gunicorn.conf.py
+
+Por defecto sirve la aplicación ASGI (`tierramedia/asgi.py`) con workers de uvicorn, necesaria
+para las vistas asíncronas de la arena (SSE). Con SERVER_MODE=wsgi sirve `tierramedia/wsgi.py`
+con workers de hilos.
+
+El número de procesos sale del número de núcleos y se puede cambiar con WEB_CONCURRENCY.
+Para recargar el código sin cortar las peticiones en curso: `kill -HUP <pid del proceso maestro>`
+(en docker: `docker compose exec web kill -HUP 1`); los workers viejos terminan sus peticiones
+antes de salir (hasta `graceful_timeout` segundos).
+
+Los ficheros estáticos y de medios no pasan por aquí: los sirve nginx (ver deploy/nginx.conf).
+"""
+import glob
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'asgi')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if SERVER_MODE == 'wsgi':
+    wsgi_app = 'tierramedia.wsgi:application'
+    worker_class = 'gthread'
+    # Los workers síncronos esperan a la base de datos: más procesos que núcleos y varios hilos por proceso
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+else:
+    wsgi_app = 'tierramedia.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Cada worker de uvicorn atiende muchas peticiones a la vez con su bucle de eventos: uno por núcleo
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Tiempo que tienen los workers para terminar sus peticiones al recargar o parar
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+
+# Reiniciar cada worker tras un número de peticiones (con algo de azar para que no lo hagan todos a la vez)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Cada worker carga la aplicación: así `kill -HUP` recarga también el código
+preload_app = False
+
+
+
+def on_starting(server):
+    """
+    Vacía el directorio de métricas de los workers (METRICS_DIR, ver juego/metrics.py): los
+    ficheros de los procesos anteriores se siguen sumando mientras dure este arranque, no más.
+    """
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+            os.remove(path)
+
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -20,6 +20,9 @@ admin.site.register(Armor)   # Registro del modelo Armor
 admin.site.register(Character)  # Registro del modelo Character
 admin.site.register(Inventory)  # Registro del modelo Inventory
 admin.site.register(Relationship)  # Registro del modelo Relationship
+admin.site.register(Tournament)  # Registro del modelo Tournament
+admin.site.register(TournamentMatch)  # Registro del modelo TournamentMatch
+admin.site.register(BattleLog)  # Registro del modelo BattleLog
 
 
 
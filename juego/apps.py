@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class JuegoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'juego'
+
+    def ready(self):
+        # Registrar los receptores de señales de la aplicación
+        from juego import signals  # noqa: F401
@@ -0,0 +1,361 @@
+"""
+Motor de batalla independiente de las vistas.
+
+Contiene las reglas de combate que antes vivían dentro de `AttackView.post`:
+estadísticas de combate de un personaje, tirada de precisión y crítico,
+cálculo del daño y resolución de turnos. No depende de la petición HTTP ni
+realiza consultas por turno, por lo que se puede reutilizar desde las vistas,
+desde comandos de gestión o para simular miles de combates en memoria.
+"""
+import random
+import struct
+from typing import NamedTuple
+
+from juego.cache_versions import bump_cache_versions, cache_versions
+
+# Puntos de vida con los que empieza cada personaje
+MAX_HP = 1000
+
+# Multiplicador del ataque fuerte
+STRONG_MULTIPLIER = 1.5
+
+# Valores por defecto si el arma o la armadura no tienen la estadística
+DEFAULT_ACCURACY = 50
+DEFAULT_CRITIC = 10
+DEFAULT_DEFENSE = 0
+
+# Tipos de ataque aceptados
+ATTACK_TYPES = ('fuerte', 'debil')
+
+# Límite de turnos de una simulación (evita bucles infinitos si nadie puede hacer daño)
+MAX_TURNS = 10000
+
+# Formato de un turno empaquetado: banderas (1 byte) y daño en medios puntos (4 bytes)
+TURN_STRUCT = struct.Struct('<BI')
+
+# Clave de la caché con la versión del equipamiento de un personaje, arma o armadura
+EQUIPMENT_VERSION_KEY = 'juego:equipment_version:{}:{}'
+
+
+class CombatStats(NamedTuple):
+    """
+    Estadísticas de combate de un personaje.
+    Es una instantánea inmutable del arma y la armadura equipadas.
+    """
+    id: int
+    name: str
+    damage: int
+    critic: int
+    accuracy: int
+    defense: int
+    weapon_id: int = None
+    armor_id: int = None
+
+    @classmethod
+    def from_character(cls, character):
+        """
+        Construye las estadísticas a partir de un `Character` con el arma y la armadura
+        ya cargadas (por ejemplo con `select_related('equipped_weapon', 'equipped_armor')`).
+        """
+        weapon = character.equipped_weapon
+        armor = character.equipped_armor
+        return cls(
+            id=character.id,
+            name=character.name,
+            damage=weapon.damage if weapon else 0,
+            critic=weapon.critic if weapon and weapon.critic else DEFAULT_CRITIC,
+            accuracy=weapon.accuracy if weapon and weapon.accuracy else DEFAULT_ACCURACY,
+            defense=armor.defense if armor and armor.defense else DEFAULT_DEFENSE,
+            weapon_id=weapon.id if weapon else None,
+            armor_id=armor.id if armor else None,
+        )
+
+    def version_keys(self):
+        """
+        Claves de la caché cuyas versiones invalidan esta instantánea si cambian.
+        """
+        return (
+            EQUIPMENT_VERSION_KEY.format('character', self.id),
+            EQUIPMENT_VERSION_KEY.format('weapon', self.weapon_id),
+            EQUIPMENT_VERSION_KEY.format('armor', self.armor_id),
+        )
+
+
+class TurnResult(NamedTuple):
+    """
+    Resultado de un turno: si el ataque acierta, si es crítico y el daño final.
+    """
+    hit: bool
+    critic: bool
+    damage: float
+
+
+class LoggedTurn(NamedTuple):
+    """
+    Turno guardado en el registro de una batalla. `attacker` es 0 o 1 según ataque el primer
+    o el segundo personaje.
+    """
+    attacker: int
+    ataque: str
+    hit: bool
+    critic: bool
+    damage: float
+
+
+class BattleSummary(NamedTuple):
+    """
+    Resumen de una serie de combates simulados entre dos personajes.
+    """
+    battles: int
+    wins_a: int
+    wins_b: int
+    draws: int
+    average_turns: float
+
+    @property
+    def win_rate_a(self):
+        return self.wins_a / self.battles if self.battles else 0.0
+
+    @property
+    def win_rate_b(self):
+        return self.wins_b / self.battles if self.battles else 0.0
+
+
+def equipment_version(*stats):
+    """
+    Devuelve la versión actual del equipamiento de los personajes indicados.
+
+    Cada personaje, arma y armadura tiene en la caché un identificador aleatorio que se
+    renueva cuando se guarda o se borra (ver `juego.signals`). Si una clave no existe (nunca
+    se ha creado o la caché la ha expulsado) se crea una nueva: en el peor caso la batalla
+    se invalida sin necesidad, pero nunca se sigue con estadísticas desactualizadas.
+    """
+    keys = [key for s in stats for key in s.version_keys()]
+    versions = cache_versions(keys)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_equipment_version(kind, pk):
+    """
+    Renueva la versión de un personaje, arma o armadura (`kind` es 'character', 'weapon' o 'armor').
+    """
+    bump_cache_versions([EQUIPMENT_VERSION_KEY.format(kind, pk)])
+
+
+def bump_equipment_versions(kind, pks):
+    """
+    Renueva de una vez las versiones de varios objetos, por ejemplo tras un `bulk_update`
+    (que no envía las señales `post_save`).
+    """
+    bump_cache_versions([EQUIPMENT_VERSION_KEY.format(kind, pk) for pk in pks])
+
+
+def resolve_turn(attacker, defender, ataque, rng=random):
+    """
+    Resuelve un ataque de `attacker` sobre `defender` con el tipo de ataque indicado.
+    Lanza `ValueError` si el tipo de ataque no es válido.
+    """
+    # Determinar el daño según el tipo de ataque
+    if ataque == 'fuerte':
+        damage = attacker.damage * STRONG_MULTIPLIER
+    elif ataque == 'debil':
+        damage = attacker.damage
+    else:
+        raise ValueError('Tipo de ataque inválido')
+
+    # Primero la tirada de precisión y después la de crítico
+    hit = rng.randint(0, 100) <= attacker.accuracy
+    critic = rng.randint(0, 100) <= attacker.critic
+    damage = damage * 2 if critic else damage
+    damage = damage - defender.defense if damage > defender.defense else 0
+    damage = damage if hit else 0
+    return TurnResult(hit=hit, critic=critic, damage=damage)
+
+
+def pack_turn(attacker_index, ataque, result):
+    """
+    Empaqueta un turno en 5 bytes: un byte de banderas (atacante, tipo de ataque, acierto y
+    crítico) y el daño en medios puntos como entero sin signo (el daño siempre es múltiplo de 0,5).
+    """
+    flags = (
+        attacker_index
+        | (ataque == 'fuerte') << 1
+        | result.hit << 2
+        | result.critic << 3
+    )
+    return TURN_STRUCT.pack(flags, int(result.damage * 2))
+
+
+def unpack_turns(data):
+    """
+    Desempaqueta un registro de turnos creado con `pack_turn`.
+    Devuelve una lista de `LoggedTurn`.
+    """
+    return [
+        LoggedTurn(
+            attacker=flags & 1,
+            ataque='fuerte' if flags & 2 else 'debil',
+            hit=bool(flags & 4),
+            critic=bool(flags & 8),
+            damage=half_points / 2,
+        )
+        for flags, half_points in TURN_STRUCT.iter_unpack(bytes(data))
+    ]
+
+
+def turn_phrase(attacker, result):
+    """
+    Devuelve la frase que se muestra al jugador para el resultado de un turno.
+    """
+    if not result.hit:
+        return f"{attacker.name} lanza un ataque y falla!!"
+    if result.critic:
+        return f"{attacker.name} lanza un ataque crítico y realiza {result.damage} de daño!!"
+    return f"{attacker.name} lanza un ataque y realiza {result.damage} de daño!!"
+
+
+def winner_phrase(winner):
+    """
+    Devuelve la frase que anuncia al ganador de la batalla.
+    """
+    return f'{winner.name} gana la batalla!! 🏆'
+
+
+class BattleError(Exception):
+    """
+    Error al jugar un turno. `status` es el código HTTP con el que se debe responder.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def start_battle(stats1, stats2, seed=None, **extra):
+    """
+    Crea el estado inicial de una batalla entre dos instantáneas de estadísticas.
+    Empieza atacando el primer personaje. `extra` se añade tal cual al estado.
+
+    Cada batalla tiene su propio generador aleatorio creado a partir de `seed` (aleatoria si no
+    se indica), así que conociendo la semilla y los ataques elegidos se puede repetir entera.
+    Los turnos jugados se acumulan empaquetados en `state['log']` (ver `juego.battle_log`).
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 63)
+    return {
+        'char1': stats1.id,
+        'char2': stats2.id,
+        'char1_hp': MAX_HP,
+        'char2_hp': MAX_HP,
+        'turn_player': stats1.id,
+        'frase': "Que comience la batalla!",
+        'winner': None,
+        'seq': 0,
+        'stats': (stats1, stats2),
+        'version': equipment_version(stats1, stats2),
+        'seed': seed,
+        'rng': random.Random(seed),
+        'log': bytearray(),
+        **extra,
+    }
+
+
+def play_turn(state, attacker_id, ataque, rng=None):
+    """
+    Juega un turno sobre el estado de una batalla y lo actualiza.
+    Por defecto usa el generador aleatorio de la batalla, de modo que se pueda repetir desde la semilla.
+
+    Lanza `BattleError` si el atacante o el tipo de ataque no son válidos, si no es su turno
+    o (con `status=409`) si el equipo de algún personaje ha cambiado desde que empezó la batalla.
+    Si la batalla termina, `state['winner']` pasa a tener el id del ganador y `turn_player` None.
+    """
+    char1_id, char2_id = state['char1'], state['char2']
+
+    # Determinar quién es el atacante y quién el defensor
+    if attacker_id == char1_id:
+        defender_key, attacker_index = 'char2_hp', 0
+    elif attacker_id == char2_id:
+        defender_key, attacker_index = 'char1_hp', 1
+    else:
+        raise BattleError('Atacante no válido')
+
+    # Verificar que sea el turno correcto
+    if state['turn_player'] != attacker_id:
+        raise BattleError('No es tu turno')
+
+    if ataque not in ATTACK_TYPES:
+        raise BattleError('Tipo de ataque inválido')
+
+    # Usar la instantánea de estadísticas tomada al empezar la batalla, salvo que el
+    # equipo de alguno de los personajes haya cambiado desde entonces
+    stats = state['stats']
+    if equipment_version(*stats) != state['version']:
+        raise BattleError('El equipamiento ha cambiado, la batalla se ha cancelado', status=409)
+    attacker, defender = stats if attacker_index == 0 else stats[::-1]
+
+    # Resolver el turno y aplicar el daño al defensor
+    result = resolve_turn(attacker, defender, ataque, rng or state['rng'])
+    state[defender_key] -= result.damage
+    state['frase'] = turn_phrase(attacker, result)
+    state['seq'] += 1
+    state['log'] += pack_turn(attacker_index, ataque, result)
+
+    # Verificar si la batalla terminó
+    if state[defender_key] <= 0:
+        state[defender_key] = 0
+        state['winner'] = attacker.id
+        state['turn_player'] = None
+    else:
+        state['turn_player'] = defender.id
+    return result
+
+
+def simulate_battle(stats_a, stats_b, rng=random, ataque='fuerte', max_turns=MAX_TURNS):
+    """
+    Simula un combate completo en memoria. Empieza atacando `stats_a` y los turnos se alternan.
+    Devuelve una tupla (ganador, turnos) donde ganador es 0, 1 o None si se alcanza `max_turns`.
+    """
+    hp = [MAX_HP, MAX_HP]
+    fighters = (stats_a, stats_b)
+    attacker = 0
+    for turn in range(1, max_turns + 1):
+        defender = 1 - attacker
+        result = resolve_turn(fighters[attacker], fighters[defender], ataque, rng)
+        hp[defender] -= result.damage
+        if hp[defender] <= 0:
+            return attacker, turn
+        attacker = defender
+    return None, max_turns
+
+
+def simulate_battles(char_a, char_b, n, seed=None, ataque='fuerte', max_turns=MAX_TURNS):
+    """
+    Simula `n` combates entre dos personajes sin tocar la base de datos por turno.
+
+    `char_a` y `char_b` pueden ser instancias de `Character` (con el equipo cargado) o
+    `CombatStats`. Con `seed` los resultados son reproducibles. En cada combate empieza
+    `char_a`, igual que en la vista de batalla empieza el primer personaje elegido.
+    """
+    stats_a = char_a if isinstance(char_a, CombatStats) else CombatStats.from_character(char_a)
+    stats_b = char_b if isinstance(char_b, CombatStats) else CombatStats.from_character(char_b)
+    rng = random.Random(seed)
+
+    wins = [0, 0]
+    draws = 0
+    total_turns = 0
+    for _ in range(n):
+        winner, turns = simulate_battle(stats_a, stats_b, rng, ataque, max_turns)
+        total_turns += turns
+        if winner is None:
+            draws += 1
+        else:
+            wins[winner] += 1
+
+    return BattleSummary(
+        battles=n,
+        wins_a=wins[0],
+        wins_b=wins[1],
+        draws=draws,
+        average_turns=total_turns / n if n else 0.0,
+    )
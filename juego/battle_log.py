@@ -0,0 +1,66 @@
+"""
+Registro de las batallas terminadas.
+
+Durante la batalla los turnos se acumulan empaquetados en el estado (`state['log']`, 5 bytes
+por turno) sin tocar la base de datos. Al terminar se guarda un único `BattleLog` con la semilla,
+la instantánea de estadísticas y el array de turnos, en una sola inserción. Con la semilla y los
+ataques elegidos la batalla se puede volver a reproducir turno a turno.
+"""
+import random
+
+from juego.battle import MAX_HP, CombatStats, resolve_turn, turn_phrase, unpack_turns
+from juego.models import BattleLog
+
+
+def battle_log_from_state(state):
+    """
+    Construye (sin guardar) el `BattleLog` de una batalla a partir de su estado.
+    """
+    stats1, stats2 = state['stats']
+    return BattleLog(
+        character1_id=stats1.id,
+        character2_id=stats2.id,
+        winner_id=state['winner'],
+        owner_id=state.get('owner'),
+        seed=state['seed'],
+        stats=[stats1._asdict(), stats2._asdict()],
+        turns=bytes(state['log']),
+        turn_count=state['seq'],
+    )
+
+
+def save_battle_logs(states):
+    """
+    Guarda el registro de varias batallas terminadas con una sola consulta `bulk_create`.
+    """
+    return BattleLog.objects.bulk_create([battle_log_from_state(state) for state in states])
+
+
+def replay_battle(log):
+    """
+    Vuelve a jugar una batalla registrada a partir de su semilla y de los ataques elegidos.
+    Devuelve una lista con los turnos (atacante, tipo de ataque, acierto, crítico, daño, frase
+    y puntos de vida restantes). Lanza `ValueError` si el resultado no coincide con el registro.
+    """
+    stats = [CombatStats(**s) for s in log.stats]
+    rng = random.Random(log.seed)
+    hp = [MAX_HP, MAX_HP]
+    replay = []
+    for number, turn in enumerate(unpack_turns(log.turns), start=1):
+        attacker, defender = turn.attacker, 1 - turn.attacker
+        result = resolve_turn(stats[attacker], stats[defender], turn.ataque, rng)
+        if (result.hit, result.critic, result.damage) != (turn.hit, turn.critic, turn.damage):
+            raise ValueError(f'El turno {number} no coincide con la semilla de la batalla')
+        hp[defender] = max(hp[defender] - result.damage, 0)
+        replay.append({
+            'turn': number,
+            'attacker': stats[attacker].id,
+            'ataque': turn.ataque,
+            'hit': turn.hit,
+            'critic': turn.critic,
+            'damage': turn.damage,
+            'frase': turn_phrase(stats[attacker], result),
+            'char1_hp': hp[0],
+            'char2_hp': hp[1],
+        })
+    return replay
@@ -0,0 +1,181 @@
+"""
+Matriz de probabilidades de victoria entre todos los personajes que pueden combatir.
+
+Aplica las mismas reglas que `juego.battle` (ataque fuerte x1.5, crítico x2, resta de
+defensa, tirada de precisión y 1000 HP) pero con arrays de NumPy: en cada turno se tiran
+los dados de todas las parejas y de todos los intentos a la vez, en lugar de simular cada
+combate con un bucle de Python.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from juego.battle import MAX_HP, MAX_TURNS, STRONG_MULTIPLIER, CombatStats
+from juego.forms import CharacterBattleForm
+
+# Clave y tiempo de vida (en segundos) de la matriz en la caché
+BATTLE_MATRIX_CACHE_KEY = 'juego:battle_matrix'
+BATTLE_MATRIX_CACHE_TIMEOUT = 60 * 60
+
+# Número de combates simulados por pareja si no se indica otro
+DEFAULT_TRIALS = 200
+
+# Número máximo de combates (parejas x intentos) que se simulan a la vez para limitar la memoria
+BATCH_SIZE = 250_000
+
+# Ataques por lado que se tiran de golpe para cada combate todavía sin decidir
+TURN_CHUNK = 8
+
+
+def eligible_characters():
+    """
+    Devuelve los personajes que pueden combatir: los mismos que ofrece `CharacterBattleForm`
+    (con arma y armadura equipadas).
+    """
+    return CharacterBattleForm.base_fields['character'].queryset.all().order_by('id')
+
+
+def _roll_chance(values):
+    """
+    Probabilidad de que `random.randint(0, 100) <= valor` para cada valor del array.
+    """
+    return (np.clip(values, -1, 100) + 1).astype(np.float32) / 101
+
+
+def _simulate_pairs(rng, first, second, damage, critic, accuracy, defense, trials, max_turns):
+    """
+    Simula `trials` combates para cada pareja (first[k], second[k]) empezando `first[k]`.
+    Devuelve el número de victorias de `first` para cada pareja.
+
+    Los ataques de cada lado son independientes entre sí, así que se tiran de golpe bloques de
+    `TURN_CHUNK` ataques por combate y con la suma acumulada se obtiene en qué ataque muere
+    cada personaje. Gana `first` si necesita los mismos ataques o menos, porque ataca antes.
+    """
+    a = np.repeat(first, trials)
+    b = np.repeat(second, trials)
+
+    # Daño de un golpe normal y de un golpe crítico de cada lado, ya restada la defensa rival,
+    # y probabilidad de acierto y de crítico (la tirada `randint(0, 100) <= valor` del motor)
+    sides = []
+    for attacker, defender in ((a, b), (b, a)):
+        normal = np.maximum(damage[attacker] - defense[defender], 0)
+        crit = np.maximum(damage[attacker] * 2 - defense[defender], 0)
+        sides.append((normal, crit, _roll_chance(critic[attacker]), _roll_chance(accuracy[attacker])))
+
+    wins = np.zeros(a.size, dtype=bool)
+    dealt = np.zeros((2, a.size))
+    pending = np.arange(a.size)
+    attacks, max_attacks = 0, max_turns // 2
+
+    while pending.size and attacks < max_attacks:
+        k = min(TURN_CHUNK, max_attacks - attacks)
+        kill_at = []
+        for side, (normal, crit, crit_chance, hit_chance) in enumerate(sides):
+            # Tirada de precisión y de crítico igual que en el motor de batalla
+            rolls = rng.random((2, pending.size, k), dtype=np.float32)
+            hit = rolls[0] < hit_chance[pending, None]
+            is_crit = rolls[1] < crit_chance[pending, None]
+            dmg = np.where(is_crit, crit[pending, None], normal[pending, None]) * hit
+
+            total = dealt[side, pending, None] + np.cumsum(dmg, axis=1)
+            dead = total >= MAX_HP
+            kill_at.append(np.where(dead.any(axis=1), dead.argmax(axis=1), k))
+            dealt[side, pending] = total[:, -1]
+
+        decided = (kill_at[0] < k) | (kill_at[1] < k)
+        wins[pending[decided & (kill_at[0] <= kill_at[1])]] = True
+        pending = pending[~decided]
+        attacks += k
+
+    return wins.reshape(len(first), trials).sum(axis=1)
+
+
+def win_probability_matrix(stats, trials=DEFAULT_TRIALS, seed=None, ataque='fuerte', max_turns=MAX_TURNS, batch_size=BATCH_SIZE):
+    """
+    Calcula la matriz N x N de probabilidades de victoria.
+    `matrix[i, j]` es la probabilidad de que `stats[i]` gane a `stats[j]` empezando él.
+    La diagonal queda a NaN porque un personaje no puede pelear contra sí mismo.
+
+    El resultado de un combate solo depende del arma y la armadura, así que se simula una vez
+    cada pareja de equipamientos distintos y después se reparte el resultado entre los personajes.
+    """
+    n = len(stats)
+    matrix = np.full((n, n), np.nan)
+    if n < 2:
+        return matrix
+
+    loadouts, inverse = np.unique(
+        np.array([(s.damage, s.critic, s.accuracy, s.defense) for s in stats], dtype=np.float64),
+        axis=0, return_inverse=True,
+    )
+    inverse = inverse.reshape(-1)
+
+    multiplier = STRONG_MULTIPLIER if ataque == 'fuerte' else 1
+    damage = loadouts[:, 0] * multiplier
+    critic = loadouts[:, 1]
+    accuracy = loadouts[:, 2]
+    defense = loadouts[:, 3]
+
+    m = len(loadouts)
+    first, second = np.divmod(np.arange(m * m), m)
+    results = np.zeros((m, m))
+
+    # Si ninguno de los dos puede hacer daño (ni siquiera con crítico) el combate es un empate seguro
+    can_hurt = damage[:, None] * 2 > defense[None, :]
+    playable = can_hurt[first, second] | can_hurt[second, first]
+    first, second = first[playable], second[playable]
+
+    rng = np.random.default_rng(seed)
+    step = max(1, batch_size // trials)
+    for start in range(0, len(first), step):
+        a = first[start:start + step]
+        b = second[start:start + step]
+        wins = _simulate_pairs(rng, a, b, damage, critic, accuracy, defense, trials, max_turns)
+        results[a, b] = wins / trials
+
+    matrix = results[np.ix_(inverse, inverse)]
+    np.fill_diagonal(matrix, np.nan)
+    return matrix
+
+
+def build_battle_matrix(trials=DEFAULT_TRIALS, seed=None):
+    """
+    Calcula la matriz para todos los personajes que pueden combatir y la devuelve junto a
+    una clasificación ordenada por probabilidad media de victoria, lista para serializar a JSON.
+    """
+    characters = list(eligible_characters())
+    stats = [CombatStats.from_character(character) for character in characters]
+    matrix = win_probability_matrix(stats, trials=trials, seed=seed)
+
+    with np.errstate(invalid='ignore'):
+        average = np.nanmean(matrix, axis=1) if len(stats) > 1 else np.zeros(len(stats))
+
+    leaderboard = sorted(
+        ({'id': s.id, 'name': s.name, 'win_rate': round(float(rate), 4)} for s, rate in zip(stats, average)),
+        key=lambda row: row['win_rate'],
+        reverse=True,
+    )
+    return {
+        'trials': trials,
+        'characters': [{'id': s.id, 'name': s.name} for s in stats],
+        'matrix': [[None if np.isnan(p) else round(float(p), 4) for p in row] for row in matrix],
+        'leaderboard': leaderboard,
+    }
+
+
+def refresh_battle_matrix(trials=DEFAULT_TRIALS, seed=None):
+    """
+    Recalcula la matriz y la guarda en la caché.
+    """
+    data = build_battle_matrix(trials=trials, seed=seed)
+    cache.set(BATTLE_MATRIX_CACHE_KEY, data, BATTLE_MATRIX_CACHE_TIMEOUT)
+    return data
+
+
+def get_battle_matrix():
+    """
+    Devuelve la matriz guardada en la caché, calculándola si todavía no existe.
+    """
+    data = cache.get(BATTLE_MATRIX_CACHE_KEY)
+    if data is None:
+        data = refresh_battle_matrix()
+    return data
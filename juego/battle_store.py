@@ -0,0 +1,426 @@
+"""
+Almacén del estado de las batallas en curso.
+
+Sustituye a `request.session['battle']`: el estado de cada batalla (HP, turno, última
+frase...) se guarda bajo un identificador aleatorio en un almacén dedicado, de forma que
+un ataque no tiene que leer ni reescribir la fila de `django_session`.
+
+El backend se elige con el ajuste `BATTLE_STORE`:
+
+    BATTLE_STORE = {
+        'BACKEND': 'juego.battle_store.LocMemBattleStore',
+        'OPTIONS': {'timeout': 1800, 'max_entries': 10000},
+    }
+
+- `LocMemBattleStore`: caché LRU en memoria del proceso (por defecto).
+- `FileBattleStore`: un fichero por batalla en un directorio compartido entre procesos
+  (por defecto en `/dev/shm`, es decir, en memoria compartida si el sistema lo permite),
+  con la misma caché LRU delante para no leer el fichero si no ha cambiado.
+
+Las batallas abandonadas caducan pasados `timeout` segundos desde la última escritura.
+
+Las batallas de cada usuario se apuntan en un índice (`add_user_battle`). Los índices se guardan
+aparte (`get_index`/`set_index`), fuera del LRU: llenar el almacén de batallas no los expulsa. Se
+modifican con el índice bloqueado, como los turnos, para que dos batallas creadas a la vez por el
+mismo usuario no se pierdan.
+
+`store.lock(battle_id)` bloquea una batalla mientras se juega un turno (leer, jugar y guardar), y
+`battle_notifier` avisa a los canales SSE del proceso cuando una batalla cambia, para que no
+tengan que consultar el almacén continuamente. Las vistas asíncronas acceden al almacén con
+`aget_battle` y `sync_to_async`: la lectura de ficheros no debe bloquear el bucle de eventos.
+"""
+import asyncio
+import os
+import pickle
+import re
+import secrets
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se bloquea dentro del proceso
+    fcntl = None
+
+# Tiempo (en segundos) que se conserva una batalla sin actividad
+DEFAULT_TIMEOUT = 30 * 60
+
+# Número máximo de batallas que se guardan en memoria
+DEFAULT_MAX_ENTRIES = 10000
+
+# Identificadores de batalla válidos (los de `secrets.token_urlsafe`)
+BATTLE_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+DEFAULT_BATTLE_STORE = {
+    'BACKEND': 'juego.battle_store.LocMemBattleStore',
+    'OPTIONS': {},
+}
+
+
+class BattleNotifier:
+    """
+    Avisa a los canales SSE del proceso de que una batalla ha cambiado. Cada canal se suscribe
+    con un `asyncio.Event` de su bucle de eventos; `notify` puede llamarse desde cualquier hilo.
+    """
+
+    def __init__(self):
+        self._waiters = defaultdict(set)  # battle_id -> {(bucle, evento)}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, battle_id):
+        """Evento que se activa cada vez que cambia la batalla mientras dura el bloque `with`"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters[battle_id].add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(battle_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[battle_id]
+
+    def notify(self, battle_id):
+        with self._lock:
+            waiters = list(self._waiters.get(battle_id, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # El bucle ya se ha cerrado
+                pass
+
+
+battle_notifier = BattleNotifier()
+
+
+class LocMemBattleStore:
+    """
+    Almacén en memoria del proceso con expulsión LRU y caducidad por tiempo.
+    Los estados se guardan tal cual, sin serializar.
+    """
+
+    # Si otros procesos pueden cambiar las batallas (entonces `battle_notifier` no se entera)
+    shared = False
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_entries=DEFAULT_MAX_ENTRIES):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # battle_id -> (caduca_en, estado)
+        self._indexes = {}  # clave -> (caduca_en, lista)
+        self._lock = threading.Lock()
+        self._battle_locks = weakref.WeakValueDictionary()  # battle_id -> Lock mientras alguien lo usa
+
+    def new_id(self):
+        """Genera un identificador de batalla difícil de adivinar"""
+        return secrets.token_urlsafe(12)
+
+    def get(self, battle_id):
+        """Devuelve el estado de la batalla o None si no existe o ha caducado"""
+        with self._lock:
+            entry = self._entries.get(battle_id)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires <= time.monotonic():
+                del self._entries[battle_id]
+                return None
+            self._entries.move_to_end(battle_id)
+            return state
+
+    def set(self, battle_id, state):
+        """Guarda el estado de la batalla y renueva su caducidad"""
+        self._put(battle_id, state)
+        battle_notifier.notify(battle_id)
+
+    def delete(self, battle_id):
+        """Elimina la batalla del almacén"""
+        self._forget(battle_id)
+        battle_notifier.notify(battle_id)
+
+    @contextmanager
+    def lock(self, battle_id):
+        """Bloquea la batalla (en este proceso) durante el bloque `with`"""
+        with self._lock:
+            lock = self._battle_locks.get(battle_id)
+            if lock is None:
+                lock = self._battle_locks[battle_id] = threading.Lock()
+        with lock:
+            yield
+
+    def get_index(self, key):
+        """Lista guardada en el índice `key` ([] si no existe o ha caducado)"""
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._indexes.pop(key, None)
+                return []
+            return list(entry[1])
+
+    def set_index(self, key, values):
+        """
+        Guarda un índice. Caduca como las batallas, `timeout` segundos después de la última
+        escritura: para entonces ya han caducado todas las batallas que apunta.
+        """
+        with self._lock:
+            if values:
+                self._indexes[key] = (time.monotonic() + self.timeout, list(values))
+            else:
+                self._indexes.pop(key, None)
+            if len(self._indexes) > self.max_entries:
+                now = time.monotonic()
+                for expired in [k for k, (expires, _) in self._indexes.items() if expires <= now]:
+                    del self._indexes[expired]
+
+    def _put(self, battle_id, value):
+        with self._lock:
+            self._entries[battle_id] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(battle_id)
+            self._cull()
+
+    def _forget(self, battle_id):
+        with self._lock:
+            self._entries.pop(battle_id, None)
+
+    def clear(self):
+        """Elimina todas las batallas y los índices"""
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def _cull(self):
+        """Expulsa las batallas caducadas más antiguas y las que superan `max_entries`"""
+        now = time.monotonic()
+        while self._entries:
+            battle_id, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[battle_id]
+
+
+class FileBattleStore(LocMemBattleStore):
+    """
+    Almacén con un fichero por batalla, compartido por todos los procesos que usen el mismo
+    directorio. Mantiene una caché LRU local y solo vuelve a leer el fichero si ha cambiado.
+    Las batallas se bloquean también entre procesos, con `flock` sobre `<batalla>.lock`.
+    """
+
+    shared = True
+
+    # Cada cuántas escrituras se buscan ficheros caducados en el directorio
+    CULL_EVERY = 100
+
+    def __init__(self, location=None, timeout=DEFAULT_TIMEOUT, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(timeout=timeout, max_entries=max_entries)
+        if location is None:
+            base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            location = os.path.join(base, 'tierramedia-battles')
+        self.location = location
+        os.makedirs(self.location, exist_ok=True)
+        self._writes = 0
+
+    def _path(self, battle_id):
+        return os.path.join(self.location, f'{battle_id}.battle')
+
+    def _index_path(self, key):
+        return os.path.join(self.location, f'{key}.index')
+
+    def _write(self, path, value):
+        """Escribe en un fichero temporal y lo renombra para que nadie lea un estado a medias"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def get(self, battle_id):
+        path = self._path(battle_id)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except (FileNotFoundError, ValueError):
+            self._forget(battle_id)
+            return None
+        if mtime / 1e9 + self.timeout <= time.time():
+            self.delete(battle_id)
+            return None
+
+        # Si el fichero no ha cambiado desde la última lectura se usa la copia en memoria
+        cached = super().get(battle_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        self._put(battle_id, (mtime, state))
+        return state
+
+    def set(self, battle_id, state):
+        path = self._path(battle_id)
+        self._write(path, state)
+        self._put(battle_id, (os.stat(path).st_mtime_ns, state))
+        battle_notifier.notify(battle_id)
+
+        self._writes += 1
+        if self._writes % self.CULL_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, battle_id):
+        self._forget(battle_id)
+        try:
+            os.remove(self._path(battle_id))
+        except FileNotFoundError:
+            pass
+        battle_notifier.notify(battle_id)
+
+    def get_index(self, key):
+        path = self._index_path(key)
+        try:
+            if os.stat(path).st_mtime + self.timeout <= time.time():
+                return []
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return []
+
+    def set_index(self, key, values):
+        if values:
+            self._write(self._index_path(key), list(values))
+            return
+        try:
+            os.remove(self._index_path(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, battle_id):
+        with super().lock(battle_id):
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.location, f'{battle_id}.lock'), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def clear(self):
+        super().clear()
+        for name in os.listdir(self.location):
+            if name.endswith(('.battle', '.index')):
+                os.remove(os.path.join(self.location, name))
+
+    def purge_expired(self):
+        """Elimina del directorio los ficheros de batallas e índices caducados"""
+        limit = time.time() - self.timeout
+        with os.scandir(self.location) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(('.battle', '.index')) and entry.stat().st_mtime < limit:
+                        os.remove(entry.path)
+                    # Los bloqueos se quedan mientras exista su batalla o índice (alguien puede tenerlos)
+                    elif entry.name.endswith('.lock') and entry.stat().st_mtime < limit:
+                        base = entry.path[:-len('.lock')]
+                        if not os.path.exists(base + '.battle') and not os.path.exists(base + '.index'):
+                            os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+def _user_index_key(user_id):
+    # Con puntos, que nunca aparecen en los identificadores de las batallas: el índice (y su
+    # bloqueo) no puede confundirse con una batalla
+    return f'index.user.{user_id}'
+
+
+def is_battle_id(battle_id):
+    """Si `battle_id` tiene la forma de los identificadores de `new_id()` (sin puntos ni barras)"""
+    return isinstance(battle_id, str) and BATTLE_ID.fullmatch(battle_id) is not None
+
+
+def get_battle(store, battle_id):
+    """
+    Devuelve el estado de la batalla o None si no existe, ha caducado o la clave no es de una
+    batalla (por ejemplo la de un índice de usuario).
+    """
+    if not is_battle_id(battle_id):
+        return None
+    state = store.get(battle_id)
+    return state if isinstance(state, dict) and 'stats' in state else None
+
+
+@contextmanager
+def locked_battle(store, battle_id):
+    """
+    Bloquea la batalla durante el bloque `with` y devuelve su estado (como `get_battle`), para
+    leer, jugar un turno y guardarlo sin que otro ataque a la vez pierda el suyo.
+    """
+    if not is_battle_id(battle_id):
+        yield None
+        return
+    with store.lock(battle_id):
+        yield get_battle(store, battle_id)
+
+
+async def aget_battle(store, battle_id):
+    """`get_battle` para las vistas asíncronas, fuera del bucle de eventos"""
+    return await sync_to_async(get_battle)(store, battle_id)
+
+
+def add_user_battle(store, user_id, battle_id):
+    """
+    Añade la batalla al índice de batallas del usuario (un usuario puede tener varias a la vez),
+    con el índice bloqueado.
+    """
+    key = _user_index_key(user_id)
+    with store.lock(key):
+        battle_ids = [b for b in store.get_index(key) if b != battle_id]
+        store.set_index(key, battle_ids + [battle_id])
+
+
+def get_user_battles(store, user_id):
+    """
+    Devuelve una lista de tuplas (battle_id, estado) con las batallas del usuario que siguen en el almacén.
+    Las batallas que ya han caducado se quitan del índice.
+    """
+    key = _user_index_key(user_id)
+    battle_ids = store.get_index(key)
+    battles = [(battle_id, get_battle(store, battle_id)) for battle_id in battle_ids]
+    battles = [(battle_id, state) for battle_id, state in battles if state is not None]
+    if len(battles) != len(battle_ids):
+        expired = set(battle_ids) - {battle_id for battle_id, _ in battles}
+        with store.lock(key):
+            # Sin perder las que se hayan añadido mientras tanto
+            store.set_index(key, [b for b in store.get_index(key) if b not in expired])
+    return battles
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_battle_store():
+    """
+    Devuelve el almacén de batallas configurado en `settings.BATTLE_STORE`.
+    Se crea una única instancia por proceso.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, 'BATTLE_STORE', DEFAULT_BATTLE_STORE)
+                backend = import_string(config.get('BACKEND', DEFAULT_BATTLE_STORE['BACKEND']))
+                _store = backend(**config.get('OPTIONS', {}))
+    return _store
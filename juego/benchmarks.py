@@ -0,0 +1,377 @@
+"""
+Benchmarks de número de consultas, latencia y memoria de todas las rutas de `juego/urls.py`.
+
+Para cada tamaño de mundo se genera un mundo sintético (ver `juego.world_generator`) dentro de
+una transacción que se deshace al terminar, y se hace una petición a cada ruta con el cliente de
+pruebas de Django. De cada ruta se guarda el código de respuesta, el número de consultas SQL, la
+mediana del tiempo y el pico de memoria reservada.
+
+Los resultados son un JSON con las claves ordenadas, para poder compararlos con `diff` entre
+commits. Sobre ellos:
+
+- `query_growth` encuentra las rutas cuyo número de consultas crece con el tamaño del mundo
+  (un N+1).
+- `server_errors` encuentra las rutas que responden con un error 5xx (lo que se mide de ellas
+  es la página de error, no la vista).
+- `compare_with_baseline` encuentra las rutas que hacen más consultas o son más lentas que en
+  un resultado anterior guardado.
+
+Lo usa el comando `manage.py benchmark`. `isolated_database` y `synthetic_world` preparan la base
+de datos de pruebas, la caché y el mundo también para `juego.query_plans`.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, NamedTuple, Optional
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, reverse
+
+from juego import urls as juego_urls
+from juego.battle import MAX_TURNS, CombatStats, play_turn, start_battle
+from juego.battle_log import save_battle_logs
+from juego.models import Armor, Character, Faction, Relationship, Weapon
+from juego.world_generator import WorldGenerator
+
+# Número de personajes de cada mundo medido
+BENCHMARK_SIZES = (100, 1000)
+
+# Veces que se mide cada ruta (se guarda la mediana del tiempo)
+BENCHMARK_REPEAT = 3
+
+# Tolerancia al comparar con la referencia: más lento que la referencia por más de este factor
+# y de este número de milisegundos (para no avisar por el ruido de las rutas muy rápidas)
+LATENCY_TOLERANCE = 0.5
+LATENCY_MIN_MS = 5.0
+
+# Caché de los mundos sintéticos: en memoria y solo suya. Con la caché configurada (Redis o
+# ficheros compartidos) las facciones, armas y tarjetas del mundo, que se deshace al terminar,
+# quedarían en la caché de la aplicación
+SYNTHETIC_WORLD_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'juego-synthetic-world',
+    }
+}
+
+
+class BenchmarkRoute(NamedTuple):
+    """
+    Petición que se mide. `args` son los nombres de los objetos de ejemplo que van en la URL;
+    `data` es el cuerpo (o una función que lo construye a partir de los objetos de ejemplo).
+    `prepare` se llama antes de cada petición, fuera de la medida, con el cliente y los objetos
+    de ejemplo, y devuelve los argumentos de la URL y el cuerpo (por ejemplo para empezar una
+    batalla antes de atacar).
+    """
+    name: str
+    method: str = 'get'
+    args: tuple = ()
+    data: object = None
+    content_type: Optional[str] = None
+    prepare: Optional[Callable] = None
+
+    @property
+    def key(self):
+        return f'{self.method.upper()} {self.name}'
+
+
+def _start_battle(client, fixtures):
+    """Empieza una batalla con el formulario de batalla para medir el ataque"""
+    client.post(reverse('juego:battleView'), {
+        'character': fixtures['character'].id, 'character2': fixtures['character2'].id,
+    })
+    return (), {'attacker': fixtures['character'].id, 'ataque': 'debil'}
+
+
+def _start_arena_battle(client, fixtures):
+    """Empieza una batalla de la arena; devuelve su id como argumento de la URL"""
+    response = client.post(reverse('juego:arenaBattles'), json.dumps({
+        'char1': fixtures['character'].id, 'char2': fixtures['character2'].id,
+    }), content_type='application/json')
+    return (response.json()['id'],), {'attacker': fixtures['character'].id, 'ataque': 'debil'}
+
+
+def _detail_routes(basename, fixture):
+    """Lista y detalle de un ViewSet del router"""
+    return [BenchmarkRoute(f'{basename}-list'), BenchmarkRoute(f'{basename}-detail', args=(fixture,))]
+
+
+ROUTES = [
+    BenchmarkRoute('indexView'),
+    BenchmarkRoute('api-root'),
+    *_detail_routes('faction', 'faction'),
+    *_detail_routes('armor', 'armor'),
+    *_detail_routes('weapon', 'weapon'),
+    *_detail_routes('relationship', 'relationship'),
+    *_detail_routes('inventory', 'inventory'),
+    *_detail_routes('character_info', 'character'),
+    *_detail_routes('character_modify', 'character'),
+    BenchmarkRoute('armor-bulk', 'patch', data=lambda f: [{'id': f['armor'].id, 'defense': 12}], content_type='application/json'),
+    BenchmarkRoute('weapon-bulk', 'patch', data=lambda f: [{'id': f['weapon'].id, 'damage': 70}], content_type='application/json'),
+    BenchmarkRoute('character_modify-bulk', 'patch', data=lambda f: [{'id': f['character'].id, 'location': 'Bree'}],
+                   content_type='application/json'),
+    BenchmarkRoute('get_factions_member_count'),
+    BenchmarkRoute('get_battle_matrix'),
+    BenchmarkRoute('get_ally_components'),
+    BenchmarkRoute('get_ally_path', args=('character', 'character2')),
+    BenchmarkRoute('get_friends_of_friends', args=('character',)),
+    BenchmarkRoute('get_enemies_of_enemies', args=('character',)),
+    BenchmarkRoute('export_characters'),
+    BenchmarkRoute('search', data={'q': 'Frodo'}),
+    BenchmarkRoute('search_autocomplete', data={'q': 'Fro'}),
+    BenchmarkRoute('get_battle_replay', args=('battle_log',)),
+    BenchmarkRoute('metrics'),
+    BenchmarkRoute('characterView'),
+    BenchmarkRoute('characterCardsView'),
+    BenchmarkRoute('characterDetailView', args=('character',)),
+    BenchmarkRoute('characterUpdateView', args=('character',)),
+    BenchmarkRoute('characterDeleteView', args=('character',)),
+    BenchmarkRoute('characterCreateView'),
+    BenchmarkRoute('equipmentView'),
+    BenchmarkRoute('factionView'),
+    BenchmarkRoute('factionCharacterFormView'),
+    BenchmarkRoute('factionCharacterFormView', 'post', data=lambda f: {'faction': f['faction'].id}),
+    BenchmarkRoute('factionCreateView'),
+    BenchmarkRoute('factionDeleteView', args=('faction',)),
+    BenchmarkRoute('factionDetailView', args=('faction',)),
+    BenchmarkRoute('factionUpdateView', args=('faction',)),
+    BenchmarkRoute('relationshipListView'),
+    BenchmarkRoute('relationshipDeleteView', args=('relationship',)),
+    BenchmarkRoute('battleView'),
+    BenchmarkRoute('battleView', 'post', data=lambda f: {'character': f['character'].id, 'character2': f['character2'].id}),
+    BenchmarkRoute('attackView', 'post', content_type='application/json', prepare=_start_battle),
+    BenchmarkRoute('arenaBattles'),
+    BenchmarkRoute('arenaBattles', 'post', data=lambda f: {'char1': f['character'].id, 'char2': f['character2'].id},
+                   content_type='application/json'),
+    BenchmarkRoute('arenaBattleDetail', prepare=_start_arena_battle),
+    BenchmarkRoute('arenaAttack', 'post', content_type='application/json', prepare=_start_arena_battle),
+    BenchmarkRoute('weaponListView'),
+    BenchmarkRoute('weaponDetailView', args=('weapon',)),
+    BenchmarkRoute('weaponUpdateView', args=('weapon',)),
+    BenchmarkRoute('weaponDeleteView', args=('weapon',)),
+    BenchmarkRoute('weaponCreateView'),
+    BenchmarkRoute('equipmentCharacterFormView'),
+    BenchmarkRoute('equipmentCharacterFormView', 'post', data=lambda f: {'weapon': f['weapon'].id}),
+    BenchmarkRoute('armorListView'),
+    BenchmarkRoute('armorDetailView', args=('armor',)),
+    BenchmarkRoute('armorUpdateView', args=('armor',)),
+    BenchmarkRoute('armorDeleteView', args=('armor',)),
+    BenchmarkRoute('armorCreateView'),
+    BenchmarkRoute('inventory_add_items', args=('character',)),
+    BenchmarkRoute('equip_weapon', args=('character',)),
+    BenchmarkRoute('equip_armor', args=('character',)),
+    BenchmarkRoute('register'),
+]
+
+# Rutas con nombre que no se miden y por qué
+SKIPPED_ROUTES = {
+    'arenaBattleStream': 'Canal SSE que no termina mientras dura la batalla; su estado se mide con arenaBattleDetail',
+    'relationCreateView': 'Vista sin terminar (sin campos ni plantilla): responde 500',
+    'relationshipUpdateView': 'Vista sin `fields` ni `form_class` (ImproperlyConfigured): responde 500',
+}
+
+
+def route_names(patterns=None):
+    """Nombres de todas las rutas de `juego/urls.py` (incluidas las del router)"""
+    names = set()
+    for pattern in juego_urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def uncovered_routes():
+    """Rutas con nombre que no se miden ni se han descartado expresamente"""
+    return route_names() - {route.name for route in ROUTES} - set(SKIPPED_ROUTES)
+
+
+def world_options(size, **overrides):
+    """Parámetros del generador para un mundo de `size` personajes (`overrides` cambia los que se indiquen)"""
+    return dict(
+        characters=size, factions=max(5, size // 100), weapons=max(10, size // 10),
+        armors=max(10, size // 10), relationships=2, seed=0,
+    ) | overrides
+
+
+@contextmanager
+def isolated_database():
+    """
+    Base de datos de pruebas para los comandos que generan mundos sintéticos: nunca se escribe
+    en la configurada.
+    """
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def synthetic_world(size, **options):
+    """
+    Genera un mundo sintético de `size` personajes (ver `world_options`) con una caché en memoria
+    propia (`SYNTHETIC_WORLD_CACHES`), en una transacción que se deshace al salir. Devuelve los
+    objetos de ejemplo (`create_fixtures`).
+    """
+    with override_settings(CACHES=SYNTHETIC_WORLD_CACHES), transaction.atomic():
+        cache.clear()  # La caché propia, que puede conservar datos de un mundo anterior
+        WorldGenerator(**world_options(size, **options)).generate()
+        yield create_fixtures()
+        transaction.set_rollback(True)
+
+
+def create_fixtures():
+    """
+    Objetos de ejemplo para las URLs. Se eligen los más usados (la facción con más miembros,
+    el arma y la armadura más equipadas) para medir el peor caso de las páginas de detalle.
+    """
+    armed = Character.objects.filter(equipped_weapon__isnull=False, equipped_armor__isnull=False).order_by('id')
+    character, character2 = armed[0], armed[1]
+    fixtures = {
+        'user': User.objects.create_user(username='benchmark', password='benchmark'),
+        'character': character,
+        'character2': character2,
+        'inventory': character.inventory,
+        'faction': Faction.objects.annotate(n=Count('members')).order_by('-n', 'id').first(),
+        'weapon': Weapon.objects.annotate(n=Count('equipped_weapon')).order_by('-n', 'id').first(),
+        'armor': Armor.objects.annotate(n=Count('equipped_armor')).order_by('-n', 'id').first(),
+        'relationship': Relationship.objects.order_by('id').first(),
+    }
+
+    # Una batalla terminada para medir su repetición
+    state = start_battle(CombatStats.from_character(character), CombatStats.from_character(character2), seed=0)
+    while state['winner'] is None and state['seq'] < MAX_TURNS:
+        play_turn(state, state['turn_player'], 'fuerte')
+    fixtures['battle_log'] = save_battle_logs([state])[0]
+    return fixtures
+
+
+def _request(client, route, fixtures):
+    """Prepara la petición de una ruta y devuelve la función que la hace"""
+    if route.prepare:
+        extra_args, data = route.prepare(client, fixtures)
+    else:
+        extra_args, data = (), route.data(fixtures) if callable(route.data) else route.data
+    url = reverse(f'juego:{route.name}', args=[fixtures[name].pk for name in route.args] + list(extra_args))
+    if route.content_type == 'application/json':
+        data = json.dumps(data)
+    kwargs = {'content_type': route.content_type} if route.content_type else {}
+
+    def send():
+        response = getattr(client, route.method)(url, data, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    return send
+
+
+def measure_route(client, route, fixtures, repeat=BENCHMARK_REPEAT):
+    """
+    Mide una ruta: una petición de calentamiento y `repeat` peticiones medidas, más una con
+    `tracemalloc` para el pico de memoria (que ralentiza y por eso no se usa para el tiempo).
+    """
+    _request(client, route, fixtures)()
+    times, queries = [], 0
+    for _ in range(repeat):
+        send = _request(client, route, fixtures)
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send()
+            times.append(time.perf_counter() - start)
+        queries = max(queries, len(captured))
+
+    send = _request(client, route, fixtures)
+    tracemalloc.start()
+    try:
+        send()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': queries,
+        'time_ms': round(statistics.median(times) * 1000, 2),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, repeat=BENCHMARK_REPEAT, progress=None):
+    """
+    Mide todas las rutas con un mundo de cada tamaño. Cada mundo se genera en una transacción
+    que se deshace al terminar. Devuelve los resultados (ver `dump_results`).
+    """
+    results = {'database': connection.vendor, 'sizes': list(sizes), 'routes': {}}
+    for size in sizes:
+        with synthetic_world(size) as fixtures:
+            # Las rutas que fallan se miden igual (con su código de error) en lugar de parar
+            client = Client(raise_request_exception=False)
+            client.force_login(fixtures['user'])
+            for route in ROUTES:
+                result = measure_route(client, route, fixtures, repeat)
+                results['routes'].setdefault(route.key, {})[str(size)] = result
+                if progress:
+                    progress(size, route, result)
+    return results
+
+
+def query_growth(results):
+    """
+    Rutas cuyo número de consultas crece con el tamaño del mundo: {ruta: [consultas por tamaño]}.
+    """
+    growth = {}
+    for key, by_size in results['routes'].items():
+        counts = [by_size[str(size)]['queries'] for size in results['sizes'] if str(size) in by_size]
+        if len(counts) > 1 and counts[-1] > counts[0]:
+            growth[key] = counts
+    return growth
+
+
+def server_errors(results):
+    """
+    Rutas que han respondido con un error 5xx: {ruta: {tamaño: código}}.
+    """
+    errors = {}
+    for key, by_size in results['routes'].items():
+        for size, result in by_size.items():
+            if result['status'] >= 500:
+                errors.setdefault(key, {})[size] = result['status']
+    return errors
+
+
+def compare_with_baseline(results, baseline, tolerance=LATENCY_TOLERANCE, min_ms=LATENCY_MIN_MS):
+    """
+    Compara con unos resultados de referencia. Devuelve la lista de regresiones (textos): rutas
+    que hacen más consultas o que son más lentas que la referencia en más de `tolerance` (como
+    fracción) y `min_ms` milisegundos.
+    """
+    regressions = []
+    for key, by_size in sorted(results['routes'].items()):
+        for size, result in sorted(by_size.items(), key=lambda item: int(item[0])):
+            reference = baseline.get('routes', {}).get(key, {}).get(size)
+            if reference is None:
+                continue
+            if result['queries'] > reference['queries']:
+                regressions.append(f"{key} ({size}): {reference['queries']} -> {result['queries']} consultas")
+            if (result['time_ms'] > reference['time_ms'] * (1 + tolerance)
+                    and result['time_ms'] - reference['time_ms'] > min_ms):
+                regressions.append(f"{key} ({size}): {reference['time_ms']} -> {result['time_ms']} ms")
+    return regressions
+
+
+def dump_results(results):
+    """JSON de los resultados con las claves ordenadas y una clave por línea (para `diff`)"""
+    return json.dumps(results, indent=2, sort_keys=True) + '\n'
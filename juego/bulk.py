@@ -0,0 +1,216 @@
+"""
+Operaciones en bloque para los ViewSets de la API.
+
+`BulkModelMixin` añade a un ViewSet la ruta `<prefijo>/bulk/`:
+
+- POST con una lista de objetos: los crea con `bulk_create`.
+- PATCH con una lista de objetos con `id`: los actualiza con `bulk_update`.
+- DELETE con `{"ids": [...]}`: los borra.
+
+Cada elemento se valida con el serializador del ViewSet. Si alguno no es válido no se escribe
+nada y se responde 400 con los errores de cada elemento (`index` es su posición en la lista).
+Las escrituras se hacen en una sola transacción.
+
+Las claves foráneas (`BulkPrimaryKeyRelatedField`) se validan contra los objetos cargados de
+una vez para todo el lote, en lugar de con una consulta por elemento.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+# Número máximo de elementos por petición
+MAX_BULK_ITEMS = 10000
+
+# Filas por consulta INSERT/UPDATE
+BULK_BATCH_SIZE = 1000
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Clave foránea que, dentro de una operación en bloque, busca el objeto en los objetos
+    precargados para todo el lote (`context['bulk_related'][nombre_del_campo]`).
+    """
+
+    def to_internal_value(self, data):
+        related = self.context.get('bulk_related', {}).get(self.field_name)
+        if related is None:
+            return super().to_internal_value(data)
+        try:
+            return related[self.pk_field.to_internal_value(data) if self.pk_field else int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkModelMixin:
+    """
+    Añade las operaciones en bloque a un ModelViewSet.
+    """
+
+    def prepare_bulk_create(self, instances):
+        """
+        Se llama con las instancias sin guardar antes del `bulk_create` (que no llama a `save()`).
+        """
+
+    def bulk_create_related(self, instances):
+        """
+        Se llama con las instancias ya creadas dentro de la misma transacción, para crear en
+        bloque los objetos que dependen de ellas.
+        """
+
+    def after_bulk_write(self, pks):
+        """
+        Se llama tras crear o actualizar en bloque (que no envían las señales `post_save`).
+        """
+
+    def _bulk_related(self, items):
+        """
+        Precarga con una consulta por campo los objetos de las claves foráneas del lote.
+        """
+        related = {}
+        for name, field in self.get_serializer().fields.items():
+            if isinstance(field, BulkPrimaryKeyRelatedField) and not field.read_only:
+                pks = {item[name] for item in items if isinstance(item, dict) and item.get(name) is not None}
+                try:
+                    related[name] = field.get_queryset().in_bulk(pks)
+                except (TypeError, ValueError):
+                    related[name] = {}
+        return related
+
+    def _to_pk(self, value):
+        """
+        Convierte un id recibido (por ejemplo "5") al tipo de la clave primaria del modelo.
+        Devuelve (id, mensaje de error o None).
+        """
+        pk_field = self.get_queryset().model._meta.pk
+        if value is None or isinstance(value, (bool, dict, list)):
+            return None, f'Id no válido: se esperaba una clave primaria y se recibió {type(value).__name__}.'
+        try:
+            return pk_field.to_python(value), None
+        except ValidationError:
+            return None, f'Id no válido: se esperaba una clave primaria y se recibió {value!r}.'
+
+    def _validate_items(self, items, instances=None, partial=False):
+        """
+        Valida cada elemento con el serializador del ViewSet.
+        Devuelve (datos validados, errores por elemento).
+        """
+        context = {**self.get_serializer_context(), 'bulk_related': self._bulk_related(items)}
+        serializer_class = self.get_serializer_class()
+        validated, errors = [], []
+        for index, item in enumerate(items):
+            instance = instances[index] if instances else None
+            serializer = serializer_class(instance, data=item, partial=partial, context=context)
+            if serializer.is_valid():
+                validated.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+        return validated, errors
+
+    def _get_items(self, request):
+        """
+        Comprueba que el cuerpo sea una lista no vacía y no demasiado larga.
+        Devuelve (lista, respuesta de error o None).
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, Response({'error': 'Se esperaba una lista de objetos'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return None, Response({'error': f'Como máximo {MAX_BULK_ITEMS} elementos por petición'},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        return items, None
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Crea (POST), actualiza (PATCH) o borra (DELETE) varios objetos en una sola petición.
+        """
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_create(request)
+
+    def bulk_create(self, request):
+        items, error = self._get_items(request)
+        if error:
+            return error
+        validated, errors = self._validate_items(items)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        instances = [model(**data) for data in validated]
+        self.prepare_bulk_create(instances)
+        with transaction.atomic():
+            model.objects.bulk_create(instances, batch_size=BULK_BATCH_SIZE)
+            self.bulk_create_related(instances)
+        pks = [instance.pk for instance in instances]
+        self.after_bulk_write(pks)
+        return Response({'created': len(instances), 'ids': pks}, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        items, error = self._get_items(request)
+        if error:
+            return error
+
+        # Cargar todos los objetos a actualizar en una consulta
+        model = self.get_queryset().model
+        ids, errors = [], []
+        for index, item in enumerate(items):
+            pk, error = self._to_pk(item.get('id') if isinstance(item, dict) else None)
+            ids.append(pk)
+            if error:
+                errors.append({'index': index, 'errors': {'id': [error]}})
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        existing = model.objects.in_bulk(ids)
+        errors = [
+            {'index': index, 'errors': {'id': ['No existe ningún objeto con este id.']}}
+            for index, pk in enumerate(ids) if pk not in existing
+        ]
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        instances = [existing[pk] for pk in ids]
+        validated, errors = self._validate_items(items, instances, partial=True)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = set()
+        for instance, data in zip(instances, validated):
+            for name, value in data.items():
+                setattr(instance, name, value)
+                fields.add(name)
+        if fields:
+            with transaction.atomic():
+                model.objects.bulk_update(instances, sorted(fields), batch_size=BULK_BATCH_SIZE)
+        self.after_bulk_write(list(existing))
+        return Response({'updated': len(existing)})
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_ITEMS:
+            return Response({'error': f'Se esperaba {{"ids": [...]}} con entre 1 y {MAX_BULK_ITEMS} ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        pks = [self._to_pk(pk) for pk in ids]
+        invalid = [{'id': value, 'errors': [error]} for value, (_, error) in zip(ids, pks) if error]
+        if invalid:
+            return Response({'errors': invalid}, status=status.HTTP_400_BAD_REQUEST)
+        ids = [pk for pk, _ in pks]
+
+        queryset = self.get_queryset().model.objects.all()
+        existing = set(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+        missing = [pk for pk in ids if pk not in existing]
+        if missing:
+            return Response({'errors': [{'id': pk, 'errors': ['No existe ningún objeto con este id.']} for pk in missing]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # `delete()` sobre el queryset sí envía las señales `post_delete` de cada objeto
+        with transaction.atomic():
+            queryset.filter(pk__in=existing).delete()
+        return Response({'deleted': len(existing)})
@@ -0,0 +1,46 @@
+"""
+Versiones en la caché de los datos que se guardan en ella.
+
+Cada versión es un identificador aleatorio bajo una clave que no caduca; los datos se guardan
+bajo claves que la incluyen, así que renovar la versión invalida de una vez todo lo guardado con
+ella (en todos los procesos que comparten la caché). Si una versión no existe (nunca se ha
+creado o la caché la ha expulsado) se crea una nueva: en el peor caso se recalcula algo sin
+necesidad, pero nunca se sirven datos desactualizados.
+
+Lo usan las tarjetas de personajes, los datos de referencia, las estadísticas de facciones, el
+equipamiento de las batallas y el grafo de relaciones.
+"""
+import uuid
+
+from django.core.cache import cache
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def cache_versions(keys):
+    """
+    Devuelve {clave: versión actual} de varias claves con una sola lectura (crea las que no existen).
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # `add` no pisa la versión que otro proceso haya creado entre tanto
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def cache_version(key):
+    """
+    Devuelve la versión actual de una clave (se crea si no existe).
+    """
+    return cache_versions([key])[key]
+
+
+def bump_cache_versions(keys):
+    """
+    Renueva las versiones de las claves indicadas: lo guardado con las anteriores deja de valer.
+    """
+    cache.set_many({key: _new_version() for key in keys}, None)
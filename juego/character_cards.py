@@ -0,0 +1,98 @@
+"""
+Galería de personajes (`CharacterListView`) por páginas y con las tarjetas en la caché.
+
+Las páginas se recorren por id (`?after=<último id>`) en lugar de con OFFSET, así que cualquier
+página cuesta lo mismo aunque haya millones de personajes. La primera página se sirve con la
+página completa y las siguientes con `character/cards/` (scroll infinito, ver
+`juego/static/js/character_list.js`).
+
+El HTML de cada tarjeta se guarda en la caché bajo:
+
+- una versión del personaje que se renueva al guardarlo o borrarlo y al cambiar su inventario
+  (ver `juego.signals`);
+- las versiones de los datos de referencia (ver `juego.reference_data`), porque la tarjeta muestra
+  el nombre de la facción, las armas y las armaduras.
+
+Solo se consultan los inventarios y se renderizan las tarjetas que no están en la caché.
+"""
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from juego.cache_versions import bump_cache_versions, cache_versions
+from juego.models import Armor, Character, Faction, Weapon
+from juego.reference_data import reference_version
+
+# Personajes por página de la galería
+CHARACTER_PAGE_SIZE = 24
+
+# Clave de la caché con la versión de la tarjeta de un personaje
+CHARACTER_CARD_VERSION_KEY = 'juego:character_card_version:{}'
+
+# Clave de la caché con el HTML de una tarjeta (personaje, versión, versiones de los datos de referencia)
+CHARACTER_CARD_CACHE_KEY = 'juego:character_card:{}:{}:{}'
+
+# Tiempo (en segundos) que se guarda cada tarjeta
+CHARACTER_CARD_TIMEOUT = 24 * 60 * 60
+
+
+def character_card_versions(pks):
+    """
+    Devuelve las versiones actuales de las tarjetas de los personajes indicados (se crean si no existen).
+    """
+    keys = {pk: CHARACTER_CARD_VERSION_KEY.format(pk) for pk in pks}
+    versions = cache_versions(list(keys.values()))
+    return {pk: versions[key] for pk, key in keys.items()}
+
+
+def bump_character_card_versions(pks):
+    """
+    Renueva las versiones de las tarjetas de varios personajes.
+    """
+    bump_cache_versions([CHARACTER_CARD_VERSION_KEY.format(pk) for pk in pks])
+
+
+def character_page(after=None, page_size=CHARACTER_PAGE_SIZE):
+    """
+    Personajes con id mayor que `after` (los primeros si es None), como mucho `page_size`.
+    Devuelve (personajes, id desde el que empieza la página siguiente o None si es la última).
+    """
+    queryset = Character.objects.select_related('faction', 'equipped_weapon', 'equipped_armor').order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    characters = list(queryset[:page_size + 1])
+    if len(characters) > page_size:
+        characters = characters[:page_size]
+        return characters, characters[-1].pk
+    return characters, None
+
+
+def render_character_cards(characters):
+    """
+    HTML de la tarjeta de cada personaje, de la caché si está y renderizado si no.
+    """
+    if not characters:
+        return []
+    versions = character_card_versions([character.pk for character in characters])
+    reference = '.'.join(reference_version(model) for model in (Faction, Weapon, Armor))
+    keys = {character.pk: CHARACTER_CARD_CACHE_KEY.format(character.pk, versions[character.pk], reference)
+            for character in characters}
+    cards = cache.get_many(keys.values())
+
+    missing = [character for character in characters if keys[character.pk] not in cards]
+    if missing:
+        prefetch_related_objects(missing, 'inventory__weapons', 'inventory__armors')
+        rendered = {keys[character.pk]: render_to_string('juego/character_card.html', {'character': character})
+                    for character in missing}
+        cache.set_many(rendered, CHARACTER_CARD_TIMEOUT)
+        cards.update(rendered)
+    return [mark_safe(cards[keys[character.pk]]) for character in characters]
+
+
+def after_param(request):
+    """Valor de `?after=` como entero (None si no está o no es un número)"""
+    try:
+        return int(request.GET['after'])
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,165 @@
+"""
+Exportación de todos los personajes en NDJSON o CSV.
+
+Los personajes se recorren con `.iterator(chunk_size=...)` (un cursor del lado del servidor en
+PostgreSQL) y cada bloque trae su facción, equipo, inventario y relaciones con un número fijo
+de consultas. Las filas se generan una a una, así que la memoria no depende del número de
+personajes. Lo usan la vista `export_characters` (con `StreamingHttpResponse`) y el comando
+`manage.py export_characters`.
+
+Con ASGI la respuesta necesita un iterador asíncrono (de uno síncrono Django lee la exportación
+entera antes de enviar nada): `aexport_characters` lee los bloques por id en un hilo con
+`sync_to_async` y va devolviendo sus líneas.
+"""
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from juego.models import Character, Relationship
+
+# Personajes que se leen de la base de datos por bloque
+EXPORT_CHUNK_SIZE = 2000
+
+# Formatos admitidos y su tipo de contenido
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_HEADER = [
+    'id', 'name', 'location', 'faction_id', 'faction_name',
+    'weapon_id', 'weapon_name', 'weapon_damage', 'weapon_critic', 'weapon_accuracy',
+    'armor_id', 'armor_name', 'armor_defense',
+    'inventory_weapons', 'inventory_armors', 'relationships',
+]
+
+
+def export_queryset():
+    """
+    Personajes ordenados por id con todo lo que se exporta cargado por bloques.
+    """
+    return (
+        Character.objects.order_by('id')
+        .select_related('faction', 'equipped_weapon', 'equipped_armor', 'inventory')
+        .prefetch_related(
+            'inventory__weapons',
+            'inventory__armors',
+            Prefetch('relationships1', queryset=Relationship.objects.order_by('id')),
+            Prefetch('relationships2', queryset=Relationship.objects.order_by('id')),
+        )
+    )
+
+
+def character_row(character):
+    """
+    Representación de un personaje para la exportación.
+    """
+    faction = character.faction
+    weapon = character.equipped_weapon
+    armor = character.equipped_armor
+    try:
+        inventory = character.inventory
+    except Character.inventory.RelatedObjectDoesNotExist:
+        inventory = None
+    relationships = [
+        {'character': r.character2_id, 'relationship_type': r.relationship_type} for r in character.relationships1.all()
+    ] + [
+        {'character': r.character1_id, 'relationship_type': r.relationship_type} for r in character.relationships2.all()
+    ]
+    return {
+        'id': character.id,
+        'name': character.name,
+        'location': character.location,
+        'faction': {'id': faction.id, 'name': faction.name} if faction else None,
+        'equipped_weapon': {
+            'id': weapon.id, 'name': weapon.name, 'damage': weapon.damage,
+            'critic': weapon.critic, 'accuracy': weapon.accuracy,
+        } if weapon else None,
+        'equipped_armor': {'id': armor.id, 'name': armor.name, 'defense': armor.defense} if armor else None,
+        'inventory': {
+            'weapons': [w.id for w in inventory.weapons.all()],
+            'armors': [a.id for a in inventory.armors.all()],
+        } if inventory else None,
+        'relationships': relationships,
+    }
+
+
+def _csv_values(row):
+    """
+    Aplana una fila para el CSV. Las listas se separan con ';' y las relaciones son 'id:tipo'.
+    """
+    faction = row['faction'] or {}
+    weapon = row['equipped_weapon'] or {}
+    armor = row['equipped_armor'] or {}
+    inventory = row['inventory'] or {'weapons': [], 'armors': []}
+    return [
+        row['id'], row['name'], row['location'], faction.get('id'), faction.get('name'),
+        weapon.get('id'), weapon.get('name'), weapon.get('damage'), weapon.get('critic'), weapon.get('accuracy'),
+        armor.get('id'), armor.get('name'), armor.get('defense'),
+        ';'.join(map(str, inventory['weapons'])),
+        ';'.join(map(str, inventory['armors'])),
+        ';'.join(f"{r['character']}:{r['relationship_type']}" for r in row['relationships']),
+    ]
+
+
+class _Echo:
+    """Objeto con `write` que devuelve lo escrito, para generar el CSV línea a línea"""
+
+    def write(self, value):
+        return value
+
+
+def _line(character, format, writer):
+    """Línea de la exportación de un personaje"""
+    if format == 'csv':
+        return writer.writerow(_csv_values(character_row(character)))
+    return json.dumps(character_row(character), ensure_ascii=False) + '\n'
+
+
+def _check_format(format):
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f'Formato no válido: {format}')
+
+
+def export_characters(format='ndjson', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Genera la exportación de todos los personajes línea a línea en el formato indicado.
+    """
+    _check_format(format)
+    writer = csv.writer(_Echo())
+    if format == 'csv':
+        yield writer.writerow(CSV_HEADER)
+    for character in export_queryset().iterator(chunk_size=chunk_size):
+        yield _line(character, format, writer)
+
+
+def export_chunk(format='ndjson', after=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Líneas de los personajes con id mayor que `after` (los primeros si es None), como mucho
+    `chunk_size`. Devuelve (líneas, id desde el que sigue el bloque siguiente o None si es el último).
+    """
+    queryset = export_queryset()
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    characters = list(queryset[:chunk_size])
+    writer = csv.writer(_Echo())
+    lines = [_line(character, format, writer) for character in characters]
+    return lines, characters[-1].id if len(characters) == chunk_size else None
+
+
+async def aexport_characters(format='ndjson', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Como `export_characters`, pero asíncrono: cada bloque se lee en un hilo (`sync_to_async`).
+    """
+    _check_format(format)
+    if format == 'csv':
+        yield csv.writer(_Echo()).writerow(CSV_HEADER)
+    after = None
+    while True:
+        lines, after = await sync_to_async(export_chunk)(format, after, chunk_size)
+        for line in lines:
+            yield line
+        if after is None:
+            break
@@ -0,0 +1,116 @@
+"""
+Estadísticas de las facciones.
+
+Sustituye el `faction.members.count()` por facción (una consulta COUNT por facción) por
+consultas agregadas: el número de miembros de todas las facciones sale de un solo
+`annotate(Count(...))` y el desglose por localización y equipamiento de un único GROUP BY
+sobre (facción, localización).
+
+Los resultados se guardan en la caché bajo una versión que se renueva cada vez que se guarda
+o se borra una facción o un personaje (ver `juego.signals`). La misma versión sirve de ETag,
+así que un cliente que consulta a menudo recibe un 304 sin que se toque la base de datos.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from juego.cache_versions import bump_cache_versions, cache_version
+from juego.models import Faction
+
+# Clave de la caché con la versión de las estadísticas de facciones
+FACTION_STATS_VERSION_KEY = 'juego:faction_stats_version'
+
+# Clave de la caché con las estadísticas calculadas para una versión
+FACTION_STATS_CACHE_KEY = 'juego:faction_stats:{}:{}'
+
+# Tiempo (en segundos) que se guardan las estadísticas calculadas
+FACTION_STATS_TIMEOUT = 60 * 60
+
+
+def faction_stats_version():
+    """
+    Devuelve la versión actual de las estadísticas (se crea si no existe).
+    """
+    return cache_version(FACTION_STATS_VERSION_KEY)
+
+
+def bump_faction_stats_version():
+    """
+    Renueva la versión de las estadísticas: los datos guardados en la caché y los ETag dejan de valer.
+    """
+    bump_cache_versions([FACTION_STATS_VERSION_KEY])
+
+
+def faction_stats_etag(breakdown=False):
+    """
+    ETag de las estadísticas para la versión actual y el tipo de respuesta.
+    """
+    version = faction_stats_version()
+    digest = hashlib.md5(f'{version}:{int(breakdown)}'.encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def with_member_count(queryset=None):
+    """
+    Añade `member_count` a un queryset de facciones con un único COUNT agrupado.
+    """
+    queryset = Faction.objects.all() if queryset is None else queryset
+    return queryset.annotate(member_count=Count('members'))
+
+
+def _gear_counts():
+    """
+    Agregados de equipamiento de los miembros de una facción: con arma, con armadura, con las dos y sin nada.
+    """
+    weapon = Q(members__equipped_weapon__isnull=False)
+    armor = Q(members__equipped_armor__isnull=False)
+    return {
+        'weapon': Count('members', filter=weapon),
+        'armor': Count('members', filter=armor),
+        'full': Count('members', filter=weapon & armor),
+        'none': Count('members', filter=~weapon & ~armor),
+    }
+
+
+def compute_faction_stats(breakdown=False):
+    """
+    Calcula las estadísticas de todas las facciones, ordenadas por id.
+
+    Sin `breakdown` devuelve [{'name', 'member_count'}]. Con `breakdown` añade el número de
+    miembros por localización (`locations`) y según lleven arma, armadura, las dos o nada (`gear`).
+    En ambos casos se hace una sola consulta.
+    """
+    if not breakdown:
+        return list(with_member_count().order_by('id').values('name', 'member_count'))
+
+    # Una fila por (facción, localización); las facciones sin miembros salen con localización None
+    rows = (
+        Faction.objects.order_by('id')
+        .values('id', 'name', 'members__location')
+        .annotate(member_count=Count('members'), **_gear_counts())
+        .order_by('id', 'members__location')
+    )
+    factions = {}
+    for row in rows:
+        faction = factions.setdefault(row['id'], {
+            'name': row['name'],
+            'member_count': 0,
+            'locations': {},
+            'gear': {'weapon': 0, 'armor': 0, 'full': 0, 'none': 0},
+        })
+        if not row['member_count']:
+            continue
+        faction['member_count'] += row['member_count']
+        faction['locations'][row['members__location']] = row['member_count']
+        for key in faction['gear']:
+            faction['gear'][key] += row[key]
+    return list(factions.values())
+
+
+def get_faction_stats(breakdown=False):
+    """
+    Devuelve las estadísticas de las facciones desde la caché o las calcula si han cambiado.
+    """
+    key = FACTION_STATS_CACHE_KEY.format(faction_stats_version(), int(breakdown))
+    return cache.get_or_set(key, lambda: compute_faction_stats(breakdown), FACTION_STATS_TIMEOUT)
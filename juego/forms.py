@@ -5,13 +5,14 @@ from django.contrib.auth.forms import UserCreationForm
 from django.forms import ClearableFileInput
 
 from juego.models import *
+from juego.reference_data import ReferenceChoiceField, ReferenceMultipleChoiceField
 
 class FactionForm(forms.Form):
     """
     Formulario para seleccionar una facción.
     Permite al usuario seleccionar una facción de la base de datos.
     """
-    faction = forms.ModelChoiceField(
+    faction = ReferenceChoiceField(
         queryset=Faction.objects.all(),  # Consulta todas las facciones disponibles
         widget=forms.Select(),  # Utiliza un widget Select para mostrar opciones desplegables
         label="Selecciona una facción:"  # Etiqueta que se mostrará junto al campo
@@ -24,14 +25,14 @@ class EquipmentForm(forms.Form):
     Ambos campos son opcionales.
     """
 
-    weapon = forms.ModelChoiceField(
+    weapon = ReferenceChoiceField(
         queryset=Weapon.objects.all(),  # Consulta todas las armas disponibles
         widget=forms.Select(),  # Utiliza un widget Select para mostrar opciones desplegables
         label="Selecciona un arma:",  # Etiqueta que se mostrará junto al campo
         required=False  # El campo es opcional, ya que puede no haber arma seleccionada
     )
 
-    armor = forms.ModelChoiceField(
+    armor = ReferenceChoiceField(
         queryset=Armor.objects.all(),  # Consulta todas las armaduras disponibles
         widget=forms.Select(),  # Utiliza un widget Select para mostrar opciones desplegables
         label="Selecciona una armadura:",  # Etiqueta que se mostrará junto al campo
@@ -65,8 +66,14 @@ class CharacterForm(forms.ModelForm):
         widgets = {
             'image': NoClearableFileInput(),  # Asignamos el widget sin opción de limpiar
         }
+        # Las opciones de facción, arma y armadura salen de la caché (ver juego/reference_data.py)
+        field_classes = {
+            'faction': ReferenceChoiceField,
+            'equipped_weapon': ReferenceChoiceField,
+            'equipped_armor': ReferenceChoiceField,
+        }
 class WeaponAddForm(forms.Form):
-    weapon_id = forms.ModelChoiceField(
+    weapon_id = ReferenceChoiceField(
         queryset=Weapon.objects.all(),
         empty_label="Selecciona un arma",
         required=True,
@@ -74,7 +81,7 @@ class WeaponAddForm(forms.Form):
     )
 
 class ArmorAddForm(forms.Form):
-    armor_id = forms.ModelChoiceField(
+    armor_id = ReferenceChoiceField(
         queryset=Armor.objects.all(),
         empty_label="Selecciona una armadura",
         required=True,
@@ -108,14 +115,14 @@ class FactionDefaultForm(forms.ModelForm):
 
 
 class InventoryAddItemsForm(forms.Form):
-    weapons = forms.ModelMultipleChoiceField(
+    weapons = ReferenceMultipleChoiceField(
         queryset=Weapon.objects.all(),
         widget=forms.CheckboxSelectMultiple,
         required=False,
         label="Armas"
     )
     # noinspection PyTypeChecker
-    armors = forms.ModelMultipleChoiceField(
+    armors = ReferenceMultipleChoiceField(
         queryset=Armor.objects.all(),
         widget=forms.CheckboxSelectMultiple,
         required=False,
@@ -178,6 +185,9 @@ class RelationshipForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Las opciones muestran la facción de cada personaje (ver Character.__str__)
+        self.fields['character1'].queryset = self.fields['character1'].queryset.select_related('faction')
+        self.fields['character2'].queryset = self.fields['character2'].queryset.select_related('faction')
         self.fields['character1'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Personaje 1'})
         self.fields['relationship_type'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Tipo de Relación'})
         self.fields['character2'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Personaje 2'})
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Versiones reducidas de las imágenes de armas, armaduras y personajes.
+
+Las plantillas mostraban la imagen original (a veces de casi 1 MB) reducida con CSS. Ahora cada
+imagen tiene versiones de varios anchos (`DERIVATIVE_WIDTHS`) en WebP y, si Pillow lo admite, AVIF,
+guardadas junto a los ficheros subidos en `derivatives/<ruta de la imagen>-<ancho>.<formato>`, y
+un manifiesto (`derivatives/<ruta de la imagen>.json`) con el tamaño original y las versiones que
+existen. La etiqueta `{% picture %}` (ver `juego/templatetags/images.py`) los usa para generar un
+`<picture>` con `srcset`, así que el navegador descarga solo el tamaño que necesita.
+
+- `schedule_derivatives(name)`: genera las versiones en segundo plano (pool de hilos; Pillow
+  libera el GIL al reducir y codificar), después de que se confirme la transacción. Se llama al
+  guardar un objeto con imagen (ver `juego.signals`).
+- `generate_derivatives(name)`: las genera en el momento (comando `generate_image_derivatives`
+  para las imágenes que ya existían).
+- `image_derivatives(name)`: el manifiesto de una imagen (de la caché) o None si todavía no tiene versiones.
+"""
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Anchos (en píxeles) de las versiones reducidas. Nunca se amplía: los anchos mayores que el
+# original se omiten
+DERIVATIVE_WIDTHS = (160, 320, 640, 960)
+
+# Formatos de las versiones, del preferido al menos preferido, con sus opciones de Pillow
+DERIVATIVE_FORMATS = {
+    fmt: options for fmt, options in (
+        ('avif', {'quality': 55}),
+        ('webp', {'quality': 80, 'method': 4}),
+    ) if features.check(fmt)
+}
+
+# Directorio (dentro del almacenamiento de los ficheros subidos) de las versiones
+DERIVATIVES_DIR = 'derivatives'
+
+# Clave de la caché con el manifiesto de una imagen
+IMAGE_DERIVATIVES_CACHE_KEY = 'juego:image_derivatives:{}'
+
+# Tiempo (en segundos) que se guarda en la caché el manifiesto de una imagen y que se recuerda
+# que una imagen no tiene versiones (para no buscar el fichero en cada página)
+IMAGE_DERIVATIVES_TIMEOUT = 24 * 60 * 60
+IMAGE_DERIVATIVES_MISSING_TIMEOUT = 60
+
+
+def derivative_name(name, width, fmt):
+    """Ruta de la versión de `width` píxeles de ancho en el formato `fmt` de la imagen `name`"""
+    return f'{DERIVATIVES_DIR}/{os.path.splitext(name)[0]}-{width}.{fmt}'
+
+
+def manifest_name(name):
+    """Ruta del manifiesto de la imagen `name`"""
+    return f'{DERIVATIVES_DIR}/{name}.json'
+
+
+def _cache_key(name):
+    return IMAGE_DERIVATIVES_CACHE_KEY.format(name)
+
+
+def _open_image(storage, name):
+    """Abre la imagen con la orientación de sus datos EXIF y en un modo que admiten WebP y AVIF"""
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _save(storage, name, content):
+    """Guarda un fichero con ese nombre exacto (el almacenamiento añadiría un sufijo si ya existe)"""
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def forget_derivatives(name):
+    """
+    Olvida el manifiesto de la imagen `name` guardado en la caché (al borrar sus versiones): si se
+    vuelve a subir, con el mismo nombre de hash, se generan de nuevo.
+    """
+    cache.delete(_cache_key(name))
+
+
+def generate_derivatives(name, storage=None, force=False):
+    """
+    Genera las versiones reducidas de la imagen `name` y su manifiesto. Si ya tiene manifiesto
+    no hace nada (salvo con `force`). Devuelve (manifiesto, si se ha generado).
+    """
+    storage = storage or default_storage
+    if not force:
+        manifest = image_derivatives(name, storage)
+        if manifest is not None:
+            return manifest, False
+
+    image = _open_image(storage, name)
+    manifest = {'width': image.width, 'height': image.height, 'sources': {fmt: [] for fmt in DERIVATIVE_FORMATS}}
+    widths = [width for width in DERIVATIVE_WIDTHS if width < image.width] or [image.width]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt, options in DERIVATIVE_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt.upper(), **options)
+            path = derivative_name(name, width, fmt)
+            _save(storage, path, buffer.getvalue())
+            manifest['sources'][fmt].append([path, width])
+
+    _save(storage, manifest_name(name), json.dumps(manifest).encode())
+    cache.set(_cache_key(name), manifest, IMAGE_DERIVATIVES_TIMEOUT)
+    return manifest, True
+
+
+def image_derivatives(name, storage=None):
+    """
+    Manifiesto de la imagen `name`: {'width', 'height', 'sources': {formato: [[ruta, ancho], ...]}},
+    o None si todavía no tiene versiones.
+    """
+    key = _cache_key(name)
+    manifest = cache.get(key)
+    if manifest is not None:
+        return manifest or None  # {}: se sabe que no tiene versiones
+
+    storage = storage or default_storage
+    try:
+        with storage.open(manifest_name(name), 'rb') as file:
+            manifest = json.loads(file.read())
+    except (FileNotFoundError, ValueError):
+        cache.set(key, {}, IMAGE_DERIVATIVES_MISSING_TIMEOUT)
+        return None
+    cache.set(key, manifest, IMAGE_DERIVATIVES_TIMEOUT)
+    return manifest
+
+
+def srcset(name, fmt, storage=None):
+    """Valor del atributo `srcset` con las versiones de la imagen `name` en el formato `fmt` ('' si no hay)"""
+    storage = storage or default_storage
+    manifest = image_derivatives(name, storage)
+    if manifest is None:
+        return ''
+    return ', '.join(f'{storage.url(path)} {width}w' for path, width in manifest['sources'].get(fmt, []))
+
+
+# -- Generación en segundo plano --------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2),
+                                           thread_name_prefix='image-derivatives')
+        return _executor
+
+
+def _generate_in_background(name, on_generated):
+    try:
+        _, generated = generate_derivatives(name)
+        if generated and on_generated is not None:
+            on_generated()
+    except Exception:
+        logger.exception('No se han podido generar las versiones de la imagen %s', name)
+
+
+def schedule_derivatives(name, on_generated=None):
+    """
+    Genera en segundo plano las versiones de la imagen `name` cuando se confirme la transacción
+    en curso (la imagen ya está guardada). `on_generated` se llama después si se han generado.
+    """
+    if not name:
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_generate_in_background, name, on_generated))
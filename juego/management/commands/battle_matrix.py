@@ -0,0 +1,32 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from juego.battle_matrix import DEFAULT_TRIALS, refresh_battle_matrix
+
+
+class Command(BaseCommand):
+    help = "Calcula la matriz de probabilidades de victoria entre todos los personajes y la guarda en la caché"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help="Combates simulados por pareja")
+        parser.add_argument('--seed', type=int, default=None, help="Semilla para obtener resultados reproducibles")
+        parser.add_argument('--top', type=int, default=10, help="Número de personajes de la clasificación a mostrar")
+        parser.add_argument('--output', default=None, help="Fichero donde guardar la matriz completa en JSON")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        data = refresh_battle_matrix(trials=options['trials'], seed=options['seed'])
+        elapsed = time.perf_counter() - start
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+
+        for position, row in enumerate(data['leaderboard'][:options['top']], start=1):
+            self.stdout.write(f"{position:>3}. {row['name']} ({row['win_rate']:.2%})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Matriz de {len(data['characters'])} personajes calculada en {elapsed:.2f}s"
+        ))
@@ -0,0 +1,66 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from juego.benchmarks import (
+    BENCHMARK_REPEAT, BENCHMARK_SIZES, LATENCY_TOLERANCE, compare_with_baseline, dump_results, query_growth,
+    isolated_database, run_benchmarks, server_errors, uncovered_routes,
+)
+
+# Resultados de referencia guardados en el repositorio
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = ("Mide el número de consultas, la latencia y la memoria de todas las rutas con mundos sintéticos "
+            "de varios tamaños (en una base de datos de pruebas). Falla si alguna ruta responde con un error 5xx, "
+            "hace más consultas cuanto mayor es el mundo o es más lenta que la referencia")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(BENCHMARK_SIZES),
+                            help="Número de personajes de cada mundo medido")
+        parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT, help="Peticiones medidas por ruta")
+        parser.add_argument('--output', default=None, help="Fichero donde guardar los resultados (JSON)")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help="Resultados de referencia con los que comparar (si existe el fichero)")
+        parser.add_argument('--tolerance', type=float, default=LATENCY_TOLERANCE,
+                            help="Fracción de tiempo por encima de la referencia que se considera regresión")
+        parser.add_argument('--no-compare', action='store_true', help="No comparar con la referencia")
+
+    def handle(self, *args, **options):
+        uncovered = uncovered_routes()
+        if uncovered:
+            raise CommandError(f"Rutas sin benchmark: {', '.join(sorted(uncovered))}")
+
+        def progress(size, route, result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  [{size}] {route.key}: {result['queries']} consultas, {result['time_ms']} ms")
+
+        # Los mundos se generan en una base de datos de pruebas y con una caché propia
+        with isolated_database():
+            results = run_benchmarks(sizes=sorted(options['sizes']), repeat=options['repeat'], progress=progress)
+
+        output = dump_results(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+        failures = [f"{key} ({size}): respuesta {code}"
+                    for key, by_size in sorted(server_errors(results).items()) for size, code in by_size.items()]
+        failures += [f"{key}: {' -> '.join(map(str, counts))} consultas"
+                     for key, counts in sorted(query_growth(results).items())]
+        if not options['no_compare']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except FileNotFoundError:
+                self.stderr.write(self.style.WARNING(f"No hay referencia en {options['baseline']}"))
+            else:
+                failures += compare_with_baseline(results, baseline, tolerance=options['tolerance'])
+
+        if failures:
+            raise CommandError("Regresiones:\n" + "\n".join(failures))
+        self.stderr.write(self.style.SUCCESS(f"{len(results['routes'])} rutas medidas sin regresiones"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from juego.benchmarks import isolated_database
+from juego.query_plans import QUERY_PLAN_SIZE, plan_regressions, run_query_plans
+
+
+class Command(BaseCommand):
+    help = ("Obtiene con EXPLAIN el plan de las consultas más usadas con un mundo sintético grande (en una "
+            "base de datos de pruebas). Falla si alguna recorre entera una tabla grande en lugar de usar un índice")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=QUERY_PLAN_SIZE, help="Número de personajes del mundo")
+
+    def handle(self, *args, **options):
+        def progress(query, result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{query.name}:\n  " + result['plan'].replace('\n', '\n  '))
+
+        # El mundo se genera en una base de datos de pruebas y con una caché propia
+        with isolated_database():
+            results = run_query_plans(size=options['size'], progress=progress)
+
+        regressions = plan_regressions(results)
+        if regressions:
+            raise CommandError("Planes con recorridos completos:\n" + "\n".join(regressions))
+        self.stderr.write(self.style.SUCCESS(f"{len(results)} consultas sin recorridos completos"))
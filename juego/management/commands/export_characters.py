@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from juego.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_characters
+
+
+class Command(BaseCommand):
+    help = "Exporta todos los personajes con su facción, equipo, inventario y relaciones en NDJSON o CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson', help="Formato de salida")
+        parser.add_argument('--output', default=None, help="Fichero de salida (por defecto, la salida estándar)")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help="Personajes que se leen de la base de datos por bloque")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['output']:
+            output = open(options['output'], 'w', encoding='utf-8', newline='')
+            write = output.write
+        else:
+            output = None
+            write = lambda line: self.stdout.write(line, ending='')
+
+        rows = 0
+        try:
+            for line in export_characters(options['format'], chunk_size=options['chunk_size']):
+                write(line)
+                rows += 1
+        finally:
+            if output:
+                output.close()
+
+        if options['format'] == 'csv':
+            rows -= 1  # La cabecera no es un personaje
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(f"{rows} personajes exportados en {elapsed:.2f}s"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from juego.storage import GC_GRACE_SECONDS, delete_media, media_storage, orphaned_files
+
+
+class Command(BaseCommand):
+    help = ("Borra las imágenes (con nombre de hash) que ya no usa ningún arma, armadura ni personaje, "
+            "junto con sus versiones reducidas")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo muestra los ficheros que se borrarían")
+        parser.add_argument('--grace', type=int, default=GC_GRACE_SECONDS,
+                            help="Segundos que tiene que llevar un fichero sin subirse para borrarlo")
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for name in orphaned_files(grace=options['grace']):
+            if options['verbosity'] > 1 or options['dry_run']:
+                self.stdout.write(f"  {name}")
+            if not options['dry_run']:
+                delete_media(name, media_storage)
+            deleted += 1
+        action = "se borrarían" if options['dry_run'] else "borradas"
+        self.stdout.write(self.style.SUCCESS(f"{deleted} imágenes sin usar {action}"))
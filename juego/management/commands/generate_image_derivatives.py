@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from juego.character_cards import bump_character_card_versions
+from juego.images import DERIVATIVE_FORMATS, DERIVATIVE_WIDTHS, generate_derivatives
+from juego.models import Armor, Character, Weapon
+
+# Personajes cuyas tarjetas de la galería se renuevan a la vez
+BUMP_CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ("Genera las versiones reducidas (WebP/AVIF) de las imágenes de armas, armaduras y personajes "
+            "que todavía no las tienen")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Vuelve a generar también las que ya existen")
+        parser.add_argument('--workers', type=int, default=4, help="Imágenes que se procesan a la vez")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        # Muchos objetos comparten imagen (por ejemplo la de por defecto): cada una se procesa una vez
+        names = set()
+        for model in (Weapon, Armor, Character):
+            names.update(model.objects.exclude(image='').exclude(image__isnull=True)
+                         .values_list('image', flat=True).distinct())
+        self.stdout.write(f"{len(names)} imágenes ({', '.join(DERIVATIVE_FORMATS)}; anchos {DERIVATIVE_WIDTHS})")
+
+        generated, failed = [], 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {name: executor.submit(generate_derivatives, name, force=options['force']) for name in sorted(names)}
+            for name, future in futures.items():
+                try:
+                    _, created = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f"  {name}: {e}"))
+                    continue
+                if created:
+                    generated.append(name)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f"  {name}")
+
+        # Las tarjetas de la galería guardadas en la caché todavía muestran la imagen original
+        pks = Character.objects.filter(image__in=generated).values_list('pk', flat=True)
+        chunk = []
+        for pk in pks.iterator(chunk_size=BUMP_CHUNK_SIZE):
+            chunk.append(pk)
+            if len(chunk) == BUMP_CHUNK_SIZE:
+                bump_character_card_versions(chunk)
+                chunk = []
+        bump_character_card_versions(chunk)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(generated)} imágenes procesadas, {len(names) - len(generated) - failed} ya lo estaban, "
+            f"{failed} con errores en {elapsed:.2f}s"
+        ))
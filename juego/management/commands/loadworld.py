@@ -0,0 +1,57 @@
+import itertools
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from juego.world_import import IMPORT_CHUNK_SIZE, RECORD_TYPES, WorldImporter, csv_record_type, read_records
+
+
+class Command(BaseCommand):
+    help = ("Importa facciones, armas, armaduras, personajes (con inventario) y relaciones desde "
+            "ficheros NDJSON o CSV, por bloques y con COPY en PostgreSQL")
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Ficheros .ndjson/.jsonl o .csv a importar, en orden")
+        parser.add_argument('--type', choices=RECORD_TYPES, default=None,
+                            help="Tipo de los registros si no se indica en cada línea ni en el nombre del fichero")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Registros por bloque")
+        parser.add_argument('--no-copy', action='store_true', help="No usar COPY aunque la base de datos sea PostgreSQL")
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {stats.total_rows} filas ({stats.rows_per_second:.0f} filas/s)")
+
+        # Los errores de los ficheros se comprueban antes de escribir nada: los bloques ya
+        # escritos no se deshacen si la importación se interrumpe a mitad
+        for path in options['files']:
+            if not os.path.isfile(path):
+                raise CommandError(f'No existe el fichero {path}')
+            if os.path.splitext(path)[1].lower() == '.csv':
+                try:
+                    csv_record_type(path, options['type'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+
+        importer = WorldImporter(
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+            progress=progress,
+        )
+        try:
+            records = itertools.chain.from_iterable(read_records(path, options['type']) for path in options['files'])
+            stats = importer.load(records)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for table, rows in sorted(stats.rows.items()):
+            self.stdout.write(f"{table:>20}: {rows}")
+        for error in stats.errors:
+            self.stderr.write(error)
+        if stats.skipped:
+            self.stderr.write(self.style.WARNING(f"{stats.skipped} registros descartados"))
+        method = 'COPY' if importer.use_copy else 'bulk_create'
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.total_rows} filas importadas en {stats.elapsed:.2f}s "
+            f"({stats.rows_per_second:.0f} filas/s, {method})"
+        ))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from juego.models import Faction, Tournament
+from juego.tournament import create_tournament, run_tournament, standings
+
+
+class Command(BaseCommand):
+    help = "Crea y juega un torneo entre personajes repartiendo los combates entre varios procesos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', default='Torneo', help="Nombre del torneo")
+        parser.add_argument('--format', choices=[c for c, _ in Tournament.FORMAT_CHOICES], default='round_robin',
+                            help="Formato del torneo")
+        parser.add_argument('--scope', choices=[c for c, _ in Tournament.SCOPE_CHOICES], default='all',
+                            help="Enfrentamientos dentro de una facción, entre facciones o todos")
+        parser.add_argument('--faction', type=int, default=None, help="Id de la facción a la que limitar el torneo")
+        parser.add_argument('--seed', type=int, default=None, help="Semilla para obtener resultados reproducibles")
+        parser.add_argument('--workers', type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+        parser.add_argument('--resume', type=int, default=None, help="Id de un torneo interrumpido a reanudar")
+        parser.add_argument('--top', type=int, default=10, help="Número de personajes de la clasificación a mostrar")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                tournament = Tournament.objects.get(pk=options['resume'])
+            except Tournament.DoesNotExist:
+                raise CommandError(f"No existe el torneo {options['resume']}")
+        else:
+            faction = None
+            if options['faction']:
+                try:
+                    faction = Faction.objects.get(pk=options['faction'])
+                except Faction.DoesNotExist:
+                    raise CommandError(f"No existe la facción {options['faction']}")
+            tournament = create_tournament(
+                options['name'], format=options['format'], scope=options['scope'],
+                faction=faction, seed=options['seed'],
+            )
+        self.stdout.write(f"Torneo {tournament.id}: {tournament}")
+
+        start = time.perf_counter()
+
+        def progress(done, total):
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            self.stdout.write(f"  {done}/{total} combates ({rate:.0f}/s)")
+
+        run_tournament(tournament, workers=options['workers'], progress=progress)
+        elapsed = time.perf_counter() - start
+
+        if tournament.format == 'round_robin':
+            for position, row in enumerate(standings(tournament)[:options['top']], start=1):
+                self.stdout.write(f"{position:>3}. {row['winner__name']} ({row['wins']} victorias)")
+
+        champion = tournament.champion.name if tournament.champion else "ninguno"
+        self.stdout.write(self.style.SUCCESS(f"Campeón: {champion}. Torneo jugado en {elapsed:.2f}s"))
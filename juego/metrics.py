@@ -0,0 +1,351 @@
+"""
+Métricas de rendimiento de cada petición.
+
+`juego.middleware.RequestMetricsMiddleware` crea un `RequestMetrics` por petición y lo guarda en
+una variable de contexto; mientras dura la petición se le suman:
+
+- el número de consultas SQL y su tiempo, con una función de `connection.execute_wrapper`
+  que se instala en cada conexión (ver `install_query_recorder`), junto con la huella de cada
+  consulta (el SQL sin valores), para el registro de peticiones lentas;
+- el tiempo de renderizado de plantillas, con el backend `TimedDjangoTemplates`;
+- el tiempo de serialización de las respuestas de la API, con los renderers de `TimedRendererMixin`.
+
+Al terminar, la petición se suma a los histogramas del proceso, por ruta (`view_name`) y
+método. `render_prometheus()` los devuelve en el formato de texto de Prometheus (ruta `/metrics/`).
+
+Cada proceso tiene sus propios histogramas. Con varios workers (gunicorn) cada consulta a
+`/metrics/` la atiende uno cualquiera, así que con `settings.METRICS_DIR` cada proceso guarda
+además sus histogramas en un fichero de ese directorio (como mucho cada `METRICS_FLUSH_INTERVAL`
+segundos y al salir) y `render_prometheus()` devuelve la suma de todos los ficheros. Los de los
+workers que ya han terminado se siguen sumando para que los contadores no bajen; el directorio
+se vacía al arrancar gunicorn (ver gunicorn.conf.py).
+"""
+import atexit
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+# Límites de los histogramas (en segundos y en número de consultas)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Histogramas que se guardan de cada petición: nombre -> (ayuda, límites)
+HISTOGRAMS = {
+    'juego_request_duration_seconds': ('Latencia total de la petición', LATENCY_BUCKETS),
+    'juego_request_queries': ('Consultas SQL por petición', QUERY_BUCKETS),
+    'juego_request_db_seconds': ('Tiempo en la base de datos por petición', LATENCY_BUCKETS),
+    'juego_request_serialization_seconds': ('Tiempo serializando la respuesta de la API', LATENCY_BUCKETS),
+    'juego_request_template_seconds': ('Tiempo renderizando plantillas', LATENCY_BUCKETS),
+}
+
+# Segundos como mucho entre dos escrituras de los histogramas del proceso en METRICS_DIR
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Métricas de la petición en curso (None fuera de una petición)
+current_request = contextvars.ContextVar('juego_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Tiempos y consultas de una petición.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.times = defaultdict(float)  # 'db', 'serialization', 'template' -> segundos
+        self.fingerprints = defaultdict(lambda: [0, 0.0])  # huella -> [veces, segundos]
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.times['db'] += duration
+        entry = self.fingerprints[sql_fingerprint(sql)]
+        entry[0] += 1
+        entry[1] += duration
+
+    def slowest_queries(self, limit=5):
+        """Huellas con más tiempo acumulado: [(huella, veces, segundos)]"""
+        ranked = sorted(self.fingerprints.items(), key=lambda item: item[1][1], reverse=True)
+        return [(fingerprint, count, seconds) for fingerprint, (count, seconds) in ranked[:limit]]
+
+
+@contextmanager
+def record_time(kind):
+    """Suma el tiempo del bloque a la petición en curso (si la hay)"""
+    metrics = current_request.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.times[kind] += time.perf_counter() - start
+
+
+# -- Huella de las consultas ------------------------------------------------------------------
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'%s')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def sql_fingerprint(sql):
+    """
+    SQL sin valores: parámetros, cadenas y números se sustituyen por '?' y las listas de IN por 'IN (...)'.
+    Las consultas que solo se diferencian en los valores tienen la misma huella.
+    """
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _record_query(execute, sql, params, many, context):
+    """`execute_wrapper` que suma cada consulta a la petición en curso"""
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Instala `_record_query` en una conexión (receptor de `connection_created`). Se queda
+    instalado: fuera de una petición no hace nada.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorders():
+    """Instala `_record_query` en las conexiones ya creadas del hilo actual"""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+# -- Plantillas y serialización ---------------------------------------------------------------
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with record_time('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Backend de plantillas de Django que mide el tiempo de renderizado de cada plantilla.
+    """
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+
+class TimedRendererMixin:
+    """Mide el tiempo que tarda un renderer de DRF en serializar la respuesta"""
+
+    def render(self, *args, **kwargs):
+        with record_time('serialization'):
+            return super().render(*args, **kwargs)
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class TimedBrowsableAPIRenderer(TimedRendererMixin, BrowsableAPIRenderer):
+    pass
+
+
+# -- Histogramas ------------------------------------------------------------------------------
+
+class Histogram:
+    """
+    Histograma acumulado como los de Prometheus: cuántas observaciones hay por debajo de cada límite.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+_histograms = {}  # (nombre, ruta, método) -> Histogram
+_requests = defaultdict(int)  # (ruta, método, código) -> peticiones
+_lock = threading.Lock()
+_flush = {'pid': None, 'name': None, 'last': 0.0}  # Fichero del proceso en METRICS_DIR y última escritura
+
+
+def observe_request(route, method, status, metrics, duration):
+    """Suma una petición terminada a los histogramas del proceso"""
+    values = {
+        'juego_request_duration_seconds': duration,
+        'juego_request_queries': metrics.queries,
+        'juego_request_db_seconds': metrics.times['db'],
+        'juego_request_serialization_seconds': metrics.times['serialization'],
+        'juego_request_template_seconds': metrics.times['template'],
+    }
+    with _lock:
+        _requests[route, method, status] += 1
+        for name, value in values.items():
+            key = (name, route, method)
+            if key not in _histograms:
+                _histograms[key] = Histogram(HISTOGRAMS[name][1])
+            _histograms[key].observe(value)
+    if time.monotonic() - _flush['last'] >= METRICS_FLUSH_INTERVAL:
+        flush_metrics()
+
+
+def reset_metrics():
+    """Vacía los histogramas del proceso (y su fichero en METRICS_DIR)"""
+    with _lock:
+        _histograms.clear()
+        _requests.clear()
+    path = _process_file()
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+# -- Varios procesos --------------------------------------------------------------------------
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _process_file():
+    """
+    Fichero de los histogramas del proceso en METRICS_DIR (None sin METRICS_DIR). El nombre lleva
+    el pid y un sufijo aleatorio: un proceso nuevo con el pid de otro ya terminado no lo pisa.
+    """
+    directory = _metrics_dir()
+    if not directory:
+        return None
+    if _flush['pid'] != os.getpid():
+        _flush.update(pid=os.getpid(), name=f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        atexit.register(flush_metrics)
+    return os.path.join(directory, _flush['name'])
+
+
+def _snapshot():
+    """Histogramas del proceso en un formato que se puede guardar en JSON"""
+    with _lock:
+        return {
+            'requests': [[*key, count] for key, count in _requests.items()],
+            'histograms': [[*key, list(h.counts), h.count, h.sum] for key, h in _histograms.items()],
+        }
+
+
+def flush_metrics():
+    """Guarda los histogramas del proceso en su fichero de METRICS_DIR (si lo hay)"""
+    path = _process_file()
+    if path is None:
+        return
+    _flush['last'] = time.monotonic()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Se escribe aparte y se sustituye: quien lee nunca ve un fichero a medias
+    tmp = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as file:
+        json.dump(_snapshot(), file)
+    os.replace(tmp, path)
+
+
+def _merge(snapshots):
+    """Suma los histogramas de varios procesos. Devuelve (peticiones, histogramas)"""
+    requests, histograms = defaultdict(int), {}
+    for snapshot in snapshots:
+        for route, method, status, count in snapshot['requests']:
+            requests[route, method, status] += count
+        for name, route, method, counts, count, total in snapshot['histograms']:
+            if name not in HISTOGRAMS:
+                continue
+            histogram = histograms.setdefault((name, route, method), Histogram(HISTOGRAMS[name][1]))
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.count += count
+            histogram.sum += total
+    return requests, histograms
+
+
+def _all_snapshots():
+    """Histogramas de todos los procesos: los ficheros de METRICS_DIR (con el de este al día)"""
+    flush_metrics()
+    directory = _metrics_dir()
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                yield json.load(file)
+        except (FileNotFoundError, ValueError):
+            continue  # Borrado o vaciado mientras tanto
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """
+    Métricas en el formato de texto de Prometheus: las de todos los procesos con METRICS_DIR y
+    las de este sin él.
+    """
+    requests, histograms = _merge(_all_snapshots() if _metrics_dir() else [_snapshot()])
+    lines = [
+        '# HELP juego_requests_total Peticiones atendidas',
+        '# TYPE juego_requests_total counter',
+    ]
+    for (route, method, status), count in sorted(requests.items()):
+        lines.append(f'juego_requests_total{{{_labels(route=route, method=method, status=status)}}} {count}')
+    for name, (help_text, _) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (histogram_name, route, method), histogram in sorted(histograms.items()):
+            if histogram_name != name:
+                continue
+            labels = _labels(route=route, method=method)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{_number(bound)}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,78 @@
+"""
+Middleware de la aplicación.
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from juego.metrics import RequestMetrics, current_request, install_query_recorder, install_query_recorders, observe_request
+
+logger = logging.getLogger('juego.metrics')
+
+# Peticiones más lentas que esto (en segundos) se registran con sus consultas más costosas
+DEFAULT_SLOW_REQUEST_SECONDS = 0.5
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición (latencia total, consultas SQL, tiempo en la base de datos, en plantillas
+    y serializando) y la suma a los histogramas del proceso por ruta y método (ver `juego.metrics`).
+    Las peticiones lentas (`SLOW_REQUEST_SECONDS`) se registran en el logger `juego.metrics`
+    con la huella de sus consultas más costosas.
+
+    Funciona con vistas síncronas y asíncronas. En las respuestas en streaming solo se mide hasta
+    que empieza la respuesta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.slow_request_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', DEFAULT_SLOW_REQUEST_SECONDS)
+        # Contar las consultas de las conexiones que se abran a partir de ahora y de las ya abiertas
+        connection_created.connect(install_query_recorder, dispatch_uid='juego.metrics')
+        install_query_recorders()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        duration = metrics.elapsed
+        route = request.resolver_match.view_name if request.resolver_match else '<sin ruta>'
+        observe_request(route, request.method, response.status_code, metrics, duration)
+        if duration >= self.slow_request_seconds:
+            queries = '\n'.join(
+                f'  {count}x {seconds * 1000:.1f} ms  {fingerprint}'
+                for fingerprint, count, seconds in metrics.slowest_queries()
+            )
+            logger.warning(
+                'Petición lenta: %s %s (%s) %d en %.0f ms, %d consultas (%.0f ms en la base de datos, '
+                '%.0f ms en plantillas, %.0f ms serializando)\n%s',
+                request.method, request.path, route, response.status_code, duration * 1000, metrics.queries,
+                metrics.times['db'] * 1000, metrics.times['template'] * 1000, metrics.times['serialization'] * 1000,
+                queries,
+            )
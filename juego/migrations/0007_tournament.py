@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juego', '0006_auto_20250218_0926'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('format', models.CharField(choices=[('round_robin', 'Todos contra todos'), ('elimination', 'Eliminatoria')], default='round_robin', max_length=20)),
+                ('scope', models.CharField(choices=[('all', 'Todos los personajes'), ('within', 'Solo dentro de la misma facción'), ('across', 'Solo entre facciones distintas')], default='all', max_length=20)),
+                ('seed', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En curso'), ('finished', 'Terminado')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('champion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournaments_won', to='juego.character')),
+                ('faction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournaments', to='juego.faction')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TournamentMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveIntegerField(default=1)),
+                ('turns', models.PositiveIntegerField(blank=True, null=True)),
+                ('played', models.BooleanField(default=False)),
+                ('character1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournament_matches1', to='juego.character')),
+                ('character2', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tournament_matches2', to='juego.character')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='juego.tournament')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournament_wins', to='juego.character')),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:47
+
+import juego.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juego', '0008_battlelog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='armor',
+            name='image',
+            field=models.ImageField(blank=True, default='armors/default_armor.jpg', null=True, storage=juego.storage.get_media_storage, upload_to='armors/'),
+        ),
+        migrations.AlterField(
+            model_name='character',
+            name='image',
+            field=models.ImageField(blank=True, default='characters/default_character.jpg', null=True, storage=juego.storage.get_media_storage, upload_to='characters/'),
+        ),
+        migrations.AlterField(
+            model_name='weapon',
+            name='image',
+            field=models.ImageField(blank=True, default='weapons/default_weapon.jpg', null=True, storage=juego.storage.get_media_storage, upload_to='weapons/'),
+        ),
+    ]
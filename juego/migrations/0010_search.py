@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:51
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Tablas de la búsqueda y su segundo campo (el primero es `name`, con más peso)
+SEARCH_TABLES = {
+    'juego_character': 'location',
+    'juego_faction': 'location',
+    'juego_weapon': 'description',
+    'juego_armor': 'description',
+}
+
+
+def vector_sql(row, field):
+    return (f"setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') || "
+            f"setweight(to_tsvector('simple', coalesce({row}{field}, '')), 'B')")
+
+
+def create_search_objects(apps, schema_editor):
+    """
+    Solo en PostgreSQL: extensión pg_trgm, trigger que mantiene `search_vector` al insertar o
+    modificar (también con `bulk_create` y COPY), valores de las filas existentes e índices GIN
+    del vector y de trigramas de los dos campos. En SQLite la búsqueda usa LIKE (ver juego/search.py).
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, field in SEARCH_TABLES.items():
+        schema_editor.execute(f'''
+            CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector_sql('NEW.', field)};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        schema_editor.execute(f'''
+            CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()
+        ''')
+        schema_editor.execute(f'UPDATE {table} SET search_vector = {vector_sql("", field)}')
+        schema_editor.execute(f'CREATE INDEX {table}_search_vector_gin ON {table} USING gin (search_vector)')
+        schema_editor.execute(f'CREATE INDEX {table}_name_trgm ON {table} USING gin (name gin_trgm_ops)')
+        schema_editor.execute(f'CREATE INDEX {table}_{field}_trgm ON {table} USING gin ({field} gin_trgm_ops)')
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, field in SEARCH_TABLES.items():
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_vector ON {table}')
+        schema_editor.execute(f'DROP FUNCTION IF EXISTS {table}_search_vector()')
+        for index in ('search_vector_gin', 'name_trgm', f'{field}_trgm'):
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{index}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juego', '0009_image_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='armor',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='faction',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='weapon',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juego', '0010_search'),
+    ]
+
+    # Primero los índices compuestos y después se quitan los de las claves ajenas que ya cubren
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['equipped_weapon', 'equipped_armor'], name='character_equipment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentmatch',
+            index=models.Index(fields=['tournament', 'round'], name='tournament_match_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentmatch',
+            index=models.Index(condition=models.Q(('played', False)), fields=['tournament', 'id'], name='tournament_match_pending_idx'),
+        ),
+        migrations.AlterField(
+            model_name='character',
+            name='equipped_weapon',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='equipped_weapon', to='juego.weapon'),
+        ),
+        migrations.AlterField(
+            model_name='relationship',
+            name='character1',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='relationships1', to='juego.character'),
+        ),
+        migrations.AlterField(
+            model_name='tournamentmatch',
+            name='tournament',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='juego.tournament'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juego', '0011_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tournamentmatch',
+            name='character1',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournament_matches1', to='juego.character'),
+        ),
+        migrations.AlterField(
+            model_name='tournamentmatch',
+            name='character2',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tournament_matches2', to='juego.character'),
+        ),
+    ]
@@ -1,13 +1,18 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+import numpy as np
 import random
 # Create your models here.
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+
+from juego.storage import get_media_storage
 
 
 class Faction(models.Model):
     name = models.CharField(max_length=100, unique=True)
     location = models.CharField(max_length=100)
+    search_vector = SearchVectorField(null=True, editable=False)  # En PostgreSQL lo mantiene un trigger (ver juego/search.py)
 
     def __str__(self):
         return f"{self.name} ({self.location})"
@@ -18,7 +23,8 @@ class Weapon(models.Model):
     damage = models.IntegerField(default=0)
     critic = models.IntegerField(blank=True, null=True)
     accuracy = models.IntegerField(blank=True, null=True)
-    image = models.ImageField(upload_to='weapons/', null=True, blank=True, default='weapons/default_weapon.jpg')
+    image = models.ImageField(upload_to='weapons/', storage=get_media_storage, null=True, blank=True, default='weapons/default_weapon.jpg')
+    search_vector = SearchVectorField(null=True, editable=False)  # En PostgreSQL lo mantiene un trigger (ver juego/search.py)
 
 
     def save(self, *args, **kwargs):
@@ -28,6 +34,22 @@ class Weapon(models.Model):
             self.accuracy = random.randint(40, 100)
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def fill_random_stats(weapons, rng=None):
+        """
+        Igual que `save()` pero para una lista de armas sin guardar (por ejemplo antes de un
+        `bulk_create`): genera de una vez el crítico y la precisión de las que no los tienen.
+        `rng` (un `numpy.random.Generator`) permite obtener valores reproducibles.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        critics = rng.integers(0, 90, size=len(weapons), endpoint=True)
+        accuracies = rng.integers(40, 100, size=len(weapons), endpoint=True)
+        for weapon, critic, accuracy in zip(weapons, critics.tolist(), accuracies.tolist()):
+            if weapon.critic is None:
+                weapon.critic = critic
+            if weapon.accuracy is None:
+                weapon.accuracy = accuracy
+
     def __str__(self):
         return f"{self.name} (Daño: {self.damage})"
 
@@ -35,7 +57,8 @@ class Armor(models.Model):
     name = models.CharField(max_length=100)
     description = models.CharField(max_length=100, default="Tan vago como siempre... sin descripción")
     defense = models.IntegerField(default=0)
-    image = models.ImageField(upload_to='armors/', null=True, blank=True, default='armors/default_armor.jpg')
+    image = models.ImageField(upload_to='armors/', storage=get_media_storage, null=True, blank=True, default='armors/default_armor.jpg')
+    search_vector = SearchVectorField(null=True, editable=False)  # En PostgreSQL lo mantiene un trigger (ver juego/search.py)
 
 
     def __str__(self):
@@ -45,14 +68,21 @@ class Character(models.Model):
     name = models.CharField(max_length=50)
     location = models.CharField(max_length=100)
     faction = models.ForeignKey(Faction, on_delete=models.SET_NULL, null=True, blank=True, related_name="members")
-    equipped_weapon = models.ForeignKey(Weapon, on_delete=models.SET_NULL, null=True, blank=True,related_name="equipped_weapon")
+    equipped_weapon = models.ForeignKey(Weapon, on_delete=models.SET_NULL, null=True, blank=True,related_name="equipped_weapon", db_index=False)  # Lo cubre `character_equipment_idx`
     equipped_armor = models.ForeignKey(Armor, on_delete=models.SET_NULL, null=True, blank=True, related_name="equipped_armor")
-    image = models.ImageField(upload_to='characters/', null=True, blank=True, default='characters/default_character.jpg')
+    image = models.ImageField(upload_to='characters/', storage=get_media_storage, null=True, blank=True, default='characters/default_character.jpg')
+    search_vector = SearchVectorField(null=True, editable=False)  # En PostgreSQL lo mantiene un trigger (ver juego/search.py)
 
     def __str__(self):
         faction_name = self.faction.name if self.faction else "Sin Facción"
         return f"{self.name} ({faction_name})"
 
+    class Meta:
+        indexes = [
+            # Filtro por arma y armadura equipadas (EquipmentCharacterFormView); también sirve para el arma sola
+            models.Index(fields=['equipped_weapon', 'equipped_armor'], name='character_equipment_idx'),
+        ]
+
 class Inventory(models.Model):
     character = models.OneToOneField(Character, on_delete=models.CASCADE, related_name="inventory")
     weapons = models.ManyToManyField(Weapon, blank=True, related_name="inventory_weapons")
@@ -61,7 +91,7 @@ class Inventory(models.Model):
         return f"Equipo de {self.character.name}, Armas: {[weapon.name for weapon in self.weapons.all()]}, Armadura: {[armor.name for armor in self.armors.all()]}"
 
 class Relationship(models.Model):
-    character1 = models.ForeignKey(Character, related_name='relationships1', on_delete=models.CASCADE)
+    character1 = models.ForeignKey(Character, related_name='relationships1', on_delete=models.CASCADE, db_index=False)  # Lo cubre el índice único
     character2 = models.ForeignKey(Character, related_name='relationships2', on_delete=models.CASCADE)
     relationship_type = models.CharField(max_length=50, choices=[
         ('friend', 'Amigo'),
@@ -81,3 +111,68 @@ class Relationship(models.Model):
     class Meta:
         unique_together = [['character1', 'character2']]
 
+
+class Tournament(models.Model):
+    FORMAT_CHOICES = [
+        ('round_robin', 'Todos contra todos'),
+        ('elimination', 'Eliminatoria'),
+    ]
+    SCOPE_CHOICES = [
+        ('all', 'Todos los personajes'),
+        ('within', 'Solo dentro de la misma facción'),
+        ('across', 'Solo entre facciones distintas'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En curso'),
+        ('finished', 'Terminado'),
+    ]
+    name = models.CharField(max_length=100)
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default='round_robin')
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, default='all')
+    faction = models.ForeignKey(Faction, on_delete=models.SET_NULL, null=True, blank=True, related_name="tournaments")
+    seed = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    champion = models.ForeignKey(Character, on_delete=models.SET_NULL, null=True, blank=True, related_name="tournaments_won")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.get_format_display()})"
+
+class TournamentMatch(models.Model):
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name="matches", db_index=False)  # Lo cubre `tournament_match_round_idx`
+    round = models.PositiveIntegerField(default=1)
+    # Al borrar un personaje el combate se conserva sin él: si estaba pendiente lo gana el rival
+    character1 = models.ForeignKey(Character, on_delete=models.SET_NULL, related_name="tournament_matches1", null=True, blank=True)
+    character2 = models.ForeignKey(Character, on_delete=models.SET_NULL, related_name="tournament_matches2", null=True, blank=True)  # Sin rival: pasa de ronda
+    winner = models.ForeignKey(Character, on_delete=models.SET_NULL, null=True, blank=True, related_name="tournament_wins")
+    turns = models.PositiveIntegerField(null=True, blank=True)
+    played = models.BooleanField(default=False)
+
+    def __str__(self):
+        name = self.character1.name if self.character1 else "Personaje borrado"
+        rival = self.character2.name if self.character2 else "Pasa de ronda"
+        return f"{self.tournament.name} R{self.round}: {name} - {rival}"
+
+    class Meta:
+        indexes = [
+            # Combates de una ronda y última ronda de un torneo
+            models.Index(fields=['tournament', 'round'], name='tournament_match_round_idx'),
+            # Combates pendientes de un torneo, en orden (solo los no jugados: el índice encoge al avanzar el torneo)
+            models.Index(fields=['tournament', 'id'], condition=models.Q(played=False), name='tournament_match_pending_idx'),
+        ]
+
+class BattleLog(models.Model):
+    character1 = models.ForeignKey(Character, on_delete=models.SET_NULL, null=True, blank=True, related_name="battle_logs1")
+    character2 = models.ForeignKey(Character, on_delete=models.SET_NULL, null=True, blank=True, related_name="battle_logs2")
+    winner = models.ForeignKey(Character, on_delete=models.SET_NULL, null=True, blank=True, related_name="battle_logs_won")
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="battle_logs")
+    seed = models.BigIntegerField()
+    stats = models.JSONField()  # Estadísticas de combate de los dos personajes al empezar la batalla
+    turns = models.BinaryField()  # Turnos empaquetados (ver juego.battle.pack_turn)
+    turn_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        names = [s['name'] for s in self.stats]
+        return f"{names[0]} vs {names[1]} ({self.turn_count} turnos)"
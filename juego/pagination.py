@@ -0,0 +1,18 @@
+"""
+Paginación de la API.
+
+Todas las listas de los ViewSets se paginan por cursor sobre la clave primaria: cada página
+se obtiene con `WHERE id > último_id ORDER BY id LIMIT n`, que usa el índice de la clave
+primaria y cuesta lo mismo en la primera página que en la última (a diferencia de OFFSET).
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Paginación por cursor ordenada por id. El tamaño de página se puede cambiar con `page_size`.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
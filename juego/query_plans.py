@@ -0,0 +1,134 @@
+"""
+Regresiones de los planes de las consultas más usadas.
+
+Se genera un mundo sintético grande (con `juego.benchmarks.synthetic_world`: en una transacción
+que se deshace al terminar y con una caché propia), se actualizan las estadísticas del planificador (`ANALYZE`) y se obtiene
+el plan (`EXPLAIN`) de cada consulta de `HOT_QUERIES`. Una consulta falla si el plan recorre
+entera (sin índice) alguna de sus tablas vigiladas: `Seq Scan` en PostgreSQL o `SCAN <tabla>` sin
+índice en SQLite. Así un índice borrado o una consulta que deja de poder usarlo se detectan
+antes de llegar a producción, donde las tablas son grandes.
+
+Solo se vigilan las tablas grandes de cada consulta: en las pequeñas (armas, armaduras) recorrer
+la tabla entera es lo más rápido y el planificador hace bien en elegirlo.
+
+Lo usa el comando `manage.py check_query_plans`.
+"""
+import re
+from typing import Callable, NamedTuple
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from juego.benchmarks import synthetic_world
+from juego.models import Character, Faction, Relationship, TournamentMatch
+from juego.tournament import CHUNK_SIZE, create_tournament, tournament_characters
+
+# Número de personajes del mundo con el que se obtienen los planes
+QUERY_PLAN_SIZE = 10000
+
+# Torneos del mundo (para que filtrar por torneo sea selectivo)
+QUERY_PLAN_TOURNAMENTS = 5
+
+# Personajes de una página de la API de personajes
+PAGE_SIZE = 20
+
+# Recorrido completo de una tabla: `Seq Scan on juego_character` (PostgreSQL) o
+# `SCAN juego_character` sin `USING ... INDEX` (SQLite)
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)(?! USING INTEGER PRIMARY KEY)'),
+}
+
+
+class HotQuery(NamedTuple):
+    """
+    Consulta cuyo plan se comprueba. `queryset` la construye a partir de los objetos de ejemplo;
+    `tables` son las tablas que no puede recorrer enteras.
+    """
+    name: str
+    queryset: Callable
+    tables: tuple
+
+
+HOT_QUERIES = [
+    # EquipmentCharacterFormView
+    HotQuery('equipment_weapon_and_armor', lambda f: Character.objects.select_related('equipped_weapon', 'equipped_armor')
+             .filter(equipped_weapon=f['weapon'], equipped_armor=f['armor']), ('juego_character',)),
+    HotQuery('equipment_weapon', lambda f: Character.objects.select_related('equipped_weapon', 'equipped_armor')
+             .filter(equipped_weapon=f['weapon']), ('juego_character',)),
+    HotQuery('equipment_armor', lambda f: Character.objects.select_related('equipped_weapon', 'equipped_armor')
+             .filter(equipped_armor=f['armor']), ('juego_character',)),
+    # CharacterSerializerAll.get_relationships y CharacterListSerializer
+    HotQuery('character_relationships', lambda f: Relationship.objects.filter(
+        Q(character1=f['character']) | Q(character2=f['character'])).order_by('id'), ('juego_relationship',)),
+    HotQuery('page_relationships', lambda f: Relationship.objects.filter(
+        Q(character1_id__in=f['page']) | Q(character2_id__in=f['page'])).order_by('id'), ('juego_relationship',)),
+    # Listado de facciones por nombre (índice único de `name`)
+    HotQuery('factions_by_name', lambda f: Faction.objects.order_by('name')[:PAGE_SIZE], ('juego_faction',)),
+    HotQuery('faction_members', lambda f: Character.objects.filter(faction=f['faction']), ('juego_character',)),
+    # Torneos (juego.tournament)
+    HotQuery('tournament_characters', lambda f: tournament_characters(f['tournament']), ('juego_character',)),
+    HotQuery('tournament_pending_matches', lambda f: TournamentMatch.objects.filter(
+        tournament=f['tournament'], played=False, id__gt=0).order_by('id')[:CHUNK_SIZE], ('juego_tournamentmatch',)),
+    HotQuery('tournament_round', lambda f: TournamentMatch.objects.filter(
+        tournament=f['tournament'], round=1), ('juego_tournamentmatch',)),
+]
+
+
+def add_fixtures(fixtures):
+    """
+    Completa los objetos de ejemplo de los benchmarks (la facción, el arma y la armadura más usadas)
+    con los de las consultas de torneos y relaciones
+    """
+    for i in range(QUERY_PLAN_TOURNAMENTS):
+        create_tournament(f'Torneo {i}', format='elimination', seed=i)
+    fixtures.update({
+        'character': Character.objects.annotate(n=Count('relationships1')).order_by('-n', 'id').first(),
+        'page': list(Character.objects.order_by('id').values_list('id', flat=True)[:PAGE_SIZE]),
+        # Un torneo de todos los personajes los lee todos: el que se comprueba es el de una facción
+        'tournament': create_tournament('Torneo de facción', format='elimination', faction=fixtures['faction'], seed=0),
+    })
+    return fixtures
+
+
+def explain(queryset):
+    """Plan de una consulta en el formato de texto de la base de datos"""
+    return queryset.explain()
+
+
+def sequential_scans(plan, tables, vendor=None):
+    """Tablas de `tables` que el plan recorre enteras"""
+    pattern = SEQUENTIAL_SCAN.get(vendor or connection.vendor)
+    if pattern is None:
+        return []
+    return sorted({table for table in pattern.findall(plan) if table in tables})
+
+
+def analyze():
+    """Actualiza las estadísticas del planificador con los datos recién generados"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def run_query_plans(size=QUERY_PLAN_SIZE, progress=None):
+    """
+    Obtiene el plan de cada consulta de `HOT_QUERIES` con un mundo de `size` personajes, en una
+    transacción que se deshace al terminar. Devuelve {consulta: {'plan', 'sequential_scans'}}.
+    """
+    results = {}
+    # Con facciones pequeñas, como las reales, para que filtrar por facción sea selectivo
+    with synthetic_world(size, factions=max(5, size // 20)) as fixtures:
+        add_fixtures(fixtures)
+        analyze()
+        for query in HOT_QUERIES:
+            plan = explain(query.queryset(fixtures))
+            results[query.name] = {'plan': plan, 'sequential_scans': sequential_scans(plan, query.tables)}
+            if progress:
+                progress(query, results[query.name])
+    return results
+
+
+def plan_regressions(results):
+    """Textos con las consultas que recorren enteras alguna de sus tablas vigiladas"""
+    return [f"{name}: recorre entera {', '.join(result['sequential_scans'])}"
+            for name, result in sorted(results.items()) if result['sequential_scans']]
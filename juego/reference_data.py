@@ -0,0 +1,152 @@
+"""
+Caché de los datos de referencia: facciones, armas y armaduras.
+
+Son tablas pequeñas que casi no cambian pero que se leen enteras en muchas páginas (los
+desplegables de los formularios y los listados). La lista completa de cada modelo se guarda en
+la caché bajo una versión que se renueva cada vez que se guarda o se borra un objeto del modelo
+(ver `juego.signals`) o tras las escrituras en bloque, que no envían señales. Mientras no cambie
+la versión, leer los datos no toca la base de datos.
+
+- `reference_objects(Weapon)`: todas las armas (ordenadas por id), en lugar de `Weapon.objects.all()`.
+- `reference_by_pk(Weapon)`: las mismas, por id.
+- `ReferenceChoiceField` y `ReferenceMultipleChoiceField`: campos de formulario que sacan las
+  opciones y validan los valores con la caché cuando su queryset es el del modelo entero.
+"""
+from django import forms
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+
+from juego.cache_versions import bump_cache_versions, cache_version
+from juego.models import Armor, Faction, Weapon
+
+# Modelos cuyos objetos se guardan en la caché
+REFERENCE_MODELS = (Faction, Weapon, Armor)
+
+# Clave de la caché con la versión de los datos de un modelo
+REFERENCE_VERSION_KEY = 'juego:reference_version:{}'
+
+# Clave de la caché con los objetos de un modelo para una versión
+REFERENCE_CACHE_KEY = 'juego:reference:{}:{}'
+
+# Tiempo (en segundos) que se guardan los objetos de cada versión
+REFERENCE_TIMEOUT = 60 * 60
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def reference_version(model):
+    """
+    Devuelve la versión actual de los datos de un modelo (se crea si no existe).
+    """
+    return cache_version(REFERENCE_VERSION_KEY.format(_label(model)))
+
+
+def bump_reference_version(*models):
+    """
+    Renueva la versión de los datos de los modelos indicados: los objetos guardados en la caché dejan de valer.
+    """
+    bump_cache_versions([REFERENCE_VERSION_KEY.format(_label(model)) for model in models])
+
+
+def reference_objects(model):
+    """
+    Todos los objetos de un modelo de referencia, ordenados por id. Solo consulta la base de
+    datos la primera vez tras un cambio.
+    """
+    key = REFERENCE_CACHE_KEY.format(_label(model), reference_version(model))
+    return cache.get_or_set(key, lambda: list(model.objects.order_by('pk')), REFERENCE_TIMEOUT)
+
+
+def reference_by_pk(model):
+    """
+    Los objetos de `reference_objects(model)` por id.
+    """
+    return {obj.pk: obj for obj in reference_objects(model)}
+
+
+class ReferenceChoiceIterator(ModelChoiceIterator):
+    """
+    Opciones de un campo de referencia sacadas de la caché en lugar de recorrer el queryset.
+    """
+
+    def __iter__(self):
+        if not self.field.uses_reference_cache():
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in reference_objects(self.queryset.model):
+            yield self.choice(obj)
+
+    def __len__(self):
+        if not self.field.uses_reference_cache():
+            return super().__len__()
+        return len(reference_objects(self.queryset.model)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        if not self.field.uses_reference_cache():
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(reference_objects(self.queryset.model))
+
+
+class ReferenceFieldMixin:
+    iterator = ReferenceChoiceIterator
+
+    def uses_reference_cache(self):
+        """
+        La caché solo vale si el queryset es el del modelo entero (sin filtros, como el
+        `Weapon.objects.none()` o el inventario de un personaje) y el valor es el id.
+        """
+        queryset = self.queryset
+        return (queryset is not None and queryset.model in REFERENCE_MODELS and self.to_field_name is None
+                and not queryset.query.has_filters())
+
+    def _reference_object(self, value):
+        """Objeto con el id `value` o None si no existe (o no es un id)"""
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            return reference_by_pk(self.queryset.model).get(int(value))
+        except (TypeError, ValueError):
+            return None
+
+
+class ReferenceChoiceField(ReferenceFieldMixin, forms.ModelChoiceField):
+    """
+    `ModelChoiceField` para facciones, armas o armaduras que no consulta la base de datos.
+    """
+
+    def to_python(self, value):
+        if value in self.empty_values or not self.uses_reference_cache():
+            return super().to_python(value)
+        obj = self._reference_object(value)
+        if obj is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                  params={'value': value})
+        return obj
+
+
+class ReferenceMultipleChoiceField(ReferenceFieldMixin, forms.ModelMultipleChoiceField):
+    """
+    `ModelMultipleChoiceField` para facciones, armas o armaduras que no consulta la base de datos.
+    Los valores limpios son una lista de objetos en lugar de un queryset.
+    """
+
+    def _check_values(self, value):
+        if not self.uses_reference_cache():
+            return super()._check_values(value)
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+        objects = []
+        for pk in value:
+            obj = self._reference_object(pk)
+            if obj is None:
+                raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                      params={'value': pk})
+            objects.append(obj)
+        return sorted(objects, key=lambda obj: obj.pk)
@@ -0,0 +1,142 @@
+"""
+Grafo de relaciones entre personajes.
+
+Las relaciones se cargan con una sola consulta en un índice de adyacencia en memoria
+(tipo de relación -> personaje -> vecinos). Las relaciones no tienen dirección: si A es
+aliado de B, B es aliado de A. Sobre el índice se resuelven las consultas de grafo
+(amigos de amigos, camino de aliados más corto, grupos de aliados y enemigos de mis
+enemigos) con recorridos en memoria en lugar de consultas recursivas al ORM.
+
+Cada proceso guarda su propio índice. Al guardar o borrar una relación se renueva una
+versión en la caché (ver `juego.signals`) y el índice se reconstruye en la siguiente consulta.
+"""
+import threading
+from collections import defaultdict, deque
+
+from juego.cache_versions import bump_cache_versions, cache_version
+from juego.models import Relationship
+
+# Tipos de relación que cuentan como aliados al buscar caminos y grupos
+ALLY_TYPES = ('ally', 'friend')
+
+# Tipos de relación que cuentan como enemigos
+ENEMY_TYPES = ('enemy',)
+
+# Clave de la caché con la versión del grafo de relaciones
+RELATIONSHIP_GRAPH_VERSION_KEY = 'juego:relationship_graph_version'
+
+
+class RelationshipGraph:
+    """
+    Índice de adyacencia de las relaciones entre personajes.
+    """
+
+    def __init__(self, edges=()):
+        self._adjacency = defaultdict(lambda: defaultdict(set))
+        for character1_id, character2_id, relationship_type in edges:
+            self._adjacency[relationship_type][character1_id].add(character2_id)
+            self._adjacency[relationship_type][character2_id].add(character1_id)
+
+    @classmethod
+    def from_database(cls):
+        """Construye el grafo con todas las relaciones en una sola consulta"""
+        return cls(Relationship.objects.values_list('character1_id', 'character2_id', 'relationship_type').iterator())
+
+    def neighbors(self, character_id, types):
+        """Personajes relacionados con `character_id` por alguno de los tipos indicados"""
+        result = set()
+        for relationship_type in types:
+            result |= self._adjacency[relationship_type].get(character_id, set())
+        return result
+
+    def friends_of_friends(self, character_id):
+        """
+        Amigos de los amigos del personaje que no son ya sus amigos (ni él mismo).
+        """
+        friends = self.neighbors(character_id, ('friend',))
+        result = set()
+        for friend_id in friends:
+            result |= self.neighbors(friend_id, ('friend',))
+        return result - friends - {character_id}
+
+    def shortest_ally_path(self, source_id, target_id):
+        """
+        Camino más corto entre dos personajes pasando solo por aliados (búsqueda en anchura).
+        Devuelve la lista de ids desde `source_id` hasta `target_id`, o None si no hay camino.
+        """
+        if source_id == target_id:
+            return [source_id]
+        previous = {source_id: None}
+        queue = deque([source_id])
+        while queue:
+            current = queue.popleft()
+            for neighbor in self.neighbors(current, ALLY_TYPES):
+                if neighbor in previous:
+                    continue
+                previous[neighbor] = current
+                if neighbor == target_id:
+                    path = [neighbor]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return path[::-1]
+                queue.append(neighbor)
+        return None
+
+    def ally_components(self):
+        """
+        Grupos de personajes conectados entre sí por relaciones de aliados, de mayor a menor.
+        Los personajes sin aliados no forman grupo.
+        """
+        nodes = set()
+        for relationship_type in ALLY_TYPES:
+            nodes |= self._adjacency[relationship_type].keys()
+
+        components = []
+        seen = set()
+        for start in sorted(nodes):
+            if start in seen:
+                continue
+            component = {start}
+            queue = deque([start])
+            while queue:
+                for neighbor in self.neighbors(queue.popleft(), ALLY_TYPES) - component:
+                    component.add(neighbor)
+                    queue.append(neighbor)
+            seen |= component
+            components.append(sorted(component))
+        return sorted(components, key=len, reverse=True)
+
+    def enemies_of_enemies(self, character_id):
+        """
+        Enemigos de los enemigos del personaje: posibles aliados que no son ya sus enemigos (ni él mismo).
+        """
+        enemies = self.neighbors(character_id, ENEMY_TYPES)
+        result = set()
+        for enemy_id in enemies:
+            result |= self.neighbors(enemy_id, ENEMY_TYPES)
+        return result - enemies - {character_id}
+
+
+_graph = None
+_graph_version = None
+_graph_lock = threading.Lock()
+
+
+def bump_relationship_graph_version():
+    """
+    Renueva la versión del grafo: todos los procesos lo reconstruirán en su siguiente consulta.
+    """
+    bump_cache_versions([RELATIONSHIP_GRAPH_VERSION_KEY])
+
+
+def get_relationship_graph():
+    """
+    Devuelve el grafo de relaciones del proceso, reconstruyéndolo si las relaciones han cambiado.
+    """
+    global _graph, _graph_version
+    version = cache_version(RELATIONSHIP_GRAPH_VERSION_KEY)
+    with _graph_lock:
+        if _graph is None or _graph_version != version:
+            _graph = RelationshipGraph.from_database()
+            _graph_version = version
+        return _graph
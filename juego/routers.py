@@ -0,0 +1,55 @@
+"""
+Réplicas de lectura de la base de datos.
+
+Las réplicas se configuran con DATABASE_REPLICA_URLS (ver tierramedia/database.py) y se llaman
+`replica_1`, `replica_2`... Solo las usan las vistas de solo lectura con `ReadReplicaMixin`
+(`CharacterViewSet` e `InventoryViewSet`): el resto de lecturas y todas las escrituras van a
+`default`, así que nadie lee datos atrasados justo después de escribirlos.
+"""
+import random
+
+from django.conf import settings
+
+REPLICA_PREFIX = 'replica_'
+
+
+def replica_aliases():
+    """Alias de las réplicas configuradas"""
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def get_read_database():
+    """Una réplica al azar, o `default` si no hay réplicas"""
+    replicas = replica_aliases()
+    return random.choice(replicas) if replicas else 'default'
+
+
+class ReadReplicaRouter:
+    """
+    Router de bases de datos: todo va a `default` salvo las consultas de los objetos leídos de
+    una réplica (por ejemplo los `prefetch_related`), que se quedan en la misma réplica.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Las réplicas tienen los mismos datos que la principal
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return not db.startswith(REPLICA_PREFIX)
+
+
+class ReadReplicaMixin:
+    """
+    Para ViewSets de solo lectura: las consultas se hacen en una réplica elegida en cada petición.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().using(get_read_database())
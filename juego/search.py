@@ -0,0 +1,139 @@
+"""
+Búsqueda de personajes, facciones, armas y armaduras.
+
+En PostgreSQL cada tabla tiene una columna `search_vector` (tsvector con el nombre, de más peso,
+y la localización o descripción) que mantiene un trigger al insertar o modificar filas, con un
+índice GIN, e índices GIN de trigramas (`pg_trgm`) sobre los dos campos (ver la migración 0010):
+
+- `search()`: búsqueda de texto (`websearch_to_tsquery`: admite "frases", -exclusiones y OR)
+  ordenada por relevancia (`ts_rank`) más la similitud de trigramas con el nombre, que además
+  encuentra los nombres mal escritos ("Frdo" -> "Frodo").
+- `autocomplete()`: nombres que empiezan por el texto (o se le parecen), los primeros primero.
+  Los resultados se guardan un momento en la caché.
+
+En SQLite (las pruebas) se usa LIKE sobre los mismos campos: encuentra los que contienen todas
+las palabras, sin tolerancia a errores de escritura.
+"""
+import hashlib
+from typing import NamedTuple
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from juego.models import Armor, Character, Faction, Weapon
+
+# Configuración de texto de PostgreSQL (la misma que la del trigger)
+SEARCH_CONFIG = 'simple'
+
+# Resultados por página de la búsqueda y máximo que se puede pedir
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Comienzo máximo de una página: cada tipo lee hasta `offset + limit` filas para mezclarlas por
+# relevancia, así que sin límite un `offset` grande leería las tablas enteras
+MAX_SEARCH_OFFSET = 10 * MAX_SEARCH_PAGE_SIZE
+
+# Resultados del autocompletado, letras mínimas y tiempo (en segundos) que se guardan en la caché
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_TIMEOUT = 60
+
+# Clave de la caché con los resultados del autocompletado (tipos, hash del texto, número de resultados)
+AUTOCOMPLETE_CACHE_KEY = 'juego:autocomplete:{}:{}:{}'
+
+
+class SearchType(NamedTuple):
+    """Modelo en el que se busca y su segundo campo (el primero es `name`)"""
+    model: type
+    detail: str
+
+
+SEARCH_TYPES = {
+    'characters': SearchType(Character, 'location'),
+    'factions': SearchType(Faction, 'location'),
+    'weapons': SearchType(Weapon, 'description'),
+    'armors': SearchType(Armor, 'description'),
+}
+
+
+def _is_postgresql(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_queryset(kind, text):
+    """
+    Queryset con los resultados de un tipo ordenados por relevancia: diccionarios con `id`,
+    `name`, `detail` y `score`.
+    """
+    search_type = SEARCH_TYPES[kind]
+    queryset = search_type.model.objects.all()
+    if _is_postgresql(queryset):
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramWordSimilarity(text, 'name'),
+        ).filter(
+            Q(search_vector=query) | Q(name__trigram_word_similar=text)
+        ).annotate(score=F('rank') + F('similarity'))
+    else:
+        words = Q()
+        for word in text.split():
+            words &= Q(name__icontains=word) | Q(**{f'{search_type.detail}__icontains': word})
+        queryset = queryset.filter(words).annotate(score=Case(
+            When(name__iexact=text, then=Value(3.0)),
+            When(name__istartswith=text, then=Value(2.0)),
+            When(name__icontains=text, then=Value(1.0)),
+            default=Value(0.5),
+            output_field=FloatField(),
+        ))
+    return queryset.order_by('-score', 'pk').values('id', 'name', 'score', detail=F(search_type.detail))
+
+
+def search(text, kinds=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """
+    Busca `text` en los tipos indicados (todos por defecto). Devuelve (resultados de la página,
+    si hay más). Cada resultado lleva su tipo (`type`). No se pasa de `MAX_SEARCH_OFFSET`.
+    """
+    kinds = kinds or list(SEARCH_TYPES)
+    limit = min(limit, MAX_SEARCH_PAGE_SIZE)
+    offset = min(offset, MAX_SEARCH_OFFSET)
+    results = []
+    for kind in kinds:
+        # De cada tipo, los que pueden entrar en la página al mezclarlos por relevancia
+        for row in search_queryset(kind, text)[:offset + limit + 1]:
+            results.append({'type': kind, **row})
+    results.sort(key=lambda row: -row['score'])
+    page = results[offset:offset + limit + 1]
+    return page[:limit], len(page) > limit and offset + limit <= MAX_SEARCH_OFFSET
+
+
+def autocomplete(text, kinds=None, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Hasta `limit` nombres de cada tipo para completar `text`: los que empiezan por el texto
+    primero y después los parecidos. Devuelve [{'type', 'id', 'name'}].
+    """
+    text = text.strip()
+    if len(text) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    kinds = kinds or list(SEARCH_TYPES)
+    key = AUTOCOMPLETE_CACHE_KEY.format(','.join(kinds), hashlib.md5(text.lower().encode()).hexdigest(), limit)
+    results = cache.get(key)
+    if results is not None:
+        return results
+
+    results = []
+    for kind in kinds:
+        queryset = SEARCH_TYPES[kind].model.objects.all()
+        prefix = Case(When(name__istartswith=text, then=Value(1)), default=Value(0))
+        if _is_postgresql(queryset):
+            queryset = queryset.filter(Q(name__istartswith=text) | Q(name__trigram_word_similar=text)).annotate(
+                prefix=prefix, similarity=TrigramWordSimilarity(text, 'name'),
+            ).order_by('-prefix', '-similarity', 'name')
+        else:
+            queryset = queryset.filter(name__icontains=text).annotate(prefix=prefix).order_by('-prefix', 'name')
+        results.extend({'type': kind, 'id': pk, 'name': name}
+                       for pk, name in queryset.values_list('id', 'name')[:limit])
+    cache.set(key, results, AUTOCOMPLETE_TIMEOUT)
+    return results
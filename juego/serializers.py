@@ -2,8 +2,30 @@ from rest_framework import serializers
 from .models import *
 from django.db.models import Q
 
+from juego.bulk import BulkPrimaryKeyRelatedField
 
-class WeaponSerializer(serializers.ModelSerializer):
+
+class SparseFieldsMixin:
+    """
+    Permite al cliente pedir solo algunos campos con `?fields=id,name` en las peticiones GET.
+    Solo afecta al serializador principal de la respuesta (o a cada elemento de una lista);
+    los serializadores anidados devuelven siempre todos sus campos. Los campos desconocidos se ignoran.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        requested = {name.strip() for name in requested.split(',')}
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+
+class WeaponSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
        Serializador para las armas.
        Este serializador convierte los datos de las armas (ID, nombre, daño, crítico, precisión e imagen)
@@ -13,7 +35,7 @@ class WeaponSerializer(serializers.ModelSerializer):
         model = Weapon
         fields = ['id', 'name', 'damage', 'critic', 'accuracy']  # Campos a mostrar: ID, nombre, daño, crítico, precisión e imagen
 
-class ArmorSerializer(serializers.ModelSerializer):
+class ArmorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
         Serializador para las armaduras.
         Este serializador convierte los datos de las armaduras (ID, nombre, defensa e imagen)
@@ -24,7 +46,7 @@ class ArmorSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'defense'] # Campos a mostrar: ID, nombre, daño, defensa e imagen
 
 
-class CharacterMemberSerializer(serializers.ModelSerializer):
+class CharacterMemberSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para los miembros de una facción (personajes).
     Este serializador convierte los datos del personaje (ID y nombre) a formato JSON.
@@ -33,7 +55,7 @@ class CharacterMemberSerializer(serializers.ModelSerializer):
         model = Character
         fields = ['id', 'name']  # Campos a mostrar: ID y nombre del personaje
 
-class FactionSerializer(serializers.ModelSerializer):
+class FactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para la facción.
     Este serializador convierte los datos de la facción (ID, nombre, ubicación y miembros)
@@ -45,7 +67,16 @@ class FactionSerializer(serializers.ModelSerializer):
         model = Faction
         fields = ['id', 'name', 'location', 'members']  # Campos a mostrar: ID, nombre, ubicación y miembros
 
-class RelationshipSerializer(serializers.ModelSerializer):
+class FactionSlimSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializador reducido para la facción: sin la lista de miembros.
+    Se usa en los listados de personajes para no repetir los miembros de la facción en cada personaje.
+    """
+    class Meta:
+        model = Faction
+        fields = ['id', 'name', 'location']  # Campos a mostrar: ID, nombre y ubicación
+
+class RelationshipSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para la relación entre dos personajes.
     Este serializador convierte los datos de una relación entre dos personajes a formato JSON.
@@ -67,7 +98,7 @@ class RelationshipSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Un personaje no puede tener una relación consigo mismo.")
         return data
 
-class InventorySerializer(serializers.ModelSerializer):
+class InventorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para el inventario de un personaje.
     Este serializador convierte los datos de las armas y armaduras del inventario a formato JSON.
@@ -87,25 +118,20 @@ class InventorySerializer(serializers.ModelSerializer):
 
 
 
-class FactionCharacterCountModelSerializer(serializers.ModelSerializer):
+class FactionCharacterCountModelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para obtener el conteo de personajes de una facción.
     Este serializador devuelve el nombre de la facción y la cantidad de personajes que tiene.
+    Las facciones tienen que venir de `faction_stats.with_member_count()`: el conteo sale del
+    COUNT agrupado (`member_count`) en lugar de una consulta por facción.
     """
-    character_count = serializers.SerializerMethodField()
+    character_count = serializers.IntegerField(source='member_count', read_only=True)
 
     class Meta:
         model = Faction
         fields = ['name', 'character_count']  # Campos a mostrar: nombre de la facción y conteo de personajes
 
-    def get_character_count(self, obj):
-        """
-        Método para obtener el número de miembros de una facción.
-        Cuenta cuántos personajes están asociados a esta facción.
-        """
-        return obj.members.count()  # members es el related_name de Character
-
-class InventorySerializerDefault(serializers.ModelSerializer):
+class InventorySerializerDefault(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para el inventario de un personaje.
     Este serializador convierte los datos de las armas y armaduras del inventario a formato JSON.
@@ -125,7 +151,7 @@ class InventorySerializerDefault(serializers.ModelSerializer):
         fields = ['character', 'weapons', 'armors']  # Campos a mostrar: el ID del personaje, las armas y las armaduras
 
 
-class CharacterSerializer(serializers.ModelSerializer):
+class CharacterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para los detalles de un personaje.
     Este serializador convierte los datos del personaje a formato JSON.
@@ -136,7 +162,7 @@ class CharacterSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']  # Campos a mostrar del personaje
 
 
-class RelationshipSerializerDefault(serializers.ModelSerializer):
+class RelationshipSerializerDefault(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para la relación entre dos personajes.
     Este serializador convierte los datos de una relación entre dos personajes a formato JSON.
@@ -160,7 +186,33 @@ class RelationshipSerializerDefault(serializers.ModelSerializer):
         return data  # Retorna los datos validados si no hay errores
 
 
-class CharacterSerializerAll(serializers.ModelSerializer):
+class CharacterListSerializer(serializers.ListSerializer):
+    """
+    Serializador de listas de personajes.
+    Carga las relaciones de todos los personajes de la lista en una sola consulta antes de
+    serializarlos, en lugar de una consulta por personaje.
+    """
+
+    def to_representation(self, data):
+        characters = list(data.all() if hasattr(data, 'all') else data)
+        if 'relationships' not in self.child.fields:
+            return super().to_representation(characters)  # Con `?fields=` sin relaciones no hace falta cargarlas
+        ids = [character.id for character in characters]
+        relationships_by_character = {character_id: [] for character_id in ids}
+        # Misma base de datos que los personajes (una réplica de lectura, ver juego/routers.py)
+        database = characters[0]._state.db if characters else None
+        relationships = Relationship.objects.using(database).filter(
+            Q(character1_id__in=ids) | Q(character2_id__in=ids)
+        ).select_related('character1', 'character2').order_by('id')
+        for relationship in relationships:
+            for character_id in {relationship.character1_id, relationship.character2_id}:
+                if character_id in relationships_by_character:
+                    relationships_by_character[character_id].append(relationship)
+        self.child.context['relationships_by_character'] = relationships_by_character
+        return super().to_representation(characters)
+
+
+class CharacterSerializerAll(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para los detalles de un personaje.
     Este serializador convierte los datos del personaje (incluyendo facción, armas, armaduras,
@@ -184,20 +236,35 @@ class CharacterSerializerAll(serializers.ModelSerializer):
     class Meta:
         model = Character
         fields = ['id', 'name', 'location', 'image', 'faction', 'equipped_weapon', 'equipped_armor', 'relationships', 'inventory']  # Campos a mostrar del personaje
+        list_serializer_class = CharacterListSerializer  # Carga las relaciones de toda la lista de una vez
 
     def get_relationships(self, obj):
         """
         Método para obtener las relaciones de un personaje con otros personajes.
         Utiliza la clase `RelationshipSerializer` para serializar todas las relaciones
         en las que el personaje está involucrado.
+        En un listado se usan las relaciones ya cargadas por `CharacterListSerializer`.
         """
-        relationships = Relationship.objects.filter(
+        relationships_by_character = self.context.get('relationships_by_character')
+        if relationships_by_character is not None and obj.id in relationships_by_character:
+            return RelationshipSerializerDefault(relationships_by_character[obj.id], many=True).data
+
+        relationships = Relationship.objects.using(obj._state.db).filter(
             Q(character1=obj) | Q(character2=obj)  # Filtra las relaciones donde el personaje esté involucrado
-        ).prefetch_related('character1', 'character2')
+        ).prefetch_related('character1', 'character2').order_by('id')
         # Serializa las relaciones y las devuelve en formato JSON
         return RelationshipSerializerDefault(relationships, many=True).data
 
-class CharacterSerializerModify(serializers.ModelSerializer):
+class CharacterSerializerSlim(CharacterSerializerAll):
+    """
+    Serializador de los detalles de un personaje con la facción reducida (sin sus miembros).
+    """
+    faction = FactionSlimSerializer()  # Solo ID, nombre y ubicación de la facción
+
+    class Meta(CharacterSerializerAll.Meta):
+        pass
+
+class CharacterSerializerModify(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para modificar/eliminar un personaje.
     Este serializador convierte los datos del personaje (incluyendo facción, armas, armaduras,
@@ -205,13 +272,13 @@ class CharacterSerializerModify(serializers.ModelSerializer):
     """
 
     # Relación con la facción, acepta el ID de la facción
-    faction = serializers.PrimaryKeyRelatedField(queryset=Faction.objects.all(), required=False) # Permite modificar la facción del personaje. No es obligatorio proporcionarlo.
+    faction = BulkPrimaryKeyRelatedField(queryset=Faction.objects.all(), required=False) # Permite modificar la facción del personaje. No es obligatorio proporcionarlo.
 
     # Relación con el arma equipada, acepta el ID del arma equipada
-    equipped_weapon = serializers.PrimaryKeyRelatedField(queryset=Weapon.objects.all(), required=False) # Permite modificar el arma equipada del personaje. No es obligatorio.
+    equipped_weapon = BulkPrimaryKeyRelatedField(queryset=Weapon.objects.all(), required=False) # Permite modificar el arma equipada del personaje. No es obligatorio.
 
     # Relación con la armadura equipada, acepta el ID de la armadura equipada
-    equipped_armor = serializers.PrimaryKeyRelatedField(queryset=Armor.objects.all(), required=False) # Permite modificar la armadura equipada del personaje. No es obligatorio.
+    equipped_armor = BulkPrimaryKeyRelatedField(queryset=Armor.objects.all(), required=False) # Permite modificar la armadura equipada del personaje. No es obligatorio.
 
 
     class Meta:
@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from juego.battle import bump_equipment_version
+from juego.character_cards import bump_character_card_versions
+from juego.faction_stats import bump_faction_stats_version
+from juego.images import image_derivatives, schedule_derivatives
+from juego.models import Character, Faction, Inventory, Relationship, Weapon, Armor
+from juego.reference_data import bump_reference_version
+from juego.relationship_graph import bump_relationship_graph_version
+from juego.storage import delete_if_orphaned
+
+
+@receiver([post_save, post_delete], sender=Character)
+def character_changed(sender, instance, **kwargs):
+    """
+    Invalida las batallas en curso del personaje si cambia su equipamiento
+    (o cualquier otro dato, por ejemplo al equipar un arma con `character.save()`).
+    También cambian los miembros, localizaciones o equipo de su facción y su tarjeta de la galería.
+    """
+    bump_equipment_version('character', instance.pk)
+    bump_faction_stats_version()
+    bump_character_card_versions([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Inventory)
+def inventory_changed(sender, instance, **kwargs):
+    """
+    Invalida la tarjeta de la galería del dueño del inventario.
+    """
+    bump_character_card_versions([instance.character_id])
+
+
+@receiver(m2m_changed, sender=Inventory.weapons.through)
+@receiver(m2m_changed, sender=Inventory.armors.through)
+def inventory_items_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalida las tarjetas de la galería de los personajes a los que se añaden o quitan armas o
+    armaduras del inventario (desde el inventario o desde el arma o armadura).
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        bump_character_card_versions([instance.character_id])
+        return
+    if action == 'pre_clear':  # Antes de vaciar, los inventarios que tienen el arma o armadura
+        owners = sender.objects.filter(**{instance._meta.model_name: instance}).values_list('inventory__character_id', flat=True)
+    else:
+        owners = Inventory.objects.filter(pk__in=pk_set).values_list('character_id', flat=True)
+    bump_character_card_versions(set(owners))
+
+
+@receiver([post_save, post_delete], sender=Faction)
+def faction_changed(sender, instance, **kwargs):
+    """
+    Invalida las estadísticas de las facciones y la lista de facciones guardadas en la caché.
+    """
+    bump_faction_stats_version()
+    bump_reference_version(Faction)
+
+
+@receiver([post_save, post_delete], sender=Weapon)
+def weapon_changed(sender, instance, **kwargs):
+    """
+    Invalida las batallas en curso de los personajes que llevan el arma modificada y la lista
+    de armas guardada en la caché.
+    """
+    bump_equipment_version('weapon', instance.pk)
+    bump_reference_version(Weapon)
+
+
+@receiver([post_save, post_delete], sender=Armor)
+def armor_changed(sender, instance, **kwargs):
+    """
+    Invalida las batallas en curso de los personajes que llevan la armadura modificada y la
+    lista de armaduras guardada en la caché.
+    """
+    bump_equipment_version('armor', instance.pk)
+    bump_reference_version(Armor)
+
+
+@receiver([post_save, post_delete], sender=Relationship)
+def relationship_changed(sender, instance, **kwargs):
+    """
+    Invalida el grafo de relaciones de todos los procesos.
+    """
+    bump_relationship_graph_version()
+
+
+@receiver(post_save, sender=Character)
+@receiver(post_save, sender=Weapon)
+@receiver(post_save, sender=Armor)
+def image_saved(sender, instance, **kwargs):
+    """
+    Genera en segundo plano las versiones reducidas de la imagen si todavía no las tiene. Las
+    tarjetas de la galería se renuevan cuando están listas.
+    """
+    name = instance.image.name
+    if not name or image_derivatives(name) is not None:
+        return
+    on_generated = None
+    if sender is Character:
+        on_generated = lambda: bump_character_card_versions([instance.pk])
+    schedule_derivatives(name, on_generated)
+
+
+@receiver(post_delete, sender=Character)
+@receiver(post_delete, sender=Weapon)
+@receiver(post_delete, sender=Armor)
+def image_deleted(sender, instance, **kwargs):
+    """
+    Borra la imagen (y sus versiones reducidas) del objeto borrado si ya no la usa nadie más.
+    """
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: delete_if_orphaned(name))
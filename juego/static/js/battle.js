@@ -1,10 +1,19 @@
 document.addEventListener('DOMContentLoaded', function () {
+    // Identificador de la batalla en el almacén de batallas (vacío si todavía no ha empezado)
+    const battleId = document.getElementById('battle_id').value;
+
+    // Último turno mostrado: el canal de eventos puede traer turnos que ya llegaron con el ataque
+    let lastSeq = -1;
+
     // Asegúrate de que los botones estén deshabilitados correctamente en función del turno
-    toggleTurnButtons();
+    toggleTurnButtons(document.getElementById('turn_player').value);
 
     // Función para realizar el ataque
     function realizarAtaque(ataque, attackerId) {
-        // Realizar la solicitud AJAX al servidor
+        // Deshabilitar los botones hasta que llegue el resultado del turno
+        setButtons(false, false);
+
+        // Enviar el ataque a la vista de ataque; la respuesta trae el nuevo estado de la batalla
         fetch('/battle/attack/', {
             method: 'POST',
             headers: {
@@ -12,65 +21,89 @@ document.addEventListener('DOMContentLoaded', function () {
                 'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value  // Si tienes CSRF activado
             },
             body: JSON.stringify({
+                battle: battleId,
                 ataque: ataque,
                 attacker: attackerId
             })
         })
         .then(response => response.json())  // Esperar respuesta en formato JSON
         .then(data => {
-            console.log('Respuesta de la batalla:', data);
-            // Si hay un error, lo mostramos en la consola
+            // Si hay un error, lo mostramos en la consola y devolvemos el turno al jugador
             if (data.error) {
                 console.error('Error:', data.error);
-            } else {
-                // Si la respuesta es exitosa, actualizamos la UI
-                // Actualizar los puntos de vida de los personajes y la frase
-                document.getElementById('char1_hp').textContent = data.char1_hp;
-                document.getElementById('char2_hp').textContent = data.char2_hp;
-                document.getElementById('comentario').innerText = data.frase;
-
-                // Actualizar el turno del jugador
-                if (data.turn_player === data.char1_id) {
-                    // Si es el turno del jugador 1, habilitar sus botones de ataque
-                    document.getElementById('char1_fuerte').disabled = false;
-                    document.getElementById('char1_debil').disabled = false;
-                    document.getElementById('char2_fuerte').disabled = true;
-                    document.getElementById('char2_debil').disabled = true;
-                } else {
-                    // Si es el turno del jugador 2, habilitar sus botones de ataque
-                    document.getElementById('char2_fuerte').disabled = false;
-                    document.getElementById('char2_debil').disabled = false;
-                    document.getElementById('char1_fuerte').disabled = true;
-                    document.getElementById('char1_debil').disabled = true;
-                }
-
-                // Si se acabó el juego o algún personaje tiene 0 HP, mostrar mensaje de fin de juego
-                if (data.char1_hp <= 0 || data.char2_hp <= 0) {
-                    document.getElementById('comentario').innerText = data.winner;
-                }
+                toggleTurnButtons(String(attackerId));
+                return;
             }
+            actualizarBatalla(data);
         })
-        .catch(error => console.error('Error al realizar el ataque:', error));
+        .catch(error => {
+            console.error('Error al realizar el ataque:', error);
+            toggleTurnButtons(String(attackerId));
+        });
     }
 
-    // Función para habilitar o deshabilitar los botones de acuerdo al turno
-    function toggleTurnButtons() {
-        const turnPlayer = document.getElementById('turn_player').value;
+    // Función para actualizar la interfaz con el estado de la batalla (la respuesta de la vista de ataque)
+    function actualizarBatalla(data) {
+        if (data.seq <= lastSeq) {
+            return;  // Turno ya mostrado
+        }
+        lastSeq = data.seq;
+        console.log('Estado de la batalla:', data);
+        // Actualizar los puntos de vida de los personajes y la frase
+        document.getElementById('char1_hp').textContent = data.char1_hp;
+        document.getElementById('char2_hp').textContent = data.char2_hp;
+
+        // Si se acabó el juego, mostrar el ganador y bloquear los botones
+        if (data.winner) {
+            document.getElementById('comentario').innerText = data.winner;
+            setButtons(false, false);
+            return;
+        }
 
+        // Actualizar la frase y el turno del jugador
+        document.getElementById('comentario').innerText = data.frase;
+        toggleTurnButtons(String(data.turn_player));
+    }
+
+    // Convierte un turno del canal de eventos (formato de la API de la arena) al de la vista de ataque
+    function desdeArena(data) {
+        const ganador = data.winner === null ? null : (data.winner === data.char1.id ? data.char1 : data.char2);
+        return {
+            seq: data.seq,
+            char1_hp: data.char1.hp,
+            char2_hp: data.char2.hp,
+            turn_player: data.turn_player,
+            frase: data.frase,
+            winner: ganador && `${ganador.name} gana la batalla!! 🏆`
+        };
+    }
+
+    // Habilita o deshabilita los botones de cada jugador
+    function setButtons(char1Enabled, char2Enabled) {
+        document.getElementById('char1_fuerte').disabled = !char1Enabled;
+        document.getElementById('char1_debil').disabled = !char1Enabled;
+        document.getElementById('char2_fuerte').disabled = !char2Enabled;
+        document.getElementById('char2_debil').disabled = !char2Enabled;
+    }
+
+    // Función para habilitar o deshabilitar los botones de acuerdo al turno
+    function toggleTurnButtons(turnPlayer) {
         // Deshabilitar los botones del jugador que no tiene el turno
         if (turnPlayer === document.getElementById('char1_id').value) {
-            document.getElementById('char1_fuerte').disabled = false;
-            document.getElementById('char1_debil').disabled = false;
-            document.getElementById('char2_fuerte').disabled = true;
-            document.getElementById('char2_debil').disabled = true;
+            setButtons(true, false);
         } else {
-            document.getElementById('char2_fuerte').disabled = false;
-            document.getElementById('char2_debil').disabled = false;
-            document.getElementById('char1_fuerte').disabled = true;
-            document.getElementById('char1_debil').disabled = true;
+            setButtons(false, true);
         }
     }
 
+    // Escuchar el canal de eventos (SSE) con los turnos de la batalla: no hace falta para jugar,
+    // pero mantiene al día otras pestañas que muestren la misma batalla
+    if (battleId && window.EventSource) {
+        const source = new EventSource(`/api/arena/battles/${battleId}/stream/`);
+        source.addEventListener('turn', event => actualizarBatalla(desdeArena(JSON.parse(event.data))));
+        source.addEventListener('end', () => source.close());
+    }
+
     // Asignar el evento para los botones de ataque
     document.getElementById('char1_fuerte').addEventListener('click', function () {
         realizarAtaque('fuerte', document.getElementById('char1_id').value);
@@ -85,4 +118,4 @@ document.addEventListener('DOMContentLoaded', function () {
     document.getElementById('char2_debil').addEventListener('click', function () {
         realizarAtaque('debil', document.getElementById('char2_id').value);
     });
-});
\ No newline at end of file
+});
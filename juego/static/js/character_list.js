@@ -0,0 +1,41 @@
+// Scroll infinito de la galería de personajes: al llegar al final se pide la página siguiente
+// de tarjetas a `character/cards/?after=<id>` y se añade a la lista
+document.addEventListener('DOMContentLoaded', function () {
+    const cards = document.getElementById('character-cards');
+    const more = document.getElementById('character-cards-more');
+    if (!cards || !more) {
+        return;
+    }
+    let loading = false;
+
+    function loadNextPage() {
+        const url = more.dataset.url;
+        if (loading || !url) {
+            return;
+        }
+        loading = true;
+        fetch(url, {headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(data => {
+                // Añade las tarjetas nuevas y apunta a la página siguiente (o quita el botón si era la última)
+                cards.insertAdjacentHTML('beforeend', data.html);
+                if (data.next) {
+                    more.dataset.url = data.next;
+                    more.querySelector('a').href = data.next_page;
+                } else {
+                    observer.disconnect();
+                    more.remove();
+                }
+            })
+            .catch(error => console.error('Error al cargar más personajes:', error))
+            .finally(() => { loading = false; });
+    }
+
+    // Carga la página siguiente cuando el botón "Cargar más" está a punto de verse
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, {rootMargin: '600px'});
+    observer.observe(more);
+});
@@ -0,0 +1,165 @@
+"""
+Almacenamiento de las imágenes subidas por contenido.
+
+`ContentHashStorage` guarda cada fichero como `<directorio>/<hash del contenido><extensión>`
+(por ejemplo `characters/3f2a...9c.jpg`) en lugar de con el nombre original:
+
+- subir dos veces el mismo fichero no lo duplica: la segunda vez se devuelve el nombre del que
+  ya existe;
+- el contenido de una URL nunca cambia, así que se puede servir con
+  `Cache-Control: public, max-age=31536000, immutable` (ver `serve_media` y deploy/nginx.conf) y
+  los navegadores no vuelven a pedirla. Lo mismo vale para sus versiones reducidas (ver
+  juego/images.py), cuyo nombre sale del de la imagen.
+
+Como varios objetos pueden compartir fichero, al borrar un arma, armadura o personaje su imagen
+solo se borra si nadie más la usa (ver `delete_if_orphaned` y `juego.signals`). El comando
+`gc_media` busca y borra los ficheros que han quedado sin usar (por ejemplo al cambiar la imagen).
+Solo se borran ficheros con nombre de hash: las imágenes de los datos iniciales no se tocan.
+"""
+import hashlib
+import os
+import re
+import time
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.views.static import serve
+
+from juego.images import derivative_name, forget_derivatives, manifest_name
+
+# Caracteres del hash (SHA-256) que forman el nombre del fichero
+HASH_LENGTH = 32
+
+# Directorios con las imágenes de los modelos (`upload_to` de cada ImageField)
+MEDIA_DIRS = ('weapons', 'armors', 'characters')
+
+# Nombres de fichero que no cambian nunca de contenido: los de hash y sus versiones reducidas
+IMMUTABLE_NAME = re.compile(rf'(^|/)[0-9a-f]{{{HASH_LENGTH}}}(-\d+)?\.\w+$')
+
+# Cabecera de los ficheros inmutables (un año) y del resto
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MEDIA_CACHE_CONTROL = 'public, max-age=3600'
+
+# Segundos que tiene que llevar un fichero sin usar para que se borre: un fichero recién subido
+# todavía no está en la base de datos hasta que se guarda el objeto
+GC_GRACE_SECONDS = 60 * 60
+
+
+def content_hash(content):
+    """Hash (SHA-256) del contenido de un fichero, leído por bloques"""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_immutable(name):
+    """Si el contenido del fichero `name` no puede cambiar (nombre de hash)"""
+    return bool(IMMUTABLE_NAME.search(name))
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    `FileSystemStorage` que nombra los ficheros por su contenido y no guarda los repetidos.
+    """
+
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, content_hash(content) + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Ya existe: se renueva su fecha para que `gc_media` no lo borre antes de que se guarde el objeto
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+media_storage = ContentHashStorage()
+
+
+def get_media_storage():
+    """Almacenamiento de las imágenes de armas, armaduras y personajes (`storage` de sus ImageField)"""
+    return media_storage
+
+
+def referenced_names():
+    """Nombres de todas las imágenes que usa algún arma, armadura o personaje"""
+    from juego.models import Armor, Character, Weapon
+
+    names = set()
+    for model in (Weapon, Armor, Character):
+        names.update(model.objects.exclude(image='').exclude(image__isnull=True)
+                     .values_list('image', flat=True).distinct())
+    return names
+
+
+def _is_referenced(name):
+    from juego.models import Armor, Character, Weapon
+
+    return any(model.objects.filter(image=name).exists() for model in (Weapon, Armor, Character))
+
+
+def _is_old(storage, name, grace):
+    return time.time() - storage.get_modified_time(name).timestamp() >= grace
+
+
+def delete_media(name, storage=None):
+    """Borra una imagen con sus versiones reducidas y su manifiesto (también el de la caché)"""
+    storage = storage or media_storage
+    base = os.path.basename(os.path.splitext(name)[0])
+    derivatives_dir = os.path.dirname(derivative_name(name, 0, 'x'))
+    if storage.exists(derivatives_dir):
+        for filename in storage.listdir(derivatives_dir)[1]:
+            if filename.startswith(base + '-') or filename == os.path.basename(manifest_name(name)):
+                storage.delete(f'{derivatives_dir}/{filename}')
+    storage.delete(name)
+    forget_derivatives(name)
+
+
+def delete_if_orphaned(name, storage=None, grace=GC_GRACE_SECONDS):
+    """
+    Borra la imagen `name` si es de hash, nadie la usa y lleva más de `grace` segundos sin
+    subirse de nuevo. Devuelve si se ha borrado.
+    """
+    storage = storage or media_storage
+    if not name or not is_immutable(name) or not storage.exists(name):
+        return False
+    if _is_referenced(name) or not _is_old(storage, name, grace):
+        return False
+    delete_media(name, storage)
+    return True
+
+
+def orphaned_files(storage=None, grace=GC_GRACE_SECONDS):
+    """Imágenes de hash que no usa nadie y llevan más de `grace` segundos sin subirse de nuevo"""
+    storage = storage or media_storage
+    referenced = referenced_names()
+    for directory in MEDIA_DIRS:
+        if not storage.exists(directory):
+            continue
+        for filename in sorted(storage.listdir(directory)[1]):
+            name = f'{directory}/{filename}'
+            if is_immutable(name) and name not in referenced and _is_old(storage, name, grace):
+                yield name
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    `django.views.static.serve` para los ficheros subidos (en desarrollo; en producción los sirve
+    nginx) con cabeceras de caché: de un año para los de hash y sus versiones reducidas.
+    """
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if response.status_code == 200:
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if is_immutable(path) else MEDIA_CACHE_CONTROL
+    return response
@@ -0,0 +1,47 @@
+"""
+Etiquetas para mostrar las imágenes con sus versiones reducidas (ver juego/images.py).
+
+    {% load images %}
+    {% picture character.image alt=character.name sizes="(min-width: 768px) 33vw, 100vw" class="card-img-top" %}
+
+genera un `<picture>` con un `<source>` por formato (AVIF, WebP) con su `srcset`, y la imagen
+original como `<img>` para los navegadores que no admiten ninguno o si todavía no hay versiones.
+"""
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from juego import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, alt='', sizes='100vw', **attrs):
+    """
+    `<picture>` de un `ImageField`. El resto de argumentos (`class`, `style`...) son atributos del `<img>`.
+    """
+    if not image:
+        return ''
+    img_attrs = {'src': image.url, 'alt': alt, 'loading': 'lazy', 'decoding': 'async', **attrs}
+    manifest = images.image_derivatives(image.name, image.storage)
+    if manifest is None:
+        return format_html('<img{}>', flatatt(img_attrs))
+
+    # Tamaño original: el navegador reserva el hueco antes de descargar la imagen
+    img_attrs.setdefault('width', manifest['width'])
+    img_attrs.setdefault('height', manifest['height'])
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, images.srcset(image.name, fmt, image.storage), sizes) for fmt in manifest['sources']
+         if manifest['sources'][fmt]),
+    )
+    return format_html('<picture>{}<img{}></picture>', sources, flatatt(img_attrs))
+
+
+@register.filter
+def srcset(image, fmt='webp'):
+    """Valor de `srcset` con las versiones de un `ImageField` en un formato: `{{ weapon.image|srcset:"webp" }}`"""
+    if not image:
+        return ''
+    return images.srcset(image.name, fmt, image.storage)
@@ -0,0 +1,161 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from unittest import mock
+import asyncio
+import json
+
+from juego.battle import start_battle
+from juego.battle_store import get_battle_store
+from juego.models import Weapon, Armor, Character
+
+
+class ArenaApiTest(TestCase):
+    """Pruebas para la API asíncrona de la arena"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea tres personajes equipados, uno sin equipo y dos usuarios.
+        """
+        get_battle_store().clear()  # Los ids de los usuarios se repiten entre pruebas
+        weapon = Weapon.objects.create(name="Espada", damage=75, critic=0, accuracy=100)
+        armor = Armor.objects.create(name="Cota", defense=15)
+        self.char1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        self.char2 = Character.objects.create(name="Gollum", location="Mordor", equipped_weapon=weapon, equipped_armor=armor)
+        self.char3 = Character.objects.create(name="Boromir", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        self.unarmed = Character.objects.create(name="Frodo", location="Comarca")
+        User.objects.create_user(username='testuser', password='password123')
+        User.objects.create_user(username='spectator', password='password123')
+        self.url = reverse('juego:arenaBattles')
+
+    async def create_battle(self, char1, char2):
+        """Crea una batalla en la arena y devuelve la respuesta"""
+        data = json.dumps({'char1': char1.id, 'char2': char2.id})
+        return await self.async_client.post(self.url, data, content_type='application/json')
+
+    async def attack(self, battle_id, attacker, ataque='fuerte'):
+        """Juega un turno en una batalla de la arena y devuelve la respuesta"""
+        data = json.dumps({'attacker': attacker.id, 'ataque': ataque})
+        url = reverse('juego:arenaAttack', args=[battle_id])
+        return await self.async_client.post(url, data, content_type='application/json')
+
+    async def test_requires_login(self):
+        """Verifica que la arena exige autenticación"""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_many_battles_per_user(self):
+        """Verifica que un usuario puede tener varias batallas a la vez"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        first = await self.create_battle(self.char1, self.char2)
+        second = await self.create_battle(self.char3, self.char1)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+
+        response = await self.async_client.get(self.url)
+        ids = [battle['id'] for battle in response.json()['battles']]
+        self.assertEqual(ids, [first.json()['id'], second.json()['id']])
+
+        # Los turnos de una batalla no afectan a la otra
+        response = await self.attack(first.json()['id'], self.char1)
+        self.assertEqual(response.json()['turn_player'], self.char2.id)
+        response = await self.attack(second.json()['id'], self.char3)
+        self.assertEqual(response.json()['turn_player'], self.char1.id)
+
+    async def test_start_off_the_event_loop(self):
+        """Verifica que la batalla empieza (caché de versiones y almacén) fuera del bucle de eventos"""
+        def start_in_thread(*args, **kwargs):
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return start_battle(*args, **kwargs)
+
+        await self.async_client.alogin(username='testuser', password='password123')
+        with mock.patch('juego.views.start_battle', side_effect=start_in_thread) as start:
+            response = await self.create_battle(self.char1, self.char2)
+        self.assertEqual(response.status_code, 201)
+        start.assert_called_once()
+
+    async def test_unarmed_character_cannot_fight(self):
+        """Verifica que un personaje sin equipo no puede entrar en la arena"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        response = await self.create_battle(self.char1, self.unarmed)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_only_owner_can_attack(self):
+        """Verifica que un espectador puede ver la batalla pero no atacar"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        battle_id = (await self.create_battle(self.char1, self.char2)).json()['id']
+
+        await self.async_client.alogin(username='spectator', password='password123')
+        response = await self.async_client.get(reverse('juego:arenaBattleDetail', args=[battle_id]))
+        self.assertEqual(response.status_code, 200)
+        response = await self.attack(battle_id, self.char1)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_user_index_is_not_a_battle(self):
+        """Verifica que el índice de batallas de un usuario no se puede ver ni atacar como una batalla"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        await self.create_battle(self.char1, self.char2)
+        user = await User.objects.aget(username='testuser')
+        for key in (f'user-{user.pk}', f'index.user.{user.pk}'):
+            response = await self.async_client.get(reverse('juego:arenaBattleDetail', args=[key]))
+            self.assertEqual(response.status_code, 404)
+            response = await self.attack(key, self.char1)
+            self.assertEqual(response.status_code, 404)
+
+    async def test_stream_sends_turns_until_the_end(self):
+        """Verifica que el canal SSE envía los turnos y termina cuando hay un ganador"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        battle_id = (await self.create_battle(self.char1, self.char2)).json()['id']
+
+        # Jugar la batalla hasta el final (las armas aciertan siempre)
+        while True:
+            data = (await self.attack(battle_id, self.char1)).json()
+            if data['winner'] is not None:
+                break
+            data = (await self.attack(battle_id, self.char2)).json()
+            if data['winner'] is not None:
+                break
+
+        response = await self.async_client.get(reverse('juego:arenaBattleStream', args=[battle_id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertIn('event: turn', body)
+        self.assertIn(f'"winner": {data["winner"]}', body)
+        self.assertTrue(body.endswith('event: end\ndata: {}\n\n'))
+
+    async def test_stream_notified_of_turns(self):
+        """Verifica que el canal SSE recibe los turnos en cuanto se juegan, sin esperar a consultar el almacén"""
+        await self.async_client.alogin(username='testuser', password='password123')
+        battle_id = (await self.create_battle(self.char1, self.char2)).json()['id']
+        response = await self.async_client.get(reverse('juego:arenaBattleStream', args=[battle_id]))
+        events = aiter(response.streaming_content)
+        self.assertIn('"seq": 0', (await anext(events)).decode())
+
+        await self.attack(battle_id, self.char1)
+        event = await asyncio.wait_for(anext(events), 0.5)
+        self.assertIn('"seq": 1', event.decode())
+
+        # Terminar la batalla para que el canal se cierre
+        attackers = [self.char2, self.char1]
+        while (await self.attack(battle_id, attackers[0])).json()['winner'] is None:
+            attackers.reverse()
+        body = ''.join([chunk.decode() async for chunk in events])
+        self.assertTrue(body.endswith('event: end\ndata: {}\n\n'))
+
+    def test_stream_without_asgi(self):
+        """Verifica que con WSGI el canal SSE envía el estado actual y se cierra en lugar de quedarse esperando"""
+        self.client.login(username='testuser', password='password123')
+        data = json.dumps({'char1': self.char1.id, 'char2': self.char2.id})
+        battle_id = self.client.post(self.url, data, content_type='application/json').json()['id']
+        url = reverse('juego:arenaBattleStream', args=[battle_id])
+
+        body = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn('id: 0\nevent: turn', body)
+        self.assertNotIn('event: end', body)
+
+        # Al volver a conectar sin cambios no se repite el turno
+        body = b''.join(self.client.get(url, HTTP_LAST_EVENT_ID='0').streaming_content).decode()
+        self.assertNotIn('event: turn', body)
@@ -0,0 +1,152 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+import json
+
+from juego.models import Faction, Weapon, Armor, Character
+from juego.battle import (
+    MAX_HP, CombatStats, TurnResult, resolve_turn, turn_phrase, simulate_battle, simulate_battles,
+)
+
+
+class FixedRandom:
+    """Generador de números aleatorios que devuelve siempre los valores indicados"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+
+    def randint(self, a, b):
+        return self.values.pop(0)
+
+
+class BattleEngineTest(TestCase):
+    """Pruebas para el motor de batalla"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea dos fichas de estadísticas sin pasar por la base de datos.
+        """
+        self.aragorn = CombatStats(id=1, name="Aragorn", damage=80, critic=20, accuracy=90, defense=15)
+        self.gollum = CombatStats(id=2, name="Gollum", damage=50, critic=10, accuracy=60, defense=10)
+
+    def test_resolve_turn_strong_attack(self):
+        """Verifica que el ataque fuerte multiplica el daño por 1.5 y resta la defensa"""
+        result = resolve_turn(self.aragorn, self.gollum, 'fuerte', FixedRandom(0, 100))
+        self.assertEqual(result, TurnResult(hit=True, critic=False, damage=80 * 1.5 - 10))
+
+    def test_resolve_turn_critic(self):
+        """Verifica que el crítico duplica el daño antes de restar la defensa"""
+        result = resolve_turn(self.aragorn, self.gollum, 'debil', FixedRandom(0, 0))
+        self.assertEqual(result, TurnResult(hit=True, critic=True, damage=80 * 2 - 10))
+
+    def test_resolve_turn_miss(self):
+        """Verifica que un ataque fallado no hace daño"""
+        result = resolve_turn(self.aragorn, self.gollum, 'fuerte', FixedRandom(100, 0))
+        self.assertEqual(result.damage, 0)
+        self.assertEqual(turn_phrase(self.aragorn, result), "Aragorn lanza un ataque y falla!!")
+
+    def test_resolve_turn_invalid_attack(self):
+        """Verifica que un tipo de ataque inválido lanza un error"""
+        with self.assertRaises(ValueError):
+            resolve_turn(self.aragorn, self.gollum, 'invalido', FixedRandom(0, 0))
+
+    def test_simulate_battle_without_damage_is_draw(self):
+        """Verifica que un combate en el que nadie puede hacer daño termina en empate"""
+        tank = CombatStats(id=3, name="Tanque", damage=1, critic=0, accuracy=100, defense=500)
+        self.assertEqual(simulate_battle(tank, tank, max_turns=50), (None, 50))
+
+    def test_simulate_battles_is_reproducible(self):
+        """Verifica que con la misma semilla se obtiene el mismo resultado"""
+        first = simulate_battles(self.aragorn, self.gollum, 500, seed=42)
+        second = simulate_battles(self.aragorn, self.gollum, 500, seed=42)
+        self.assertEqual(first, second)
+        self.assertEqual(first.wins_a + first.wins_b + first.draws, 500)
+        self.assertGreater(first.win_rate_a, first.win_rate_b)  # Aragorn es claramente más fuerte
+
+
+class CombatStatsFromCharacterTest(TestCase):
+    """Pruebas para la instantánea de estadísticas de un personaje"""
+
+    def test_defaults_when_weapon_has_no_stats(self):
+        """Verifica que se usan los valores por defecto si el arma no tiene crítico ni precisión"""
+        weapon = Weapon.objects.create(name="Palo", damage=5, critic=0, accuracy=0)
+        armor = Armor.objects.create(name="Trapo", defense=0)
+        character = Character.objects.create(name="Pippin", location="Comarca", equipped_weapon=weapon, equipped_armor=armor)
+
+        stats = CombatStats.from_character(character)
+        self.assertEqual(stats, CombatStats(id=character.id, name="Pippin", damage=5, critic=10, accuracy=50, defense=0, weapon_id=weapon.id, armor_id=armor.id))
+
+    def test_simulate_battles_with_characters(self):
+        """Verifica que se pueden simular combates pasando personajes directamente"""
+        weapon = Weapon.objects.create(name="Espada", damage=75, critic=30, accuracy=80)
+        armor = Armor.objects.create(name="Cota", defense=15)
+        char1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        char2 = Character.objects.create(name="Boromir", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+
+        with self.assertNumQueries(0):
+            summary = simulate_battles(char1, char2, 200, seed=7)
+        self.assertEqual(summary.battles, 200)
+
+
+class AttackViewEngineTest(TestCase):
+    """Pruebas de la vista de ataque usando el motor de batalla"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea dos personajes equipados, un usuario y comienza una batalla.
+        """
+        weapon = Weapon.objects.create(name="Espada del Apocalipsis", damage=75, critic=0, accuracy=100)
+        armor = Armor.objects.create(name="Armadura del Titán", defense=15)
+        faction = Faction.objects.create(name="Los Montaraces", location="Bree")
+        self.character1 = Character.objects.create(name="Aragorn", location="Gondor", faction=faction, equipped_weapon=weapon, equipped_armor=armor)
+        self.character2 = Character.objects.create(name="Gollum", location="Mordor", faction=faction, equipped_weapon=weapon, equipped_armor=armor)
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        self.client.post(reverse('juego:battleView'), {'character': self.character1.id, 'character2': self.character2.id})
+        self.attack_view_url = reverse('juego:attackView')
+
+    def attack(self, attacker, ataque='debil'):
+        """Realiza un ataque contra la vista y devuelve la respuesta"""
+        data = {'attacker': attacker.id, 'ataque': ataque}
+        return self.client.post(self.attack_view_url, json.dumps(data), content_type='application/json')
+
+    def test_attack_updates_hp_and_turn(self):
+        """Verifica que un ataque actualiza los puntos de vida y pasa el turno"""
+        response = self.attack(self.character1)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['turn_player'], self.character2.id)
+        self.assertEqual(data['char1_hp'], MAX_HP)
+        self.assertLess(data['char2_hp'], MAX_HP)
+
+    def test_attack_wrong_turn(self):
+        """Verifica que no se puede atacar fuera de turno"""
+        response = self.attack(self.character2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'No es tu turno')
+
+    def test_attack_invalid_type(self):
+        """Verifica que un tipo de ataque inválido devuelve un error"""
+        response = self.attack(self.character1, ataque='invalido')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Tipo de ataque inválido')
+
+    def test_attack_without_queries(self):
+        """Verifica que un turno usa la instantánea de estadísticas y no consulta la base de datos"""
+        battle_id = self.client.session['battle']['id']
+        data = {'battle': battle_id, 'attacker': self.character1.id, 'ataque': 'debil'}
+        with self.assertNumQueries(0):
+            response = self.client.post(self.attack_view_url, json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_equipment_change_cancels_battle(self):
+        """Verifica que si cambia el equipo de un personaje la batalla se cancela"""
+        self.character2.equipped_armor = Armor.objects.create(name="Mithril", defense=60)
+        self.character2.save()
+
+        response = self.attack(self.character1)
+        self.assertEqual(response.status_code, 409)
+        response = self.attack(self.character1)
+        self.assertEqual(response.json()['error'], 'No hay batalla en curso')
@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+import json
+
+from juego.models import BattleLog, Weapon, Armor, Character
+from juego.battle import CombatStats, TurnResult, pack_turn, play_turn, start_battle, unpack_turns
+from juego.battle_log import replay_battle, save_battle_logs
+
+
+class BattleLogTest(TestCase):
+    """Pruebas para el registro empaquetado de las batallas"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea dos personajes equipados y juega una batalla completa en memoria.
+        """
+        weapon = Weapon.objects.create(name="Espada", damage=95, critic=25, accuracy=70)
+        armor = Armor.objects.create(name="Cota", defense=15)
+        self.char1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        self.char2 = Character.objects.create(name="Gollum", location="Mordor", equipped_weapon=weapon, equipped_armor=armor)
+        self.state = start_battle(CombatStats.from_character(self.char1), CombatStats.from_character(self.char2), seed=42)
+        self.frases = []
+        while self.state['winner'] is None:
+            play_turn(self.state, self.state['turn_player'], 'fuerte' if self.state['seq'] % 3 else 'debil')
+            self.frases.append(self.state['frase'])
+
+    def test_pack_roundtrip(self):
+        """Verifica que un turno ocupa 5 bytes y se recupera igual"""
+        data = pack_turn(1, 'fuerte', TurnResult(hit=True, critic=True, damage=270.5))
+        self.assertEqual(len(data), 5)
+        turn, = unpack_turns(data)
+        self.assertEqual((turn.attacker, turn.ataque, turn.hit, turn.critic, turn.damage), (1, 'fuerte', True, True, 270.5))
+
+    def test_replay_from_seed(self):
+        """Verifica que la batalla guardada se reproduce igual desde la semilla"""
+        log, = save_battle_logs([self.state])
+        log.refresh_from_db()
+        self.assertEqual(log.turn_count, len(self.frases))
+        self.assertEqual(len(log.turns), 5 * len(self.frases))
+
+        replay = replay_battle(log)
+        self.assertEqual([turn['frase'] for turn in replay], self.frases)
+        self.assertEqual((replay[-1]['char1_hp'], replay[-1]['char2_hp']), (self.state['char1_hp'], self.state['char2_hp']))
+        self.assertEqual(log.winner_id, self.state['winner'])
+
+    def test_replay_detects_tampering(self):
+        """Verifica que un registro que no corresponde a la semilla se rechaza"""
+        log, = save_battle_logs([self.state])
+        log.seed += 1
+        with self.assertRaises(ValueError):
+            replay_battle(log)
+
+
+class AttackViewLogTest(TestCase):
+    """Pruebas de la escritura del registro al terminar una batalla"""
+
+    def test_log_written_once_at_the_end(self):
+        """Verifica que los turnos no escriben en la base de datos y el final guarda un solo registro"""
+        weapon = Weapon.objects.create(name="Maza", damage=300, critic=0, accuracy=100)
+        armor = Armor.objects.create(name="Cota", defense=0)
+        char1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        char2 = Character.objects.create(name="Gollum", location="Mordor", equipped_weapon=weapon, equipped_armor=armor)
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        self.client.post(reverse('juego:battleView'), {'character': char1.id, 'character2': char2.id})
+
+        # Juega hasta que alguien gane (un golpe crítico puede adelantar el final)
+        attacker, defender = char1, char2
+        while True:
+            data = json.dumps({'attacker': attacker.id, 'ataque': 'debil'})
+            response = self.client.post(reverse('juego:attackView'), data, content_type='application/json')
+            if 'winner' in response.json():
+                break
+            self.assertFalse(BattleLog.objects.exists())
+            attacker, defender = defender, attacker
+
+        log = BattleLog.objects.get()
+        self.assertEqual(log.winner_id, attacker.id)
+
+        # Como en la arena, la batalla terminada se conserva (para el canal SSE) pero no admite más turnos
+        data = json.dumps({'attacker': defender.id, 'ataque': 'debil'})
+        response = self.client.post(reverse('juego:attackView'), data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'La batalla ya ha terminado')
+        self.assertEqual(BattleLog.objects.count(), 1)
+
+        response = self.client.get(reverse('juego:get_battle_replay', args=[log.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['turns']), log.turn_count)
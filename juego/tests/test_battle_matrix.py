@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from io import StringIO
+import numpy as np
+
+from juego.models import Weapon, Armor, Character
+from juego.battle import CombatStats, simulate_battles
+from juego.battle_matrix import BATTLE_MATRIX_CACHE_KEY, build_battle_matrix, win_probability_matrix
+
+
+class WinProbabilityMatrixTest(TestCase):
+    """Pruebas para el cálculo vectorizado de la matriz de victorias"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea fichas de estadísticas con resultados fáciles de predecir.
+        """
+        self.giant = CombatStats(id=1, name="Gigante", damage=2000, critic=0, accuracy=100, defense=0)
+        self.rat = CombatStats(id=2, name="Rata", damage=1, critic=0, accuracy=100, defense=0)
+        self.wall = CombatStats(id=3, name="Muro", damage=0, critic=0, accuracy=100, defense=10000)
+
+    def test_matrix_extreme_cases(self):
+        """Verifica los casos en los que el ganador está decidido de antemano"""
+        matrix = win_probability_matrix([self.giant, self.rat, self.wall], trials=20, seed=1, max_turns=100)
+
+        self.assertTrue(np.isnan(matrix[0, 0]))  # Nadie pelea contra sí mismo
+        self.assertEqual(matrix[0, 1], 1.0)  # El gigante mata a la rata en el primer golpe
+        self.assertEqual(matrix[1, 0], 0.0)  # La rata ataca primero pero muere en el contraataque
+        self.assertEqual(matrix[2, 1], 0.0)  # El muro no puede hacer daño
+        self.assertEqual(matrix[0, 2], 0.0)  # Nadie puede herir al muro, empate seguro
+
+    def test_matrix_agrees_with_engine(self):
+        """Verifica que la simulación vectorizada coincide con el motor de batalla"""
+        aragorn = CombatStats(id=1, name="Aragorn", damage=80, critic=30, accuracy=70, defense=15)
+        boromir = CombatStats(id=2, name="Boromir", damage=70, critic=20, accuracy=80, defense=12)
+
+        matrix = win_probability_matrix([aragorn, boromir], trials=4000, seed=3)
+        summary = simulate_battles(aragorn, boromir, 4000, seed=3)
+        self.assertAlmostEqual(matrix[0, 1], summary.win_rate_a, delta=0.05)
+
+
+class BattleMatrixEndpointTest(TestCase):
+    """Pruebas para el comando y la API de la matriz de victorias"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Deja solo dos personajes equipados y un tercero sin equipo.
+        """
+        Character.objects.all().delete()
+        weapon = Weapon.objects.create(name="Espada", damage=75, critic=20, accuracy=80)
+        armor = Armor.objects.create(name="Cota", defense=15)
+        self.char1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        self.char2 = Character.objects.create(name="Boromir", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        Character.objects.create(name="Frodo", location="Comarca")  # Sin equipo: no puede combatir
+        cache.delete(BATTLE_MATRIX_CACHE_KEY)
+
+    def test_only_eligible_characters(self):
+        """Verifica que solo entran en la matriz los personajes con arma y armadura"""
+        data = build_battle_matrix(trials=10, seed=1)
+        self.assertEqual([c['id'] for c in data['characters']], [self.char1.id, self.char2.id])
+        self.assertIsNone(data['matrix'][0][0])
+        self.assertEqual(len(data['leaderboard']), 2)
+
+    def test_command_fills_cache_used_by_api(self):
+        """Verifica que el comando guarda la matriz en la caché y la API la sirve desde allí"""
+        call_command('battle_matrix', trials=10, seed=1, stdout=StringIO())
+        cached = cache.get(BATTLE_MATRIX_CACHE_KEY)
+        self.assertIsNotNone(cached)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('juego:get_battle_matrix'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), cached)
@@ -0,0 +1,174 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from unittest import mock
+import json
+import tempfile
+import threading
+
+from juego.models import Weapon, Armor, Character
+from juego.battle_store import LocMemBattleStore, FileBattleStore, add_user_battle, get_battle_store, get_user_battles
+
+
+class LocMemBattleStoreTest(TestCase):
+    """Pruebas para el almacén de batallas en memoria"""
+
+    def test_set_get_delete(self):
+        """Verifica que se puede guardar, leer y borrar una batalla"""
+        store = LocMemBattleStore()
+        battle_id = store.new_id()
+        store.set(battle_id, {'char1_hp': 1000})
+        self.assertEqual(store.get(battle_id), {'char1_hp': 1000})
+        store.delete(battle_id)
+        self.assertIsNone(store.get(battle_id))
+
+    def test_lru_eviction(self):
+        """Verifica que al superar el máximo se expulsa la batalla usada hace más tiempo"""
+        store = LocMemBattleStore(max_entries=2)
+        store.set('a', 1)
+        store.set('b', 2)
+        store.get('a')  # 'a' pasa a ser la más reciente
+        store.set('c', 3)
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get('a'), 1)
+        self.assertEqual(store.get('c'), 3)
+
+    def test_timeout(self):
+        """Verifica que las batallas abandonadas caducan"""
+        store = LocMemBattleStore(timeout=10)
+        with mock.patch('juego.battle_store.time.monotonic', return_value=100):
+            store.set('a', 1)
+        with mock.patch('juego.battle_store.time.monotonic', return_value=111):
+            self.assertIsNone(store.get('a'))
+
+    def test_index_not_evicted(self):
+        """Verifica que llenar el almacén de batallas no expulsa los índices de los usuarios"""
+        store = LocMemBattleStore(max_entries=2)
+        store.set('a', {'stats': []})
+        add_user_battle(store, 1, 'a')
+        for battle_id in ('b', 'c', 'd'):
+            store.set(battle_id, {'stats': []})
+        self.assertEqual(store.get_index('index.user.1'), ['a'])
+        self.assertEqual(get_user_battles(store, 1), [])  # 'a' sí se ha expulsado
+        self.assertEqual(store.get_index('index.user.1'), [])
+
+
+class FileBattleStoreTest(TestCase):
+    """Pruebas para el almacén de batallas en ficheros"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def test_shared_between_instances(self):
+        """Verifica que dos procesos (dos instancias) ven las mismas batallas"""
+        writer = FileBattleStore(location=self.directory.name)
+        reader = FileBattleStore(location=self.directory.name)
+
+        writer.set('a', {'turn_player': 1})
+        self.assertEqual(reader.get('a'), {'turn_player': 1})
+        writer.set('a', {'turn_player': 2})
+        self.assertEqual(reader.get('a'), {'turn_player': 2})
+        writer.delete('a')
+        self.assertIsNone(reader.get('a'))
+
+    def test_lock_between_instances(self):
+        """Verifica que con la batalla bloqueada no se pierden escrituras de varias instancias a la vez"""
+        stores = [FileBattleStore(location=self.directory.name) for _ in range(4)]
+        stores[0].set('a', {'seq': 0})
+
+        def play(store):
+            for _ in range(25):
+                with store.lock('a'):
+                    state = dict(store.get('a'))
+                    state['seq'] += 1
+                    store.set('a', state)
+
+        threads = [threading.Thread(target=play, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(stores[0].get('a')['seq'], 100)
+
+    def test_user_index_between_instances(self):
+        """Verifica que no se pierden batallas del índice de un usuario creadas a la vez en varias instancias"""
+        stores = [FileBattleStore(location=self.directory.name) for _ in range(4)]
+
+        def create(store, n):
+            for i in range(25):
+                add_user_battle(store, 1, f'b{n}-{i}')
+
+        threads = [threading.Thread(target=create, args=(store, n)) for n, store in enumerate(stores)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(stores[0].get_index('index.user.1')), 100)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class AttackViewStoreTest(TestCase):
+    """Pruebas de la vista de ataque usando el almacén de batallas"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea dos personajes equipados, un usuario y comienza una batalla.
+        """
+        get_battle_store().clear()  # Los ids de los usuarios se repiten entre pruebas
+        weapon = Weapon.objects.create(name="Espada", damage=75, critic=0, accuracy=100)
+        armor = Armor.objects.create(name="Cota", defense=15)
+        self.character1 = Character.objects.create(name="Aragorn", location="Gondor", equipped_weapon=weapon, equipped_armor=armor)
+        self.character2 = Character.objects.create(name="Gollum", location="Mordor", equipped_weapon=weapon, equipped_armor=armor)
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        response = self.client.post(reverse('juego:battleView'), {'character': self.character1.id, 'character2': self.character2.id})
+        self.battle_id = response.context['battle_id']
+
+    def attack(self, attacker, battle_id):
+        """Realiza un ataque contra la vista y devuelve la respuesta"""
+        data = {'battle': battle_id, 'attacker': attacker.id, 'ataque': 'debil'}
+        return self.client.post(reverse('juego:attackView'), json.dumps(data), content_type='application/json')
+
+    def test_battle_state_in_store(self):
+        """Verifica que el estado de la batalla se guarda en el almacén y la sesión solo apunta a él"""
+        state = get_battle_store().get(self.battle_id)
+        self.assertEqual(state['char1'], self.character1.id)
+        self.assertEqual(self.client.session['battle']['id'], self.battle_id)
+
+    def test_attack_does_not_touch_session(self):
+        """Verifica que un ataque no lee ni escribe la sesión en la base de datos"""
+        with mock.patch('django.contrib.sessions.backends.db.SessionStore.save') as save, \
+                mock.patch('django.contrib.sessions.backends.db.SessionStore.load') as load:
+            response = self.attack(self.character1, self.battle_id)
+        self.assertEqual(response.status_code, 200)
+        save.assert_not_called()
+        load.assert_not_called()
+        self.assertEqual(get_battle_store().get(self.battle_id)['turn_player'], self.character2.id)
+
+    def test_attack_unknown_battle(self):
+        """Verifica que no se puede atacar en una batalla que no existe"""
+        response = self.attack(self.character1, 'no-existe')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'No hay batalla en curso')
+
+    def test_attack_other_battle(self):
+        """Verifica que sin sesión no se puede atacar en una batalla ajena, ni de la arena ni del formulario"""
+        state = get_battle_store().get(self.battle_id)
+        arena_id = get_battle_store().new_id()
+        get_battle_store().set(arena_id, {key: value for key, value in state.items() if key != 'session_key'})
+        self.client.logout()
+        for battle_id in (self.battle_id, arena_id):
+            response = self.attack(self.character1, battle_id)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_battle_store().get(arena_id)['seq'], 0)
+
+    def test_attack_user_index(self):
+        """Verifica que el índice de batallas del usuario no se puede usar como batalla"""
+        user = User.objects.get(username='testuser')
+        self.assertEqual(get_user_battles(get_battle_store(), user.pk)[0][0], self.battle_id)
+        for key in (f'user-{user.pk}', f'index.user.{user.pk}'):
+            response = self.attack(self.character1, key)
+            self.assertEqual(response.status_code, 400)
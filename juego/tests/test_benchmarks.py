@@ -0,0 +1,49 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from juego.benchmarks import (
+    compare_with_baseline, query_growth, run_benchmarks, server_errors, synthetic_world, uncovered_routes,
+)
+from juego.models import Faction
+from juego.reference_data import reference_objects
+
+
+class BenchmarksTest(TestCase):
+    """Pruebas para los benchmarks de las rutas"""
+
+    def test_every_route_is_benchmarked(self):
+        """Verifica que todas las rutas con nombre de juego/urls.py tienen benchmark o un motivo para no tenerlo"""
+        self.assertEqual(uncovered_routes(), set())
+
+    def test_no_query_growth(self):
+        """Verifica que ninguna ruta hace más consultas cuanto mayor es el mundo (N+1) ni responde con un 5xx"""
+        results = run_benchmarks(sizes=(20, 80), repeat=1)
+        self.assertEqual(query_growth(results), {})
+        self.assertEqual(server_errors(results), {})
+        self.assertEqual(results['routes']['GET characterView']['80']['status'], 200)
+
+    def test_synthetic_world_isolated(self):
+        """Verifica que el mundo sintético no deja nada en la base de datos ni en la caché configurada"""
+        cache.set('centinela', 1)
+        factions = reference_objects(Faction)
+        with synthetic_world(20) as fixtures:
+            self.assertIsNone(cache.get('centinela'))
+            self.assertIn(fixtures['faction'], reference_objects(Faction))
+        self.assertEqual(cache.get('centinela'), 1)
+        self.assertEqual(reference_objects(Faction), factions)
+        self.assertEqual(list(Faction.objects.order_by('pk')), factions)
+
+    def test_compare_with_baseline(self):
+        """Verifica que se detectan más consultas y latencias peores que la referencia"""
+        baseline = {'routes': {'GET characterView': {'100': {'queries': 5, 'time_ms': 10.0}}}}
+
+        def results(queries, time_ms):
+            return {'sizes': [100], 'routes': {'GET characterView': {'100': {'queries': queries, 'time_ms': time_ms}}}}
+
+        self.assertEqual(compare_with_baseline(results(5, 14.0), baseline), [])
+        self.assertEqual(compare_with_baseline(results(5, 16.0), baseline, min_ms=1.0),
+                         ['GET characterView (100): 10.0 -> 16.0 ms'])
+        self.assertEqual(compare_with_baseline(results(6, 10.0), baseline),
+                         ['GET characterView (100): 5 -> 6 consultas'])
+        # Por debajo del margen en milisegundos no se considera regresión
+        self.assertEqual(compare_with_baseline(results(5, 14.0), baseline, tolerance=0.1), [])
@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from juego.models import Faction, Weapon, Armor, Character, Inventory
+
+
+class BulkApiTest(APITestCase):
+    """Pruebas para las operaciones en bloque de la API"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea un usuario, una facción y un equipo para los personajes.
+        """
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        self.faction = Faction.objects.create(name="Los Montaraces", location="Eriador")
+        self.weapon = Weapon.objects.create(name="Espada", damage=50, critic=10, accuracy=80)
+        self.armor = Armor.objects.create(name="Cota", defense=10)
+
+    def test_bulk_create_weapons(self):
+        """Verifica que las armas se crean en bloque con crítico y precisión generados"""
+        items = [{'name': f"Daga {i}", 'damage': i} for i in range(50)] + [{'name': "Arco", 'damage': 5, 'critic': 7, 'accuracy': 99}]
+        with self.assertNumQueries(5):  # sesión, usuario, transacción (2) y un INSERT
+            response = self.client.post(reverse('juego:weapon-bulk'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['created'], 51)
+
+        daggers = Weapon.objects.filter(id__in=response.json()['ids'], name__startswith="Daga")
+        self.assertEqual(daggers.count(), 50)
+        for weapon in daggers:
+            self.assertTrue(0 <= weapon.critic <= 90)
+            self.assertTrue(40 <= weapon.accuracy <= 100)
+        bow = Weapon.objects.get(name="Arco")
+        self.assertEqual((bow.critic, bow.accuracy), (7, 99))
+
+    def test_bulk_create_reports_item_errors(self):
+        """Verifica que si un elemento no es válido no se crea ninguno y se indica cuál falla"""
+        items = [{'name': "Cota buena", 'defense': 5}, {'defense': 3}, {'name': "Yelmo", 'defense': 'mucha'}]
+        response = self.client.post(reverse('juego:armor-bulk'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()['errors']
+        self.assertEqual([e['index'] for e in errors], [1, 2])
+        self.assertIn('name', errors[0]['errors'])
+        self.assertIn('defense', errors[1]['errors'])
+        self.assertFalse(Armor.objects.filter(name="Cota buena").exists())
+
+    def test_bulk_characters(self):
+        """Verifica la creación, actualización y borrado de personajes en bloque"""
+        url = reverse('juego:character_modify-bulk')
+        items = [{'name': f"Montaraz {i}", 'location': "Bree", 'faction': self.faction.id,
+                  'equipped_weapon': self.weapon.id} for i in range(20)]
+        with self.assertNumQueries(8):  # sesión, usuario, facción, arma, transacción (2) y un INSERT de personajes y otro de inventarios
+            response = self.client.post(url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = response.json()['ids']
+        self.assertEqual(self.faction.members.count(), 20)
+        self.assertEqual(Inventory.objects.filter(character_id__in=ids).count(), 20)
+
+        response = self.client.post(url, [{'name': "Nadie", 'location': "Bree", 'faction': 999999}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('faction', response.json()['errors'][0]['errors'])
+
+        response = self.client.patch(url, [{'id': pk, 'equipped_armor': self.armor.id} for pk in ids], format='json')
+        self.assertEqual(response.json(), {'updated': 20})
+        self.assertEqual(Character.objects.filter(equipped_armor=self.armor).count(), 20)
+
+        response = self.client.patch(url, [{'id': 999999, 'location': "Bree"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Los ids como texto también valen; los que no son un id se indican como tales
+        response = self.client.patch(url, [{'id': str(ids[0]), 'location': "Rivendel"}], format='json')
+        self.assertEqual(response.json(), {'updated': 1})
+        self.assertEqual(Character.objects.get(pk=ids[0]).location, "Rivendel")
+        response = self.client.patch(url, [{'id': "cinco", 'location': "Bree"}, {'location': "Bree"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([e['index'] for e in response.json()['errors']], [0, 1])
+        self.assertIn('Id no válido', response.json()['errors'][0]['errors']['id'][0])
+
+        response = self.client.delete(url, {'ids': ["cinco"]}, format='json')
+        self.assertIn('Id no válido', response.json()['errors'][0]['errors'][0])
+        response = self.client.delete(url, {'ids': [str(pk) for pk in ids[:5]]}, format='json')
+        self.assertEqual(response.json(), {'deleted': 5})
+        self.assertEqual(self.faction.members.count(), 15)
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from juego.cache_versions import bump_cache_versions, cache_version, cache_versions
+
+
+class CacheVersionsTest(SimpleTestCase):
+    """Pruebas para las versiones de los datos guardados en la caché"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version(self):
+        """Verifica que la versión se crea la primera vez y se mantiene hasta renovarla"""
+        version = cache_version('juego:prueba')
+        self.assertEqual(cache_version('juego:prueba'), version)
+        self.assertEqual(cache_versions(['juego:prueba', 'juego:otra'])['juego:prueba'], version)
+        bump_cache_versions(['juego:prueba'])
+        self.assertNotEqual(cache_version('juego:prueba'), version)
+
+    def test_expelled_version(self):
+        """Verifica que si la caché expulsa una versión se crea otra distinta"""
+        versions = cache_versions(['juego:a', 'juego:b'])
+        cache.delete('juego:a')
+        new_versions = cache_versions(['juego:a', 'juego:b'])
+        self.assertNotEqual(new_versions['juego:a'], versions['juego:a'])
+        self.assertEqual(new_versions['juego:b'], versions['juego:b'])
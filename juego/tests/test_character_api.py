@@ -0,0 +1,106 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from juego.models import Faction, Weapon, Armor, Character, Inventory, Relationship
+
+
+class CharacterViewSetQueriesTest(APITestCase):
+    """Pruebas del número de consultas del listado de personajes"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Sustituye los personajes de ejemplo y crea un usuario.
+        """
+        Character.objects.all().delete()
+        self.faction = Faction.objects.create(name="Los Montaraces", location="Eriador")
+        self.weapon = Weapon.objects.create(name="Espada", damage=50, critic=10, accuracy=80)
+        self.armor = Armor.objects.create(name="Cota", defense=10)
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        self.url = reverse('juego:character_info-list')
+
+    def add_characters(self, n):
+        """Crea `n` personajes equipados, con inventario y relacionados con el anterior"""
+        previous = Character.objects.order_by('-id').first()
+        for i in range(n):
+            character = Character.objects.create(name=f"Montaraz {i}", location="Bree", faction=self.faction,
+                                                 equipped_weapon=self.weapon, equipped_armor=self.armor)
+            inventory = Inventory.objects.create(character=character)
+            inventory.weapons.add(self.weapon)
+            if previous:
+                Relationship.objects.create(character1=previous, character2=character, relationship_type='ally')
+            previous = character
+
+    def count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()['results']
+
+    def test_queries_do_not_grow_with_characters(self):
+        """Verifica que el número de consultas es el mismo con 2 y con 20 personajes"""
+        self.add_characters(2)
+        few, _ = self.count_queries()
+        self.add_characters(18)
+        many, data = self.count_queries()
+        self.assertEqual(few, many)
+        self.assertEqual(len(data), 20)
+
+        # Las relaciones cargadas en bloque son las mismas que en el detalle
+        detail = self.client.get(reverse('juego:character_info-detail', args=[data[5]['id']])).json()
+        self.assertEqual(data[5]['relationships'], detail['relationships'])
+        self.assertEqual(len(detail['relationships']), 2)
+
+    def test_slim_faction(self):
+        """Verifica que con ?faction=slim la facción no incluye sus miembros"""
+        self.add_characters(3)
+        _, data = self.count_queries({'faction': 'slim'})
+        self.assertEqual(data[0]['faction'], {'id': self.faction.id, 'name': "Los Montaraces", 'location': "Eriador"})
+        _, data = self.count_queries()
+        self.assertEqual(len(data[0]['faction']['members']), 3)
+
+
+class PaginationAndFieldsTest(APITestCase):
+    """Pruebas de la paginación por cursor y de la selección de campos con ?fields="""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea cinco armas y un usuario.
+        """
+        Weapon.objects.all().delete()
+        self.weapons = [Weapon.objects.create(name=f"Espada {i}", damage=10 * i, critic=5, accuracy=80) for i in range(5)]
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        self.url = reverse('juego:weapon-list')
+
+    def test_cursor_pagination(self):
+        """Verifica que se recorren todas las armas por páginas siguiendo el cursor"""
+        names = []
+        url = self.url + '?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 2)
+            names += [weapon['name'] for weapon in data['results']]
+            url = data['next']
+        self.assertEqual(names, [weapon.name for weapon in self.weapons])
+
+    def test_sparse_fields(self):
+        """Verifica que ?fields= devuelve solo los campos pedidos en listas y detalles"""
+        data = self.client.get(self.url, {'fields': 'id,name'}).json()
+        self.assertEqual(data['results'][0], {'id': self.weapons[0].id, 'name': "Espada 0"})
+
+        data = self.client.get(reverse('juego:weapon-detail', args=[self.weapons[1].id]), {'fields': 'damage'}).json()
+        self.assertEqual(data, {'damage': 10})
+
+    def test_sparse_fields_skip_relationship_query(self):
+        """Verifica que sin el campo de relaciones no se consultan las relaciones"""
+        url = reverse('juego:character_info-list')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'fields': 'id,name', 'faction': 'slim'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'name'})
+        self.assertFalse(any('juego_relationship' in q['sql'] for q in queries.captured_queries))
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from juego.character_cards import CHARACTER_PAGE_SIZE, character_page, render_character_cards
+from juego.models import Armor, Character, Faction, Inventory, Weapon
+
+
+class CharacterCardsTest(TestCase):
+    """Pruebas para la galería de personajes por páginas y con las tarjetas en la caché"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='frodo', password='anillo')
+        self.client.force_login(self.user)
+        self.faction = Faction.objects.create(name="Comarca", location="Hobbiton")
+        self.weapon = Weapon.objects.create(name="Dardo", damage=20)
+        self.armor = Armor.objects.create(name="Mithril", defense=40)
+        self.character = Character.objects.create(name="Bilbo", location="Bolsón Cerrado", faction=self.faction)
+        self.inventory = Inventory.objects.create(character=self.character)
+        self.inventory.weapons.add(self.weapon)
+
+    def test_pages(self):
+        """Verifica que las páginas se recorren por id sin repetir ni saltarse personajes"""
+        Character.objects.bulk_create([Character(name=f"Orco {i}", location="Mordor") for i in range(CHARACTER_PAGE_SIZE + 5)])
+        seen, after = [], None
+        while True:
+            characters, after = character_page(after)
+            seen.extend(character.pk for character in characters)
+            if after is None:
+                break
+        self.assertEqual(seen, list(Character.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_cards_cached(self):
+        """Verifica que las tarjetas se sirven de la caché sin consultar los inventarios"""
+        characters, _ = character_page()
+        first = render_character_cards(characters)
+        self.assertTrue(any('Dardo' in card for card in first))
+        with self.assertNumQueries(0):
+            self.assertEqual(render_character_cards(characters), first)
+
+    def test_cards_invalidated(self):
+        """Verifica que la tarjeta cambia al cambiar el inventario, el personaje o un arma"""
+        def card():
+            characters, _ = character_page()
+            return render_character_cards([c for c in characters if c.pk == self.character.pk])[0]
+
+        self.assertNotIn('Mithril', card())
+        self.inventory.armors.add(self.armor)
+        self.assertIn('Mithril', card())
+        self.armor.inventory_armors.clear()  # Desde la armadura
+        self.assertNotIn('Mithril', card())
+
+        self.character.location = "Rivendel"
+        self.character.save()
+        self.assertIn('Rivendel', card())
+
+        self.weapon.name = "Aguijón"
+        self.weapon.save()
+        self.assertIn('Aguijón', card())
+
+    def test_list_view(self):
+        """Verifica que la galería muestra una página y enlaza con la siguiente"""
+        Character.objects.bulk_create([Character(name=f"Orco {i}", location="Mordor") for i in range(CHARACTER_PAGE_SIZE)])
+        response = self.client.get(reverse('juego:characterView'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cards']), CHARACTER_PAGE_SIZE)
+        self.assertIn('next_cards_url', response.context)
+
+        data = self.client.get(response.context['next_cards_url']).json()
+        self.assertIn('col-md-4', data['html'])
+        self.assertIsNone(data['next'])
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from juego.models import Character
+from juego.routers import ReadReplicaRouter, get_read_database
+from tierramedia.database import database_config, databases_from_env, parse_database_url
+
+
+class DatabaseConfigTest(SimpleTestCase):
+    """Pruebas para la configuración de la base de datos desde variables de entorno"""
+
+    def test_parse_database_url(self):
+        """Verifica que se interpretan las URLs de PostgreSQL y SQLite"""
+        config = parse_database_url('postgres://user:p%40ss@db:5433/juego?sslmode=require')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['USER'], config['PASSWORD'], config['HOST'], config['PORT'], config['NAME']),
+                         ('user', 'p@ss', 'db', '5433', 'juego'))
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual(parse_database_url('sqlite:///db.sqlite3')['NAME'], 'db.sqlite3')
+        with self.assertRaises(ValueError):
+            parse_database_url('mysql://db/juego')
+
+    def test_persistent_connections(self):
+        """Verifica que por defecto las conexiones son persistentes, se comprueban y tienen tiempo máximo por consulta"""
+        config = database_config('postgres://postgres:password@db:5432/django_db', {})
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['options'], '-c statement_timeout=30000')
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_pool(self):
+        """Verifica que con pool no se usan conexiones persistentes"""
+        config = database_config('postgres://db/juego', {'DB_POOL_MAX_SIZE': '8', 'DB_STATEMENT_TIMEOUT': '0'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8, 'timeout': 10})
+        self.assertNotIn('options', config['OPTIONS'])
+
+    def test_asgi(self):
+        """Verifica que con ASGI no hay conexiones persistentes y se usa un pool aunque no se indique"""
+        environ = {'SERVER_MODE': 'asgi', 'DB_CONN_MAX_AGE': '60'}
+        config = database_config('postgres://db/juego', environ)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 10, 'timeout': 10})
+        config = database_config('postgres://db/juego', {**environ, 'DB_POOL_MAX_SIZE': '4'})
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 4)
+        self.assertEqual(database_config('sqlite:///db.sqlite3', environ)['CONN_MAX_AGE'], 0)
+        self.assertEqual(database_config('sqlite:///db.sqlite3', {'SERVER_MODE': 'wsgi'})['CONN_MAX_AGE'], 60)
+
+    def test_replicas(self):
+        """Verifica que cada réplica tiene su alias y en las pruebas apunta a la base de datos principal"""
+        databases = databases_from_env({
+            'DATABASE_URL': 'postgres://db/juego',
+            'DATABASE_REPLICA_URLS': 'postgres://replica1/juego, postgres://replica2/juego',
+        }, default_url='sqlite:///unused.db')
+        self.assertEqual(list(databases), ['default', 'replica_1', 'replica_2'])
+        self.assertEqual(databases['replica_2']['HOST'], 'replica2')
+        self.assertEqual(databases['replica_1']['TEST'], {'MIRROR': 'default'})
+
+
+class ReadReplicaRouterTest(SimpleTestCase):
+    """Pruebas para el router de réplicas de lectura"""
+
+    def test_without_replicas(self):
+        """Verifica que sin réplicas se lee de la base de datos principal"""
+        self.assertEqual(get_read_database(), 'default')
+
+    def test_with_replicas(self):
+        """Verifica que con réplicas las vistas de solo lectura usan una de ellas"""
+        with override_settings(DATABASES={**settings.DATABASES, 'replica_1': settings.DATABASES['default']}):
+            self.assertEqual(get_read_database(), 'replica_1')
+
+    def test_router(self):
+        """Verifica que las escrituras van a la principal y las lecturas de un objeto a su base de datos"""
+        router = ReadReplicaRouter()
+        character = Character(name='Frodo')
+        character._state.db = 'replica_1'
+        self.assertEqual(router.db_for_read(Character, instance=character), 'replica_1')
+        self.assertEqual(router.db_for_read(Character), 'default')
+        self.assertEqual(router.db_for_write(Character, instance=character), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'juego'))
+        self.assertTrue(router.allow_migrate('default', 'juego'))
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from io import StringIO
+import csv
+import json
+import warnings
+
+from asgiref.sync import sync_to_async
+
+from juego.models import Faction, Weapon, Armor, Character, Inventory, Relationship
+from juego.export import export_characters, export_chunk
+
+
+class ExportCharactersTest(TestCase):
+    """Pruebas para la exportación de personajes"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Sustituye los personajes de ejemplo por tres personajes con equipo, inventario y relaciones.
+        """
+        Character.objects.all().delete()
+        faction = Faction.objects.create(name="Los Montaraces", location="Eriador")
+        weapon = Weapon.objects.create(name="Andúril", damage=90, critic=30, accuracy=95)
+        armor = Armor.objects.create(name="Cota", defense=10)
+        self.aragorn = Character.objects.create(name="Aragorn", location="Bree", faction=faction, equipped_weapon=weapon, equipped_armor=armor)
+        self.halbarad = Character.objects.create(name="Halbarad", location="Bree", faction=faction)
+        self.gollum = Character.objects.create(name="Gollum", location="Mordor")
+        inventory = Inventory.objects.create(character=self.aragorn)
+        inventory.weapons.add(weapon)
+        inventory.armors.add(armor)
+        Relationship.objects.create(character1=self.aragorn, character2=self.halbarad, relationship_type='ally')
+        Relationship.objects.create(character1=self.gollum, character2=self.aragorn, relationship_type='enemy')
+
+    def test_ndjson_queries_per_chunk(self):
+        """Verifica que cada bloque cuesta un número fijo de consultas"""
+        # Una consulta de personajes y, por cada bloque de 2, las relaciones en ambos sentidos
+        # y (solo en el primero, el único con inventario) las armas y armaduras del inventario
+        with self.assertNumQueries(1 + 4 + 2):
+            lines = list(export_characters('ndjson', chunk_size=2))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['name'] for row in rows], ["Aragorn", "Halbarad", "Gollum"])
+        self.assertEqual(rows[0]['equipped_weapon']['name'], "Andúril")
+        self.assertEqual(rows[0]['inventory'], {'weapons': [rows[0]['equipped_weapon']['id']], 'armors': [rows[0]['equipped_armor']['id']]})
+        self.assertEqual(rows[0]['relationships'], [
+            {'character': self.halbarad.id, 'relationship_type': 'ally'},
+            {'character': self.gollum.id, 'relationship_type': 'enemy'},
+        ])
+        self.assertIsNone(rows[2]['faction'])
+
+    def test_csv_endpoint(self):
+        """Verifica que la vista devuelve el CSV en streaming y solo a usuarios autenticados"""
+        url = reverse('juego:export_characters')
+        self.assertEqual(self.client.get(url, {'format': 'csv'}).status_code, 302)
+
+        User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+        response = self.client.get(reverse('juego:export_characters'), {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['faction_name'], "Los Montaraces")
+        self.assertEqual(rows[0]['relationships'], f"{self.halbarad.id}:ally;{self.gollum.id}:enemy")
+
+    def test_chunks(self):
+        """Verifica que los bloques por id dan las mismas líneas que la exportación completa"""
+        lines, after = export_chunk('ndjson', chunk_size=2)
+        self.assertEqual(after, self.halbarad.id)
+        rest, after = export_chunk('ndjson', after, chunk_size=2)
+        self.assertIsNone(after)
+        self.assertEqual(lines + rest, list(export_characters('ndjson')))
+
+    async def test_asgi_endpoint(self):
+        """Verifica que con ASGI la respuesta es asíncrona: Django no lee antes la exportación entera"""
+        user = await sync_to_async(User.objects.create_user)(username='testuser', password='password123')
+        await self.async_client.aforce_login(user)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            response = await self.async_client.get(reverse('juego:export_characters'), {'format': 'csv'})
+            self.assertTrue(response.is_async)
+            content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertFalse([w for w in caught if 'synchronous iterators' in str(w.message)])
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['name'] for row in rows], ["Aragorn", "Halbarad", "Gollum"])
+
+    def test_command(self):
+        """Verifica que el comando escribe una línea por personaje"""
+        out = StringIO()
+        call_command('export_characters', stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
@@ -0,0 +1,84 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from juego.faction_stats import with_member_count
+from juego.models import Faction, Weapon, Armor
+from juego.serializers import FactionCharacterCountModelSerializer
+
+
+class FactionStatsTest(APITestCase):
+    """Pruebas para las estadísticas agregadas de las facciones"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea tres facciones (una sin miembros) con personajes en distintas localizaciones y con distinto equipo.
+        """
+        Faction.objects.all().delete()
+        weapon = Weapon.objects.create(name="Espada", damage=50, critic=10, accuracy=80)
+        armor = Armor.objects.create(name="Cota", defense=10)
+        self.hermandad = Faction.objects.create(name='Hermandad', location='Bosque')
+        self.alianza = Faction.objects.create(name='Alianza', location='Montañas')
+        Faction.objects.create(name='Vacía', location='Ninguna')
+        self.hermandad.members.create(name='Miembro1', location='Bosque', equipped_weapon=weapon, equipped_armor=armor)
+        self.hermandad.members.create(name='Miembro2', location='Bosque', equipped_weapon=weapon)
+        self.hermandad.members.create(name='Miembro3', location='Rivendel')
+        self.alianza.members.create(name='Miembro4', location='Montañas', equipped_armor=armor)
+        self.url = reverse('juego:get_factions_member_count')
+
+    def test_single_query(self):
+        """Verifica que el conteo se hace en una sola consulta sea cual sea el número de facciones"""
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).json()
+        self.assertEqual(data, [
+            {'name': 'Hermandad', 'member_count': 3},
+            {'name': 'Alianza', 'member_count': 1},
+            {'name': 'Vacía', 'member_count': 0},
+        ])
+
+    def test_count_serializer(self):
+        """Verifica que el serializador del conteo usa el COUNT agrupado y no una consulta por facción"""
+        with self.assertNumQueries(1):
+            data = FactionCharacterCountModelSerializer(with_member_count().order_by('name'), many=True).data
+        self.assertEqual([dict(row) for row in data], [
+            {'name': 'Alianza', 'character_count': 1},
+            {'name': 'Hermandad', 'character_count': 3},
+            {'name': 'Vacía', 'character_count': 0},
+        ])
+
+    def test_breakdown(self):
+        """Verifica el desglose por localización y equipamiento"""
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {'breakdown': '1'}).json()
+        self.assertEqual(data[0], {
+            'name': 'Hermandad',
+            'member_count': 3,
+            'locations': {'Bosque': 2, 'Rivendel': 1},
+            'gear': {'weapon': 2, 'armor': 1, 'full': 1, 'none': 1},
+        })
+        self.assertEqual(data[1]['gear'], {'weapon': 0, 'armor': 1, 'full': 0, 'none': 0})
+        self.assertEqual(data[2], {
+            'name': 'Vacía', 'member_count': 0, 'locations': {},
+            'gear': {'weapon': 0, 'armor': 0, 'full': 0, 'none': 0},
+        })
+
+    def test_etag(self):
+        """Verifica que con el mismo ETag se responde 304 hasta que cambia un personaje"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.alianza.members.create(name='Miembro5', location='Montañas')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[1]['member_count'], 2)
+
+    def test_pagination(self):
+        """Verifica que la paginación solo se aplica si se pide"""
+        data = self.client.get(self.url, {'page_size': 2}).json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([f['name'] for f in data['results']], ['Hermandad', 'Alianza'])
+        data = self.client.get(self.url, {'page_size': 2, 'page': 2}).json()
+        self.assertEqual([f['name'] for f in data['results']], ['Vacía'])
@@ -0,0 +1,88 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from juego import images
+from juego.models import Character
+
+
+def jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (120, 30, 30)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class ImageDerivativesTest(TestCase):
+    """Pruebas para las versiones reducidas de las imágenes"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.name = default_storage.save('characters/frodo.jpg', ContentFile(jpeg(800, 1200)))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_generate(self):
+        """Verifica que se generan los anchos menores que el original en cada formato"""
+        manifest, generated = images.generate_derivatives(self.name)
+        self.assertTrue(generated)
+        self.assertEqual((manifest['width'], manifest['height']), (800, 1200))
+        for fmt in images.DERIVATIVE_FORMATS:
+            self.assertEqual([width for _, width in manifest['sources'][fmt]], [160, 320, 640])
+            path = images.derivative_name(self.name, 320, fmt)
+            with default_storage.open(path) as file:
+                self.assertEqual(Image.open(file).size, (320, 480))
+
+        # La segunda vez no se vuelve a generar (ni con la caché vacía: se lee el manifiesto)
+        cache.clear()
+        self.assertEqual(images.generate_derivatives(self.name), (manifest, False))
+
+    def test_small_image(self):
+        """Verifica que las imágenes pequeñas no se amplían"""
+        name = default_storage.save('weapons/dardo.jpg', ContentFile(jpeg(100, 50)))
+        manifest, _ = images.generate_derivatives(name)
+        self.assertEqual(manifest['sources']['webp'], [[images.derivative_name(name, 100, 'webp'), 100]])
+
+    def test_picture_tag(self):
+        """Verifica que la etiqueta usa las versiones cuando existen y la imagen original si no"""
+        template = Template('{% load images %}{% picture character.image alt=character.name sizes="32px" class="me-2" %}')
+        character = Character(name="Frodo", location="Hobbiton", image=self.name)
+
+        html = template.render(Context({'character': character}))
+        self.assertNotIn('<picture>', html)
+        self.assertIn('src="/media/characters/frodo.jpg"', html)
+
+        images.generate_derivatives(self.name)
+        html = template.render(Context({'character': character}))
+        self.assertIn('<source type="image/webp" srcset="/media/derivatives/characters/frodo-160.webp 160w', html)
+        self.assertIn('sizes="32px"', html)
+        self.assertIn('class="me-2"', html)
+        self.assertIn('width="800"', html)
+
+    def test_generated_on_save(self):
+        """Verifica que al guardar un personaje se generan en segundo plano tras la transacción"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Character.objects.create(name="Frodo", location="Hobbiton", image=self.name)
+        images._get_executor().shutdown(wait=True)
+        images._executor = None
+        self.assertIsNotNone(images.image_derivatives(self.name))
+
+    def test_backfill_command(self):
+        """Verifica que el comando genera las versiones de las imágenes existentes una sola vez"""
+        Character.objects.bulk_create([Character(name=f"Hobbit {i}", location="Hobbiton", image=self.name) for i in range(3)])
+        out = io.StringIO()
+        call_command('generate_image_derivatives', stdout=out, stderr=io.StringIO())  # Las imágenes iniciales no están en MEDIA_ROOT
+        self.assertIsNotNone(images.image_derivatives(self.name))
+        self.assertIn('1 imágenes procesadas', out.getvalue())
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from juego.metrics import flush_metrics, reset_metrics, sql_fingerprint
+from juego.models import Character, Faction
+
+
+class RequestMetricsTest(TestCase):
+    """Pruebas para las métricas de rendimiento por ruta"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Vacía las métricas del proceso e inicia sesión.
+        """
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.client.login(username='testuser', password='password123')
+
+    def metrics(self):
+        response = self.client.get(reverse('juego:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_template_route(self):
+        """Verifica que se registran la latencia, las consultas y el tiempo de plantillas de una vista HTML"""
+        self.client.get(reverse('juego:characterView'))
+        metrics = self.metrics()
+        labels = 'route="juego:characterView",method="GET"'
+        self.assertIn(f'juego_requests_total{{{labels},status="200"}} 1', metrics)
+        self.assertIn(f'juego_request_duration_seconds_count{{{labels}}} 1', metrics)
+        self.assertIn(f'juego_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', metrics)
+        template_sum = next(line for line in metrics.splitlines()
+                            if line.startswith(f'juego_request_template_seconds_sum{{{labels}}}'))
+        self.assertGreater(float(template_sum.split()[-1]), 0)
+        queries_sum = next(line for line in metrics.splitlines()
+                           if line.startswith(f'juego_request_queries_sum{{{labels}}}'))
+        self.assertGreater(int(queries_sum.split()[-1]), 0)
+
+    def test_api_route(self):
+        """Verifica que se registra el tiempo de serialización de la API"""
+        self.client.get(reverse('juego:faction-list'))
+        metrics = self.metrics()
+        serialization_sum = next(line for line in metrics.splitlines()
+                                 if line.startswith('juego_request_serialization_seconds_sum{route="juego:faction-list"'))
+        self.assertGreater(float(serialization_sum.split()[-1]), 0)
+
+    async def test_async_route(self):
+        """Verifica que se miden también las vistas asíncronas"""
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse('juego:arenaBattles'))
+        response = await self.async_client.get(reverse('juego:metrics'))
+        self.assertIn('juego_requests_total{route="juego:arenaBattles",method="GET",status="200"} 1',
+                      response.content.decode())
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_request_log(self):
+        """Verifica que las peticiones lentas se registran con la huella de sus consultas"""
+        faction = Faction.objects.create(name='Gondor', location='Minas Tirith')
+        Character.objects.create(name='Aragorn', location='Gondor', faction=faction)
+        # El middleware lee el umbral al crearse: se vuelve a crear con el nuevo valor
+        self.client.handler.load_middleware()
+        with self.assertLogs('juego.metrics', level='WARNING') as logs:
+            self.client.get(reverse('juego:factionDetailView', args=[faction.id]))
+        self.assertIn('juego:factionDetailView', logs.output[0])
+        self.assertIn('WHERE "juego_faction"."id" = ?', logs.output[0])
+
+    def test_workers_are_added_up(self):
+        """Verifica que con METRICS_DIR se suman las métricas de todos los procesos"""
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        with override_settings(METRICS_DIR=metrics_dir):
+            self.addCleanup(reset_metrics)
+            self.client.get(reverse('juego:characterView'))
+            flush_metrics()
+            # Otro worker que ha atendido lo mismo (o que ya ha terminado)
+            [own] = os.listdir(metrics_dir)
+            shutil.copy(os.path.join(metrics_dir, own), os.path.join(metrics_dir, '1-otro.json'))
+            metrics = self.metrics()
+        labels = 'route="juego:characterView",method="GET"'
+        self.assertIn(f'juego_requests_total{{{labels},status="200"}} 2', metrics)
+        self.assertIn(f'juego_request_duration_seconds_count{{{labels}}} 2', metrics)
+
+    def test_sql_fingerprint(self):
+        """Verifica que las consultas que solo cambian en los valores tienen la misma huella"""
+        self.assertEqual(
+            sql_fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'Frodo''s'"),
+            sql_fingerprint("SELECT *  FROM t WHERE id IN (7) AND name = 'Sam'"),
+        )
+        self.assertEqual(sql_fingerprint("SELECT * FROM t WHERE id = 42"), "SELECT * FROM t WHERE id = ?")
@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from juego.query_plans import plan_regressions, run_query_plans, sequential_scans
+
+
+class QueryPlansTest(TestCase):
+    """Pruebas para la comprobación de los planes de las consultas más usadas"""
+
+    def test_no_sequential_scans(self):
+        """Verifica que ninguna consulta de HOT_QUERIES recorre entera una tabla grande"""
+        results = run_query_plans(size=2000)
+        self.assertEqual(plan_regressions(results), [])
+        self.assertIn('character_equipment_idx', results['equipment_weapon_and_armor']['plan'])
+        self.assertIn('tournament_match_pending_idx', results['tournament_pending_matches']['plan'])
+
+    def test_sequential_scans(self):
+        """Verifica que se reconocen los recorridos completos de PostgreSQL y SQLite y solo de las tablas vigiladas"""
+        tables = ('juego_character',)
+        postgresql = ("Hash Join  (cost=1.23..45.67 rows=10 width=8)\n"
+                      "  ->  Seq Scan on juego_character  (cost=0.00..40.00 rows=1000 width=8)\n"
+                      "  ->  Seq Scan on juego_weapon  (cost=0.00..1.10 rows=10 width=4)")
+        self.assertEqual(sequential_scans(postgresql, tables, 'postgresql'), ['juego_character'])
+        self.assertEqual(sequential_scans("Index Scan using character_equipment_idx on juego_character",
+                                          tables, 'postgresql'), [])
+        self.assertEqual(sequential_scans("2 0 0 SCAN juego_character", tables, 'sqlite'), ['juego_character'])
+        self.assertEqual(sequential_scans("2 0 0 SCAN juego_character USING INDEX character_equipment_idx\n"
+                                          "5 0 0 SCAN juego_weapon", tables, 'sqlite'), [])
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from juego.forms import CharacterForm, EquipmentForm, InventoryAddItemsForm
+from juego.models import Armor, Faction, Weapon
+from juego.reference_data import bump_reference_version, reference_by_pk, reference_objects
+
+
+class ReferenceDataTest(TestCase):
+    """Pruebas para la caché de facciones, armas y armaduras"""
+
+    def setUp(self):
+        cache.clear()
+        self.weapon = Weapon.objects.create(name="Andúril", damage=50)
+        self.armor = Armor.objects.create(name="Mithril", defense=40)
+
+    def test_cached_until_changed(self):
+        """Verifica que los objetos se leen de la caché hasta que se guarda uno nuevo"""
+        weapons = reference_objects(Weapon)
+        self.assertIn(self.weapon, weapons)
+        with self.assertNumQueries(0):
+            self.assertEqual(reference_objects(Weapon), weapons)
+
+        new_weapon = Weapon.objects.create(name="Dardo", damage=20)  # La señal post_save renueva la versión
+        with self.assertNumQueries(1):
+            self.assertIn(new_weapon, reference_objects(Weapon))
+
+        new_weapon.delete()
+        self.assertNotIn(new_weapon.pk, reference_by_pk(Weapon))
+
+    def test_bulk_bump(self):
+        """Verifica que se renueva la versión tras escrituras que no envían señales"""
+        reference_objects(Faction)
+        Faction.objects.bulk_create([Faction(name="Ents", location="Fangorn")])
+        self.assertNotIn("Ents", [faction.name for faction in reference_objects(Faction)])
+        bump_reference_version(Faction)
+        self.assertIn("Ents", [faction.name for faction in reference_objects(Faction)])
+
+    def test_forms_without_queries(self):
+        """Verifica que los formularios muestran y validan las opciones sin consultar la base de datos"""
+        reference_objects(Weapon)
+        reference_objects(Armor)
+        with self.assertNumQueries(0):
+            form = EquipmentForm(data={'weapon': self.weapon.pk, 'armor': self.armor.pk})
+            self.assertIn('Andúril', form.as_p())
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['weapon'], self.weapon)
+
+        with self.assertNumQueries(0):
+            form = InventoryAddItemsForm(data={'weapons': [self.weapon.pk], 'armors': []})
+            self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.cleaned_data['weapons']), [self.weapon])
+
+    def test_invalid_choice(self):
+        """Verifica que se rechazan los ids que no existen"""
+        form = EquipmentForm(data={'weapon': 999999, 'armor': 'abc'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('weapon', form.errors)
+        self.assertIn('armor', form.errors)
+        form = InventoryAddItemsForm(data={'weapons': [999999]})
+        self.assertFalse(form.is_valid())
+
+    def test_filtered_queryset(self):
+        """Verifica que con un queryset filtrado no se usa la caché"""
+        form = CharacterForm()
+        form.fields['equipped_weapon'].queryset = Weapon.objects.none()
+        self.assertNotIn('Andúril', str(form['equipped_weapon']))
+        self.assertIn('Andúril', str(CharacterForm()['equipped_weapon']))
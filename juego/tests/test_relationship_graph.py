@@ -0,0 +1,71 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from juego.models import Character, Relationship
+from juego.relationship_graph import RelationshipGraph, get_relationship_graph
+
+
+class RelationshipGraphTest(APITestCase):
+    """Pruebas para el grafo de relaciones y sus consultas"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Sustituye las relaciones de ejemplo por siete personajes con amistades, alianzas y enemistades.
+        """
+        Relationship.objects.all().delete()
+        self.c = {name: Character.objects.create(name=name, location="Tierra Media")
+                  for name in ["Frodo", "Sam", "Merry", "Pippin", "Gandalf", "Sauron", "Saruman"]}
+        for name1, name2, relationship_type in [
+            ("Frodo", "Sam", "friend"),
+            ("Sam", "Merry", "friend"),
+            ("Merry", "Pippin", "ally"),
+            ("Frodo", "Sauron", "enemy"),
+            ("Sauron", "Saruman", "enemy"),
+            ("Gandalf", "Saruman", "rival"),
+        ]:
+            Relationship.objects.create(character1=self.c[name1], character2=self.c[name2], relationship_type=relationship_type)
+
+    def ids(self, *names):
+        return [self.c[name].id for name in names]
+
+    def test_graph_queries(self):
+        """Verifica las consultas sobre el índice de adyacencia"""
+        with self.assertNumQueries(1):
+            graph = RelationshipGraph.from_database()
+        self.assertEqual(graph.friends_of_friends(self.c["Frodo"].id), set(self.ids("Merry")))
+        self.assertEqual(graph.shortest_ally_path(self.c["Frodo"].id, self.c["Pippin"].id),
+                         self.ids("Frodo", "Sam", "Merry", "Pippin"))
+        self.assertIsNone(graph.shortest_ally_path(self.c["Frodo"].id, self.c["Gandalf"].id))
+        self.assertEqual(graph.ally_components(), [sorted(self.ids("Frodo", "Sam", "Merry", "Pippin"))])
+        self.assertEqual(graph.enemies_of_enemies(self.c["Frodo"].id), set(self.ids("Saruman")))
+
+    def test_invalidated_on_save_and_delete(self):
+        """Verifica que el grafo se reconstruye al crear o borrar una relación"""
+        graph = get_relationship_graph()
+        with self.assertNumQueries(0):
+            self.assertIs(get_relationship_graph(), graph)
+
+        relationship = Relationship.objects.create(character1=self.c["Pippin"], character2=self.c["Gandalf"], relationship_type='ally')
+        self.assertEqual(len(get_relationship_graph().shortest_ally_path(self.c["Frodo"].id, self.c["Gandalf"].id)), 5)
+        relationship.delete()
+        self.assertIsNone(get_relationship_graph().shortest_ally_path(self.c["Frodo"].id, self.c["Gandalf"].id))
+
+    def test_api(self):
+        """Verifica las rutas de la API del grafo"""
+        response = self.client.get(reverse('juego:get_ally_path', args=self.ids("Frodo", "Pippin")))
+        self.assertEqual(response.json()['length'], 3)
+        self.assertEqual([c['name'] for c in response.json()['path']], ["Frodo", "Sam", "Merry", "Pippin"])
+
+        response = self.client.get(reverse('juego:get_ally_path', args=self.ids("Frodo", "Gandalf")))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('juego:get_friends_of_friends', args=self.ids("Frodo")))
+        self.assertEqual(response.json()['friends_of_friends'], [{'id': self.c["Merry"].id, 'name': "Merry"}])
+
+        response = self.client.get(reverse('juego:get_enemies_of_enemies', args=self.ids("Frodo")))
+        self.assertEqual(response.json()['enemies_of_enemies'], [{'id': self.c["Saruman"].id, 'name': "Saruman"}])
+
+        response = self.client.get(reverse('juego:get_ally_components'))
+        self.assertEqual(len(response.json()), 1)
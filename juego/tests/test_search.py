@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from juego.models import Armor, Character, Faction, Weapon
+from juego.search import MAX_SEARCH_OFFSET, autocomplete, search
+
+
+class SearchTest(TestCase):
+    """Pruebas para la búsqueda de personajes, facciones, armas y armaduras (LIKE en SQLite)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='frodo', password='anillo')
+        self.client.force_login(self.user)
+        self.faction = Faction.objects.create(name="Comarca", location="Hobbiton")
+        self.frodo = Character.objects.create(name="Frodo", location="Bolsón Cerrado", faction=self.faction)
+        self.fredegar = Character.objects.create(name="Fredegar Bolger", location="Cricava")
+        self.sam = Character.objects.create(name="Sam", location="Casa de Frodo")
+        self.dardo = Weapon.objects.create(name="Dardo", damage=20, description="Espada élfica de Frodo")
+        self.mithril = Armor.objects.create(name="Cota de mithril", defense=40, description="Armadura élfica")
+
+    def test_ranking(self):
+        """Verifica que se encuentra el texto en todos los tipos y que el nombre pesa más que el detalle"""
+        results, has_more = search("Frodo")
+        self.assertFalse(has_more)
+        self.assertEqual([(row['type'], row['id']) for row in results][0], ('characters', self.frodo.pk))
+        self.assertCountEqual([(row['type'], row['id']) for row in results[1:]],
+                              [('characters', self.sam.pk), ('weapons', self.dardo.pk)])
+
+    def test_words_and_types(self):
+        """Verifica que tienen que aparecer todas las palabras y que se puede limitar a unos tipos"""
+        results, _ = search("élfica espada")
+        self.assertEqual([(row['type'], row['id']) for row in results], [('weapons', self.dardo.pk)])
+        results, _ = search("élfica", ['armors'])
+        self.assertEqual([row['name'] for row in results], ["Cota de mithril"])
+
+    def test_pagination(self):
+        """Verifica que las páginas no repiten resultados y que `next` lleva a la siguiente"""
+        Character.objects.bulk_create([Character(name=f"Orco {i}", location="Mordor") for i in range(5)])
+        response = self.client.get(reverse('juego:search'), {'q': 'Orco', 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        first = response.json()
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNotNone(first['next'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        names = [row['name'] for row in first['results'] + second['results']]
+        self.assertCountEqual(names, [f"Orco {i}" for i in range(5)])
+
+    def test_max_offset(self):
+        """Verifica que no se puede pedir una página más allá de `MAX_SEARCH_OFFSET`"""
+        url = reverse('juego:search')
+        self.assertEqual(self.client.get(url, {'q': 'Frodo', 'offset': MAX_SEARCH_OFFSET}).status_code, 200)
+        self.assertEqual(self.client.get(url, {'q': 'Frodo', 'offset': MAX_SEARCH_OFFSET + 1}).status_code, 400)
+        Character.objects.bulk_create([Character(name=f"Orco {i}", location="Mordor") for i in range(5)])
+        with mock.patch('juego.search.MAX_SEARCH_OFFSET', 2):
+            results, has_next = search("Orco", limit=2, offset=2)
+            self.assertEqual(len(results), 2)
+            self.assertFalse(has_next)
+            self.assertEqual(search("Orco", limit=2, offset=10**9)[0], results)
+
+    def test_invalid_params(self):
+        """Verifica que se rechazan las búsquedas sin texto y los tipos que no existen"""
+        self.assertEqual(self.client.get(reverse('juego:search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('juego:search'), {'q': 'Frodo', 'type': 'dragones'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('juego:search_autocomplete'), {'q': 'Fr', 'type': 'x'}).status_code, 400)
+
+    def test_autocomplete(self):
+        """Verifica que los nombres que empiezan por el texto salen primero y que se guardan en la caché"""
+        response = self.client.get(reverse('juego:search_autocomplete'), {'q': 'fr', 'type': 'characters'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.json()], ["Fredegar Bolger", "Frodo"])
+        self.assertEqual(autocomplete("f"), [])
+        with self.assertNumQueries(0):
+            self.assertEqual([row['name'] for row in autocomplete("fr", ['characters'])], ["Fredegar Bolger", "Frodo"])
@@ -0,0 +1,95 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from juego import images
+from juego.models import Armor, Weapon
+from juego.storage import (IMMUTABLE_CACHE_CONTROL, delete_if_orphaned, is_immutable, media_storage,
+                           orphaned_files, serve_media)
+
+
+def upload(name='espada.jpg', color=(200, 200, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 40), color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ContentHashStorageTest(TestCase):
+    """Pruebas para el almacenamiento de las imágenes por contenido"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_dedup(self):
+        """Verifica que el mismo contenido se guarda una sola vez con su hash como nombre"""
+        weapon = Weapon.objects.create(name="Andúril", damage=50, image=upload('anduril.JPG'))
+        armor = Armor.objects.create(name="Escudo", defense=10, image=upload('otro_nombre.jpg'))
+        self.assertEqual(weapon.image.name.replace('weapons/', ''), armor.image.name.replace('armors/', ''))
+        self.assertRegex(weapon.image.name, r'^weapons/[0-9a-f]{32}\.jpg$')
+        self.assertTrue(is_immutable(weapon.image.name))
+
+        other = Weapon.objects.create(name="Narsil", damage=40, image=upload('anduril.jpg'))
+        self.assertEqual(other.image.name, weapon.image.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'weapons'))), 1)
+
+        different = Weapon.objects.create(name="Dardo", damage=20, image=upload('anduril.jpg', color=(0, 0, 0)))
+        self.assertNotEqual(different.image.name, weapon.image.name)
+
+    def test_delete_shared(self):
+        """Verifica que al borrar un objeto su imagen solo se borra si nadie más la usa"""
+        weapon = Weapon.objects.create(name="Andúril", damage=50, image=upload())
+        other = Weapon.objects.create(name="Narsil", damage=40, image=upload())
+        name = weapon.image.name
+        images.generate_derivatives(name)
+
+        weapon.delete()
+        self.assertFalse(delete_if_orphaned(name, grace=0))
+        self.assertTrue(media_storage.exists(name))
+
+        other.delete()
+        self.assertTrue(delete_if_orphaned(name, grace=0))
+        self.assertFalse(media_storage.exists(name))
+        self.assertFalse(media_storage.exists(images.derivative_name(name, 40, 'webp')))
+        self.assertFalse(media_storage.exists(images.manifest_name(name)))
+        self.assertIsNone(images.image_derivatives(name))  # Ni en la caché: si se vuelve a subir, se regeneran
+
+    def test_gc_command(self):
+        """Verifica que el comando borra las imágenes sin usar y no las iniciales ni las recientes"""
+        weapon = Weapon.objects.create(name="Andúril", damage=50, image=upload())
+        name = weapon.image.name
+        weapon.image = upload(color=(0, 0, 0))  # La imagen anterior queda sin usar
+        weapon.save()
+        media_storage.save('weapons/default_weapon.jpg', upload())  # Nombre de hash: no es el de los datos iniciales
+
+        self.assertEqual(list(orphaned_files()), [])  # Recién subida
+        self.assertEqual(list(orphaned_files(grace=0)), [name])
+        out = io.StringIO()
+        call_command('gc_media', '--grace', '0', stdout=out)
+        self.assertIn('1 imágenes sin usar borradas', out.getvalue())
+        self.assertFalse(media_storage.exists(name))
+        self.assertTrue(media_storage.exists(weapon.image.name))
+
+    def test_serve_media_headers(self):
+        """Verifica que los ficheros de hash se sirven con caché inmutable"""
+        weapon = Weapon.objects.create(name="Andúril", damage=50, image=upload())
+        request = self.client.get('/').wsgi_request
+        response = serve_media(request, weapon.image.name, document_root=self.media_root)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        with open(os.path.join(self.media_root, 'weapons', 'plain.jpg'), 'wb') as file:
+            file.write(b'x')
+        response = serve_media(request, 'weapons/plain.jpg', document_root=self.media_root)
+        self.assertNotIn('immutable', response['Cache-Control'])
@@ -0,0 +1,134 @@
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import TestCase
+from io import StringIO
+from unittest import mock
+
+from juego.models import Faction, Weapon, Armor, Character, Tournament, TournamentMatch
+from juego.tournament import _create_matches, create_tournament, run_tournament, standings
+
+
+class TournamentTest(TestCase):
+    """Pruebas para los torneos entre personajes"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Sustituye los personajes de ejemplo por cinco personajes equipados de dos facciones.
+        """
+        Character.objects.all().delete()
+        self.montaraces = Faction.objects.create(name="Los Montaraces", location="Eriador")
+        self.corsarios = Faction.objects.create(name="Los Corsarios", location="Umbar")
+        weapon = Weapon.objects.create(name="Espada", damage=80, critic=20, accuracy=80)
+        armor = Armor.objects.create(name="Cota", defense=10)
+        self.characters = [
+            Character.objects.create(name=name, location="Tierra Media", faction=faction,
+                                     equipped_weapon=weapon, equipped_armor=armor)
+            for name, faction in [("Aragorn", self.montaraces), ("Halbarad", self.montaraces),
+                                  ("Angbor", self.corsarios), ("Fuinur", self.corsarios), ("Herumor", None)]
+        ]
+        Character.objects.create(name="Frodo", location="Comarca")  # Sin equipo: no participa
+
+    def test_round_robin_scopes(self):
+        """Verifica las parejas de todos contra todos según el ámbito"""
+        self.assertEqual(create_tournament("Todos").matches.count(), 10)
+        self.assertEqual(create_tournament("Dentro", scope='within').matches.count(), 2)
+        self.assertEqual(create_tournament("Entre", scope='across').matches.count(), 8)
+        self.assertEqual(create_tournament("Facción", faction=self.corsarios).matches.count(), 1)
+
+    def test_round_robin_is_reproducible(self):
+        """Verifica que con la misma semilla el torneo da los mismos resultados"""
+        results = []
+        for name in ("Primero", "Segundo"):
+            tournament = run_tournament(create_tournament(name, seed=7), workers=2)
+            self.assertEqual(tournament.status, 'finished')
+            self.assertFalse(tournament.matches.filter(played=False).exists())
+            results.append([(row['winner_id'], row['wins']) for row in standings(tournament)])
+            self.assertEqual(tournament.champion_id, results[-1][0][0])
+        self.assertEqual(results[0], results[1])
+
+    def test_elimination_has_a_champion(self):
+        """Verifica que la eliminatoria avanza ronda a ronda hasta dejar un campeón"""
+        tournament = create_tournament("Copa", format='elimination', seed=3)
+        # Cinco personajes: dos combates y uno que pasa de ronda sin rival
+        self.assertEqual(tournament.matches.filter(character2__isnull=True, played=True).count(), 1)
+
+        run_tournament(tournament, workers=1)
+        self.assertEqual(list(tournament.matches.values_list('round', flat=True).distinct().order_by('round')), [1, 2, 3])
+        final = tournament.matches.get(round=3)
+        self.assertEqual(tournament.champion_id, final.winner_id)
+
+    def test_resume_only_plays_pending_matches(self):
+        """Verifica que al reanudar un torneo no se repiten los combates ya jugados"""
+        tournament = create_tournament("Interrumpido", seed=5)
+        played = tournament.matches.order_by('id').first()
+        played.winner = played.character1
+        played.turns = 1
+        played.played = True
+        played.save()
+
+        run_tournament(tournament, workers=1)
+        played.refresh_from_db()
+        self.assertEqual(played.turns, 1)
+        self.assertFalse(tournament.matches.filter(played=False).exists())
+
+    def test_resume_without_a_participant(self):
+        """Verifica que si un participante ya no puede combatir al reanudar sus combates los gana el rival"""
+        tournament = create_tournament("Sin equipo", seed=3)
+        unarmed = tournament.matches.order_by('id').first().character1
+        Character.objects.filter(pk=unarmed.pk).update(equipped_weapon=None)
+
+        # Bloques de dos combates: se envían más bloques de los que caben a la vez en el pool
+        with mock.patch('juego.tournament.CHUNK_SIZE', 2):
+            run_tournament(tournament, workers=1)
+        self.assertFalse(tournament.matches.filter(played=False).exists())
+        walkovers = tournament.matches.filter(Q(character1=unarmed) | Q(character2=unarmed))
+        self.assertTrue(walkovers.exists())
+        for match in walkovers:
+            self.assertIsNone(match.turns)
+            self.assertNotEqual(match.winner_id, unarmed.pk)
+
+    def test_deleted_participants(self):
+        """Verifica que al borrar personajes sus combates se conservan: los gana el rival o, sin ninguno, nadie"""
+        tournament = create_tournament("Bajas", format='elimination', seed=3)
+        first = tournament.matches.filter(character2__isnull=False).order_by('id').first()
+        second = tournament.matches.filter(character2__isnull=False).exclude(pk=first.pk).get()
+        survivor = second.character2_id
+        Character.objects.filter(pk__in=[first.character1_id, first.character2_id, second.character1_id]).delete()
+        self.assertEqual(tournament.matches.filter(round=1).count(), 3)
+
+        run_tournament(tournament, workers=1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.character1_id, first.character2_id, first.winner_id, first.played), (None, None, None, True))
+        self.assertEqual((second.winner_id, second.turns), (survivor, None))
+        # Solo avanzan los ganadores: el superviviente y el que pasó de ronda
+        self.assertEqual(tournament.matches.filter(round=2).count(), 1)
+        self.assertEqual(tournament.status, 'finished')
+        self.assertIsNotNone(tournament.champion_id)
+
+    def test_round_created_atomically(self):
+        """Verifica que si falla la creación de una ronda no queda a medias"""
+        tournament = create_tournament("Ronda", format='elimination', seed=3)
+        create = TournamentMatch.objects.bulk_create
+        ids = [c.id for c in self.characters]
+
+        def interrupted(batch):
+            if TournamentMatch.objects.filter(tournament=tournament, round=2).exists():
+                raise RuntimeError('Interrumpido')
+            return create(batch)
+
+        # Lotes de un combate: el primero se inserta y el segundo falla
+        with mock.patch('juego.tournament.BATCH_SIZE', 1), \
+                mock.patch.object(TournamentMatch.objects, 'bulk_create', side_effect=interrupted):
+            with self.assertRaises(RuntimeError):
+                _create_matches(tournament, 2, [(ids[0], ids[1]), (ids[2], ids[3])])
+        self.assertFalse(tournament.matches.filter(round=2).exists())
+
+    def test_command(self):
+        """Verifica que el comando crea y juega el torneo"""
+        out = StringIO()
+        call_command('run_tournament', '--seed', '1', '--workers', '1', stdout=out)
+        self.assertEqual(Tournament.objects.get().status, 'finished')
+        self.assertEqual(TournamentMatch.objects.filter(played=True).count(), 10)
+        self.assertIn("Campeón", out.getvalue())
@@ -580,7 +580,7 @@ class FactionViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Verifica que el número de facciones en la respuesta sea correcto
-        data = response.json()
+        data = response.json()['results']  # La lista viene paginada por cursor
         self.assertEqual(len(data), 2)  # Deben aparecer 2 facciones en la respuesta
 
     def test_create_faction(self):
@@ -677,8 +677,8 @@ class ArmorViewSetTest(APITestCase):
         self.client.login(username='testuser', password='password123')  # Inicia sesión con el usuario de prueba
         response = self.client.get(self.url)  # Solicita la lista de armaduras
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # Verifica que la respuesta sea exitosa
-        self.assertEqual(len(response.data), 1)  # Verifica que la lista contiene una armadura
-        self.assertEqual(response.data[0]['name'], 'Armadura de Hierro')  # Verifica que la armadura está en la lista
+        self.assertEqual(len(response.data['results']), 1)  # Verifica que la lista contiene una armadura
+        self.assertEqual(response.data['results'][0]['name'], 'Armadura de Hierro')  # Verifica que la armadura está en la lista
 
     def test_armor_detail(self):
         """
@@ -779,7 +779,7 @@ class WeaponViewSetTests(APITestCase):
 
         response = self.client.get(self.url_list, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # Verifica que la solicitud fue exitosa
-        self.assertEqual(len(response.data), 2)  # Verifica que se devuelven dos armas
+        self.assertEqual(len(response.data['results']), 2)  # Verifica que se devuelven dos armas
 
     def test_get_weapon_detail(self):
         """
@@ -880,7 +880,7 @@ class RelationshipViewSetTests(APITestCase):
 
         response = self.client.get(self.url_list, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # Verifica que la solicitud fue exitosa
-        self.assertEqual(len(response.data), 1)  # Verifica que se devuelven una relación
+        self.assertEqual(len(response.data['results']), 1)  # Verifica que se devuelven una relación
 
     def test_get_relationship_detail(self):
         """
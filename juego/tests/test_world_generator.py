@@ -0,0 +1,72 @@
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from io import StringIO
+
+from juego.models import Faction, Weapon, Armor, Character, Inventory, Relationship
+from juego.world_generator import WorldGenerator
+
+
+class WorldGeneratorTest(TestCase):
+    """Pruebas para el generador de mundos sintéticos"""
+
+    def snapshot(self):
+        """Mundo generado sin ids, para comparar dos generaciones"""
+        characters = list(Character.objects.filter(name__regex=r' \d+$').order_by('id').values_list(
+            'name', 'location', 'faction__name', 'equipped_weapon__name', 'equipped_armor__name',
+        ))
+        inventories = list(Inventory.objects.filter(character__name__regex=r' \d+$').order_by('id').annotate(
+            n_weapons=Count('weapons', distinct=True), n_armors=Count('armors', distinct=True),
+        ).values_list('character__name', 'n_weapons', 'n_armors'))
+        relationships = list(Relationship.objects.filter(character1__name__regex=r' \d+$').order_by('id').values_list(
+            'character1__name', 'character2__name', 'relationship_type',
+        ))
+        weapons = list(Weapon.objects.filter(name__regex=r' \d+$').order_by('id').values_list('name', 'damage', 'critic', 'accuracy'))
+        return characters, inventories, relationships, weapons
+
+    def generate(self, **kwargs):
+        options = dict(factions=5, weapons=20, armors=10, characters=300, relationships=2, seed=7, chunk_size=100)
+        options.update(kwargs)
+        return WorldGenerator(**options).generate()
+
+    def test_counts(self):
+        """Verifica que se generan las filas pedidas y que todos los personajes tienen inventario"""
+        rows = self.generate()
+        self.assertEqual(rows['faction'], 5)
+        self.assertEqual(rows['character'], 300)
+        self.assertEqual(Character.objects.filter(faction__name__endswith='7-1').exists(), True)
+        self.assertEqual(Inventory.objects.filter(character__name__regex=r' \d+$').count(), 300)
+        self.assertEqual(Relationship.objects.filter(character1__name__regex=r' \d+$').count(), rows['relationship'])
+        self.assertFalse(Weapon.objects.filter(name__regex=r' \d+$', critic__isnull=True).exists())
+
+    def test_same_seed_same_world(self):
+        """Verifica que la misma semilla genera el mismo mundo y otra semilla uno distinto"""
+        self.generate()
+        first = self.snapshot()
+        Character.objects.filter(name__regex=r' \d+$').delete()
+        Weapon.objects.filter(name__regex=r' \d+$').delete()
+        Armor.objects.filter(name__regex=r' \d+$').delete()
+        Faction.objects.filter(name__regex=r' 7-\d+$').delete()
+
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+        Character.objects.filter(name__regex=r' \d+$').delete()
+        Weapon.objects.filter(name__regex=r' \d+$').delete()
+        self.generate(seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_skew(self):
+        """Verifica que la facción más grande tiene bastantes más miembros que la media"""
+        self.generate(characters=1000, relationships=0)
+        sizes = sorted(Faction.objects.filter(name__regex=r' 7-\d+$').annotate(n=Count('members')).values_list('n', flat=True))
+        self.assertGreater(sizes[-1], 2 * sum(sizes) / len(sizes))
+
+    def test_command(self):
+        """Verifica que el comando genera el mundo e informa de las filas generadas"""
+        out = StringIO()
+        call_command('generate_world', '--factions', '2', '--weapons', '3', '--armors', '3',
+                     '--characters', '10', '--seed', '1', stdout=out)
+        self.assertIn('filas generadas', out.getvalue())
+        self.assertEqual(Character.objects.filter(faction__name__regex=r' 1-\d+$').count()
+                         + Character.objects.filter(name__regex=r' \d+$', faction__isnull=True).count(), 10)
@@ -0,0 +1,100 @@
+from django.core.management import call_command
+from django.test import TestCase
+from io import StringIO
+import json
+import os
+import tempfile
+
+from juego.models import Faction, Weapon, Character, Inventory, Relationship
+from juego.world_import import WorldImporter, read_records
+
+
+class LoadWorldTest(TestCase):
+    """Pruebas para la importación masiva del mundo"""
+
+    def setUp(self):
+        """
+        Configuración inicial de los datos de prueba.
+        Crea un directorio temporal para los ficheros a importar.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def write_ndjson(self, name, records):
+        return self.write(name, ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+
+    def test_ndjson_world(self):
+        """Verifica que se importa un mundo completo resolviendo las referencias por nombre"""
+        records = [
+            {'type': 'faction', 'name': 'Los Montaraces', 'location': 'Eriador'},
+            {'type': 'weapon', 'name': 'Andúril', 'damage': 90, 'critic': 30, 'accuracy': 95},
+            {'type': 'weapon', 'name': 'Arco', 'damage': 40},
+            {'type': 'armor', 'name': 'Mithril', 'defense': 60},
+        ] + [
+            {'type': 'character', 'name': f'Montaraz {i}', 'location': 'Bree', 'faction': 'Los Montaraces',
+             'equipped_weapon': 'Andúril', 'equipped_armor': 'Mithril', 'inventory_weapons': ['Andúril', 'Arco']}
+            for i in range(25)
+        ] + [
+            {'type': 'relationship', 'character1': f'Montaraz {i}', 'character2': f'Montaraz {i + 1}', 'relationship_type': 'ally'}
+            for i in range(24)
+        ] + [
+            {'type': 'character', 'name': 'Perdido', 'faction': 'Facción inexistente'},
+            {'type': 'relationship', 'character1': 'Montaraz 0', 'character2': 'Montaraz 0'},
+        ]
+        path = self.write_ndjson('world.ndjson', records)
+
+        stats = WorldImporter(chunk_size=10).load(read_records(path))
+        self.assertEqual(stats.skipped, 2)
+        faction = Faction.objects.get(name='Los Montaraces')
+        self.assertEqual(faction.members.count(), 25)
+        self.assertEqual(Inventory.objects.filter(character__faction=faction, weapons__name='Arco').count(), 25)
+        self.assertEqual(Relationship.objects.filter(character1__faction=faction, relationship_type='ally').count(), 24)
+        arco = Weapon.objects.get(name='Arco')
+        self.assertIsNotNone(arco.critic)
+        self.assertIsNotNone(arco.accuracy)
+
+    def test_queries_do_not_depend_on_rows(self):
+        """Verifica que el número de consultas depende del número de bloques y no de filas"""
+        Faction.objects.create(name='Los Corsarios', location='Umbar')
+        path = self.write('characters.csv', 'name,location,faction\n' + ''.join(f'Corsario {i},Umbar,Los Corsarios\n' for i in range(100)))
+        importer = WorldImporter(chunk_size=100)
+        # Los diccionarios de nombres se cargan al crear el importador; el único bloque son dos INSERT
+        # (personajes e inventarios) en su transacción
+        with self.assertNumQueries(4):
+            importer.load(read_records(path))
+        self.assertEqual(Character.objects.filter(faction__name='Los Corsarios').count(), 100)
+        self.assertEqual(Inventory.objects.filter(character__faction__name='Los Corsarios').count(), 100)
+
+    def test_invalid_json_line(self):
+        """Verifica que una línea NDJSON inválida se descarta sin interrumpir la importación"""
+        path = self.write('world.ndjson',
+                          '{"type": "faction", "name": "Los Corsarios"}\n'
+                          '{"type": "character", "name": "Angbor", "faction": \n'
+                          '[1, 2]\n'
+                          '{"type": "character", "name": "Angbor", "faction": "Los Corsarios"}\n')
+        stats = WorldImporter(chunk_size=1).load(read_records(path))
+        self.assertEqual(stats.skipped, 2)
+        self.assertTrue(stats.errors[0].startswith('Línea 2: JSON no válido'))
+        self.assertTrue(stats.errors[1].startswith('Línea 3:'))
+        angbor = Character.objects.get(name='Angbor')
+        self.assertEqual(angbor.faction.name, 'Los Corsarios')
+        self.assertFalse(angbor.inventory.weapons.exists())
+
+    def test_command(self):
+        """Verifica que el comando importa varios ficheros en orden e informa de las filas por segundo"""
+        factions = self.write('factions.csv', 'name,location\nLos Corsarios,Umbar\n')
+        armors = self.write('armors.csv', 'name,defense\nCota de Umbar,20\n')
+        characters = self.write('characters.csv', 'name,location,faction,equipped_armor,inventory_armors\n'
+                                                  'Angbor,Umbar,Los Corsarios,Cota de Umbar,Cota de Umbar\n')
+        out = StringIO()
+        call_command('loadworld', factions, armors, characters, stdout=out, stderr=StringIO())
+        self.assertIn('filas/s', out.getvalue())
+        angbor = Character.objects.get(name='Angbor')
+        self.assertEqual(angbor.equipped_armor.name, 'Cota de Umbar')
+        self.assertEqual(list(angbor.inventory.armors.values_list('name', flat=True)), ['Cota de Umbar'])
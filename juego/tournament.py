@@ -0,0 +1,269 @@
+"""
+Torneos entre personajes: todos contra todos o eliminatoria.
+
+Los combates se resuelven con el motor de `juego.battle` en un `ProcessPoolExecutor`,
+repartidos en bloques entre todos los núcleos. Los enfrentamientos se crean de antemano
+con `bulk_create` y los resultados se guardan por bloques con `bulk_update`, así que un
+torneo interrumpido se puede reanudar: solo se vuelven a jugar los combates pendientes.
+"""
+import itertools
+import os
+import random
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from juego.battle import CombatStats, simulate_battle
+from juego.forms import CharacterBattleForm
+from juego.models import Character, Tournament, TournamentMatch
+
+# Combates que se envían juntos a cada proceso y que se guardan en una misma escritura
+CHUNK_SIZE = 2000
+
+# Bloques enviados y sin terminar por proceso
+MAX_PENDING_CHUNKS = 2
+
+# Enfrentamientos que se insertan por consulta al crear el torneo
+BATCH_SIZE = 5000
+
+
+def tournament_characters(tournament):
+    """
+    Personajes que participan en el torneo: los que pueden combatir (con arma y armadura),
+    opcionalmente solo los de la facción del torneo.
+    """
+    queryset = CharacterBattleForm.base_fields['character'].queryset.order_by('id')
+    if tournament.faction_id:
+        queryset = queryset.filter(faction_id=tournament.faction_id)
+    return queryset
+
+
+def _round_robin_pairs(characters, scope):
+    """
+    Genera las parejas de un todos contra todos según el ámbito del torneo.
+    """
+    for char1, char2 in itertools.combinations(characters, 2):
+        same_faction = char1.faction_id is not None and char1.faction_id == char2.faction_id
+        if scope == 'within' and not same_faction:
+            continue
+        if scope == 'across' and same_faction:
+            continue
+        yield char1.id, char2.id
+
+
+def _elimination_pairs(character_ids, rng):
+    """
+    Empareja los personajes de una ronda eliminatoria al azar. Si el número es impar,
+    el último pasa de ronda sin combatir.
+    """
+    character_ids = list(character_ids)
+    rng.shuffle(character_ids)
+    pairs = list(zip(character_ids[0::2], character_ids[1::2]))
+    if len(character_ids) % 2:
+        pairs.append((character_ids[-1], None))
+    return pairs
+
+
+def _create_matches(tournament, round_number, pairs):
+    """
+    Inserta los enfrentamientos de una ronda por lotes. Los que no tienen rival ya se dan por jugados.
+    La ronda se crea entera o no se crea: al reanudar un torneo interrumpido no puede quedar a medias.
+    """
+    matches = (
+        TournamentMatch(
+            tournament=tournament, round=round_number, character1_id=char1, character2_id=char2,
+            winner_id=None if char2 else char1, played=char2 is None,
+        )
+        for char1, char2 in pairs
+    )
+    with transaction.atomic():
+        while batch := list(itertools.islice(matches, BATCH_SIZE)):
+            TournamentMatch.objects.bulk_create(batch)
+
+
+def create_tournament(name, format='round_robin', scope='all', faction=None, seed=None):
+    """
+    Crea un torneo y sus enfrentamientos (en eliminatoria, solo los de la primera ronda).
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 62)
+    with transaction.atomic():
+        tournament = Tournament.objects.create(name=name, format=format, scope=scope, faction=faction, seed=seed)
+        characters = list(tournament_characters(tournament).select_related(None).only('id', 'faction_id'))
+        if format == 'elimination':
+            pairs = _elimination_pairs([c.id for c in characters], random.Random(seed))
+        else:
+            pairs = _round_robin_pairs(characters, scope)
+        _create_matches(tournament, 1, pairs)
+    return tournament
+
+
+def _match_seed(tournament_seed, *key):
+    """
+    Semilla de un combate: depende solo de la semilla del torneo, la ronda y los personajes,
+    de modo que repetir o reanudar un torneo produce los mismos resultados.
+    """
+    return zlib.crc32(':'.join(map(str, (tournament_seed, *key))).encode())
+
+
+def play_matches(matches):
+    """
+    Juega una lista de combates [(match_id, stats1, stats2, seed)] y devuelve
+    [(match_id, ganador, turnos)]. Se ejecuta en los procesos del pool.
+    """
+    results = []
+    for match_id, stats1, stats2, seed in matches:
+        winner, turns = simulate_battle(stats1, stats2, random.Random(seed))
+        winner_id = None if winner is None else (stats1, stats2)[winner].id
+        results.append((match_id, winner_id, turns))
+    return results
+
+
+def _pending_chunks(tournament, stats):
+    """
+    Reparte en bloques los combates pendientes del torneo, ya con las estadísticas de cada personaje.
+    Cada bloque se lee con su propia consulta (por id), sin un cursor abierto mientras se guardan
+    los resultados. Devuelve (combates que jugar, resultados de los que no se juegan): si falta
+    algún personaje (se ha borrado o ya no puede combatir desde que se creó el torneo) el combate
+    no se juega y lo gana el otro; si faltan los dos, no lo gana nadie.
+    """
+    last_id = 0
+    while chunk := list(
+        TournamentMatch.objects.filter(tournament=tournament, played=False, id__gt=last_id)
+        .order_by('id')
+        .values_list('id', 'round', 'character1_id', 'character2_id')[:CHUNK_SIZE]
+    ):
+        last_id = chunk[-1][0]
+        matches, walkovers = [], []
+        for match_id, round_number, char1, char2 in chunk:
+            if char1 in stats and char2 in stats:
+                matches.append((match_id, stats[char1], stats[char2],
+                                _match_seed(tournament.seed, round_number, char1, char2)))
+            else:
+                winner_id = char1 if char1 in stats else char2 if char2 in stats else None
+                walkovers.append((match_id, winner_id, None))
+        yield matches, walkovers
+
+
+def _save_results(tournament, results):
+    """
+    Guarda los resultados de un bloque con una sola consulta `bulk_update`.
+    En eliminatoria un empate lo gana el primer personaje para que siempre haya alguien que avance.
+    Los combates no jugados (`turns` None) sin ganador no son empates: no avanza nadie.
+    """
+    matches = TournamentMatch.objects.in_bulk([match_id for match_id, _, _ in results])
+    for match_id, winner_id, turns in results:
+        match = matches[match_id]
+        if winner_id is None and turns is not None and tournament.format == 'elimination':
+            winner_id = match.character1_id
+        match.winner_id = winner_id
+        match.turns = turns
+        match.played = True
+    TournamentMatch.objects.bulk_update(matches.values(), ['winner', 'turns', 'played'])
+
+
+def run_tournament(tournament, workers=None, progress=None):
+    """
+    Juega todos los combates pendientes del torneo repartiéndolos entre `workers` procesos
+    (por defecto, tantos como núcleos). `progress(jugados, total)` se llama tras cada bloque.
+    Se puede volver a llamar sobre un torneo interrumpido para reanudarlo.
+    """
+    workers = workers or os.cpu_count() or 1
+    tournament.status = 'running'
+    tournament.save(update_fields=['status'])
+
+    # Las estadísticas de todos los participantes se cargan una sola vez
+    stats = {
+        character.id: CombatStats.from_character(character)
+        for character in Character.objects.select_related('equipped_weapon', 'equipped_armor').filter(
+            id__in=tournament_characters(tournament).values('id')
+        )
+    }
+
+    # Las conexiones a la base de datos no se deben compartir con los procesos hijos
+    close_old_connections()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            matches = TournamentMatch.objects.filter(tournament=tournament)
+            total = matches.count()
+            done = matches.filter(played=True).count()
+
+            def save(results):
+                nonlocal done
+                _save_results(tournament, results)
+                done += len(results)
+                if progress:
+                    progress(done, total)
+
+            # Como mucho `MAX_PENDING_CHUNKS` bloques por proceso a la vez: la memoria no crece
+            # con el número de combates del torneo
+            futures = set()
+            for chunk, walkovers in _pending_chunks(tournament, stats):
+                if walkovers:
+                    save(walkovers)
+                if chunk:
+                    futures.add(executor.submit(play_matches, chunk))
+                if len(futures) >= workers * MAX_PENDING_CHUNKS:
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        save(future.result())
+            for future in as_completed(futures):
+                save(future.result())
+
+            if tournament.format != 'elimination' or not _next_elimination_round(tournament):
+                break
+
+    _finish(tournament)
+    return tournament
+
+
+def _next_elimination_round(tournament):
+    """
+    Crea la siguiente ronda de una eliminatoria con los ganadores de la última (los combates sin
+    ganador no aportan a nadie). Devuelve False si ya solo queda el campeón.
+    """
+    last_round = _last_round(tournament)
+    winners = list(
+        TournamentMatch.objects.filter(tournament=tournament, round=last_round, winner__isnull=False)
+        .order_by('id').values_list('winner_id', flat=True)
+    )
+    if len(winners) < 2:
+        return False
+    rng = random.Random(_match_seed(tournament.seed, 'ronda', last_round + 1))
+    _create_matches(tournament, last_round + 1, _elimination_pairs(winners, rng))
+    return True
+
+
+def _last_round(tournament):
+    return TournamentMatch.objects.filter(tournament=tournament).order_by('-round').values_list('round', flat=True).first()
+
+
+def _finish(tournament):
+    """
+    Marca el torneo como terminado y guarda el campeón: el ganador de la final en eliminatoria
+    (ninguno si en la última ronda no ganó nadie) o el personaje con más victorias en todos contra todos.
+    """
+    matches = TournamentMatch.objects.filter(tournament=tournament)
+    if tournament.format == 'elimination':
+        tournament.champion_id = (
+            matches.filter(round=_last_round(tournament), winner__isnull=False)
+            .order_by('id').values_list('winner_id', flat=True).first()
+        )
+    else:
+        tournament.champion_id = standings(tournament).values_list('winner_id', flat=True).first()
+    tournament.status = 'finished'
+    tournament.save(update_fields=['champion', 'status'])
+
+
+def standings(tournament):
+    """
+    Clasificación del torneo: número de victorias por personaje, de más a menos.
+    """
+    return (
+        TournamentMatch.objects.filter(tournament=tournament, winner__isnull=False)
+        .values('winner_id', 'winner__name')
+        .annotate(wins=Count('id'))
+        .order_by('-wins', 'winner_id')
+    )
@@ -5,6 +5,7 @@ from rest_framework.routers import DefaultRouter
 
 
 from juego import views
+from juego.storage import serve_media
 from juego.views import *
 
 # Importar DefaultRouter para crear rutas automáticas para los ViewSets
@@ -34,7 +35,30 @@ urlpatterns = [
     # Ruta para obtener el conteo de miembros por facción
     path('api/faction_member_count/', get_factions_member_count, name='get_factions_member_count'),
 
+    # Ruta para obtener la matriz de probabilidades de victoria entre personajes
+    path('api/battle_matrix/', get_battle_matrix, name='get_battle_matrix'),
+
+    # Rutas para las consultas sobre el grafo de relaciones
+    path('api/relationship_graph/components/', get_ally_components, name='get_ally_components'),
+    path('api/relationship_graph/path/<int:source>/<int:target>/', get_ally_path, name='get_ally_path'),
+    path('api/relationship_graph/<int:pk>/friends_of_friends/', get_friends_of_friends, name='get_friends_of_friends'),
+    path('api/relationship_graph/<int:pk>/enemies_of_enemies/', get_enemies_of_enemies, name='get_enemies_of_enemies'),
+
+    # Rutas de la búsqueda de personajes, facciones, armas y armaduras
+    path('api/search/', search_view, name='search'),
+    path('api/search/autocomplete/', autocomplete_view, name='search_autocomplete'),
+
+    # Ruta para exportar todos los personajes (NDJSON o CSV)
+    path('api/export/characters/', export_characters_view, name='export_characters'),
+
+    # Ruta con las métricas de rendimiento para Prometheus
+    path('metrics/', metrics_view, name='metrics'),
+
+    # Ruta para repetir una batalla registrada
+    path('api/battle_logs/<int:pk>/replay/', get_battle_replay, name='get_battle_replay'),
+
     path('character/', views.CharacterListView.as_view(), name='characterView'),  # Vista de lista de personajes
+    path('character/cards/', views.CharacterCardsView.as_view(), name='characterCardsView'),  # Página siguiente de la lista (scroll infinito)
     path('character/<int:pk>/', views.CharacterDetailView.as_view(), name='characterDetailView'), # Vista de detalle de personaje
     path('character/<int:pk>/update/', views.CharacterUpdateView.as_view(), name='characterUpdateView'), # Vista para actualizar personaje
     path('character/<int:pk>/delete/', views.CharacterDeleteView.as_view(), name='characterDeleteView'), # Vista para eliminar personaje
@@ -58,6 +82,12 @@ urlpatterns = [
     path('battle/', views.BattleView.as_view(), name='battleView'), # Vista para batallas entre personajes
     path('battle/attack/', views.AttackView.as_view(), name='attackView'),
 
+    # API asíncrona de la arena: varias batallas por usuario y canal SSE con los turnos
+    path('api/arena/battles/', views.arena_battles, name='arenaBattles'),
+    path('api/arena/battles/<str:battle_id>/', views.arena_battle_detail, name='arenaBattleDetail'),
+    path('api/arena/battles/<str:battle_id>/attack/', views.arena_attack, name='arenaAttack'),
+    path('api/arena/battles/<str:battle_id>/stream/', views.arena_battle_stream, name='arenaBattleStream'),
+
     path('equipment/weapons/', views.WeaponListView.as_view(), name='weaponListView'), # Vista de lista de armas
     path('equipment/weapon/<int:pk>/', views.WeaponDetailView.as_view(), name='weaponDetailView'), # Vista de detalle de arma
     path('equipment/weapons/<int:pk>/edit/', views.WeaponUpdateView.as_view(), name='weaponUpdateView'), # Vista para editar arma
@@ -85,5 +115,6 @@ urlpatterns = [
 
 # Si el modo DEBUG está habilitado, agregar las rutas para servir archivos estáticos y medios
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Los ficheros subidos, con cabeceras de caché (ver juego/storage.py)
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -1,9 +1,10 @@
 from django.contrib.auth import login
 from django.db.models import Count
 from django.shortcuts import get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.views.generic import TemplateView, ListView, DetailView, CreateView, UpdateView, FormView, DeleteView
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from juego.models import *
 from juego.forms import *
@@ -13,13 +14,33 @@ from juego.models import Character
 from juego.serializers import CharacterSerializer
 from rest_framework import status, viewsets
 from juego.serializers import *
-import random
 from django.shortcuts import render, get_object_or_404
 from juego.forms import CharacterBattleForm
+from juego import battle_matrix
+from juego.battle_store import (
+    add_user_battle, aget_battle, battle_notifier, get_battle_store, get_user_battles, locked_battle,
+)
+from juego.battle_log import replay_battle, save_battle_logs
+from juego.faction_stats import bump_faction_stats_version, faction_stats_etag, get_faction_stats
+from juego.relationship_graph import get_relationship_graph
+from juego.export import EXPORT_FORMATS, aexport_characters, export_characters
+from rest_framework.pagination import PageNumberPagination
+from juego.battle import BattleError, CombatStats, bump_equipment_versions, play_turn, start_battle, winner_phrase
+from juego.bulk import BULK_BATCH_SIZE, BulkModelMixin
+from juego.metrics import render_prometheus
+from juego.routers import ReadReplicaMixin
+from juego.reference_data import bump_reference_version, reference_objects
+from juego.character_cards import after_param, bump_character_card_versions, character_page, render_character_cards
+from juego.search import MAX_SEARCH_OFFSET, MAX_SEARCH_PAGE_SIZE, SEARCH_PAGE_SIZE, SEARCH_TYPES, autocomplete, search
+import asyncio
 import json
+import time
+from asgiref.sync import sync_to_async
 from django.contrib.auth import login
 from django.db.models import Count
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
 from django.views import View
 
 # Create your views here.
@@ -65,6 +86,13 @@ class FactionView(LoginRequiredMixin, TemplateView):
         return context
 
 
+# Paginación opcional de las estadísticas de facciones (solo si se pide `page` o `page_size`)
+class FactionStatsPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 # Vista para obtener el conteo de miembros por facción
 @api_view(['GET'])  # Especificamos que esta vista solo responde a solicitudes GET
 def get_factions_member_count(request):
@@ -72,27 +100,208 @@ def get_factions_member_count(request):
     Esta vista obtiene el número de miembros para cada facción en el sistema.
 
     Procesa una solicitud GET y devuelve un JSON con el nombre de la facción
-    y su respectivo número de miembros.
-    """
-    # Obtener todas las facciones desde la base de datos
-    factions = Faction.objects.all()
+    y su respectivo número de miembros, calculado en una sola consulta agregada.
+
+    Parámetros opcionales:
+    - `breakdown=1`: añade el desglose por localización y equipamiento.
+    - `page` / `page_size`: devuelve los resultados paginados.
 
-    # Inicializar una lista vacía para almacenar los datos que se devolverán
-    data = []
+    La respuesta lleva un ETag; si el cliente lo envía en `If-None-Match` y nada ha cambiado
+    se responde 304 sin consultar la base de datos.
+    """
+    breakdown = request.query_params.get('breakdown') in ('1', 'true')
+    etag = faction_stats_etag(breakdown)
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
 
-    # Recorrer cada facción
-    for faction in factions:
-        # Contar el número de miembros asociados a cada facción
-        member_count = faction.members.count()
+    # Estadísticas de todas las facciones (desde la caché si no han cambiado)
+    data = get_faction_stats(breakdown)
 
-        # Añadir los datos de la facción y el conteo de miembros a la lista
-        data.append({
-            'name': faction.name,  # Nombre de la facción
-            'member_count': member_count  # Número de miembros
-        })
+    if 'page' in request.query_params or 'page_size' in request.query_params:
+        paginator = FactionStatsPagination()
+        response = paginator.get_paginated_response(paginator.paginate_queryset(data, request))
+    else:
+        response = Response(data)
 
     # Retornar la respuesta con los datos en formato JSON
-    return Response(data)
+    response['ETag'] = etag
+    return response
+
+
+def _search_types(request):
+    """Tipos de `?type=characters,weapons` (todos si no se indica) o None si alguno no existe"""
+    kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+    if any(kind not in SEARCH_TYPES for kind in kinds):
+        return None
+    return kinds or list(SEARCH_TYPES)
+
+
+# Vista para buscar personajes, facciones, armas y armaduras
+@api_view(['GET'])
+def search_view(request):
+    """
+    Busca el texto de `q` en personajes, facciones, armas y armaduras (ver juego/search.py).
+
+    Parámetros opcionales:
+    - `type`: tipos en los que buscar separados por comas (`characters`, `factions`, `weapons`, `armors`).
+    - `limit` / `offset`: tamaño y comienzo de la página (`offset` como mucho `MAX_SEARCH_OFFSET`).
+
+    Devuelve los resultados más relevantes primero y la dirección de la página siguiente (`next`).
+    """
+    text = request.query_params.get('q', '').strip()
+    kinds = _search_types(request)
+    try:
+        limit = min(max(int(request.query_params.get('limit', SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+    except ValueError:
+        return Response({'error': 'limit y offset tienen que ser números'}, status=status.HTTP_400_BAD_REQUEST)
+    if offset > MAX_SEARCH_OFFSET:
+        return Response({'error': f'offset no puede pasar de {MAX_SEARCH_OFFSET}: afina la búsqueda'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not text or kinds is None:
+        return Response({'error': f"Se esperaba ?q=texto y como tipos {', '.join(SEARCH_TYPES)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    results, has_next = search(text, kinds, limit=limit, offset=offset)
+    next_url = None
+    if has_next:
+        params = request.query_params.copy()
+        params['offset'] = offset + limit
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return Response({'results': results, 'next': next_url})
+
+
+# Vista para autocompletar nombres mientras se escribe
+@api_view(['GET'])
+def autocomplete_view(request):
+    """
+    Nombres de personajes, facciones, armas y armaduras que empiezan por `q` o se le parecen
+    (`type` como en la búsqueda). Con menos de dos letras devuelve una lista vacía.
+    """
+    kinds = _search_types(request)
+    if kinds is None:
+        return Response({'error': f"Tipos válidos: {', '.join(SEARCH_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(autocomplete(request.query_params.get('q', ''), kinds))
+
+
+# Vista para obtener la matriz de probabilidades de victoria entre personajes
+@api_view(['GET'])
+def get_battle_matrix(request):
+    """
+    Devuelve la matriz de probabilidades de victoria entre todos los personajes que pueden
+    combatir y la clasificación por probabilidad media de victoria.
+
+    La matriz se sirve desde la caché; se recalcula con `manage.py battle_matrix` o cuando caduca.
+    """
+    return Response(battle_matrix.get_battle_matrix())
+
+
+# Vista para repetir una batalla registrada turno a turno
+@api_view(['GET'])
+def get_battle_replay(request, pk):
+    """
+    Devuelve los turnos de una batalla terminada, reconstruidos a partir de su semilla.
+    """
+    log = get_object_or_404(BattleLog, pk=pk)
+    try:
+        turns = replay_battle(log)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    return Response({
+        'id': log.id,
+        'seed': log.seed,
+        'characters': log.stats,
+        'winner': log.winner_id,
+        'turns': turns,
+    })
+
+
+# Vista para exportar todos los personajes
+@login_required
+@require_http_methods(['GET'])
+def export_characters_view(request):
+    """
+    Exporta todos los personajes con su facción, equipo, inventario y relaciones.
+    Con `?format=csv` devuelve CSV; por defecto NDJSON (un objeto JSON por línea).
+    La respuesta se genera por bloques, sin cargar todos los personajes en memoria (con ASGI,
+    con un iterador asíncrono).
+    No usa `api_view` porque DRF reserva el parámetro `format` para elegir el renderizador.
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Formato no válido, usa ndjson o csv'}, status=400)
+    lines = aexport_characters if isinstance(request, ASGIRequest) else export_characters
+    response = StreamingHttpResponse(lines(export_format), content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="characters.{export_format}"'
+    return response
+
+
+# Vista con las métricas de rendimiento del proceso para Prometheus
+@require_http_methods(['GET'])
+def metrics_view(request):
+    """
+    Devuelve los histogramas de rendimiento por ruta (ver juego/metrics.py) en el formato de
+    texto de Prometheus: los de todos los workers con METRICS_DIR. En producción nginx no la
+    publica: Prometheus la consulta dentro de la red interna (ver deploy/nginx.conf).
+    """
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _characters_data(ids):
+    """
+    Devuelve [{'id', 'name'}] de los personajes indicados, en el mismo orden, con una sola consulta.
+    """
+    names = dict(Character.objects.filter(id__in=ids).values_list('id', 'name'))
+    return [{'id': pk, 'name': names.get(pk)} for pk in ids]
+
+
+# Vista para obtener los amigos de los amigos de un personaje
+@api_view(['GET'])
+def get_friends_of_friends(request, pk):
+    """
+    Devuelve los amigos de los amigos del personaje que todavía no son sus amigos.
+    """
+    character = get_object_or_404(Character, pk=pk)
+    ids = sorted(get_relationship_graph().friends_of_friends(character.id))
+    return Response({'character': character.id, 'friends_of_friends': _characters_data(ids)})
+
+
+# Vista para obtener los enemigos de los enemigos de un personaje
+@api_view(['GET'])
+def get_enemies_of_enemies(request, pk):
+    """
+    Devuelve los enemigos de los enemigos del personaje (posibles aliados).
+    """
+    character = get_object_or_404(Character, pk=pk)
+    ids = sorted(get_relationship_graph().enemies_of_enemies(character.id))
+    return Response({'character': character.id, 'enemies_of_enemies': _characters_data(ids)})
+
+
+# Vista para obtener el camino de aliados más corto entre dos personajes
+@api_view(['GET'])
+def get_ally_path(request, source, target):
+    """
+    Devuelve el camino más corto entre dos personajes pasando solo por aliados y amigos.
+    Responde 404 si no existe ningún camino.
+    """
+    source = get_object_or_404(Character, pk=source)
+    target = get_object_or_404(Character, pk=target)
+    path = get_relationship_graph().shortest_ally_path(source.id, target.id)
+    if path is None:
+        return Response({'error': 'No hay ningún camino de aliados entre los personajes'},
+                        status=status.HTTP_404_NOT_FOUND)
+    return Response({'length': len(path) - 1, 'path': _characters_data(path)})
+
+
+# Vista para obtener los grupos de aliados
+@api_view(['GET'])
+def get_ally_components(request):
+    """
+    Devuelve los grupos de personajes conectados por relaciones de aliados, de mayor a menor.
+    """
+    components = get_relationship_graph().ally_components()
+    names = dict(Character.objects.filter(id__in=[pk for c in components for pk in c]).values_list('id', 'name'))
+    return Response([[{'id': pk, 'name': names.get(pk)} for pk in component] for component in components])
 
 
 # Vista para gestionar las facciones usando el viewset
@@ -109,28 +318,41 @@ class FactionViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
 
 
 # Vista para gestionar las armaduras usando el viewset
-class ArmorViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
+class ArmorViewSet(LoginRequiredMixin, BulkModelMixin, viewsets.ModelViewSet):
     """
     ViewSet que maneja las operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     para el modelo Armor. Usa el serializador ArmorSerializer.
+    Admite operaciones en bloque en `armors/bulk/` (ver `juego.bulk`).
     """
     # Definir la consulta que se usará para obtener los objetos de Armor
     queryset = Armor.objects.all()  # Obtener todos los objetos de Armor
     # Especificar el serializador que se utilizará para convertir los objetos de Armor a JSON
     serializer_class = ArmorSerializer
 
+    def after_bulk_write(self, pks):
+        bump_equipment_versions('armor', pks)  # Invalida las batallas de quien lleve estas armaduras
+        bump_reference_version(Armor)  # Y la lista de armaduras de la caché
+
 
 # Vista para gestionar las armas usando el viewset
-class WeaponViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
+class WeaponViewSet(LoginRequiredMixin, BulkModelMixin, viewsets.ModelViewSet):
     """
     ViewSet que maneja las operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     para el modelo Weapon. Usa el serializador WeaponSerializer.
+    Admite operaciones en bloque en `weapons/bulk/` (ver `juego.bulk`).
     """
     # Definir la consulta que se usará para obtener los objetos de Weapon
     queryset = Weapon.objects.all()  # Obtener todos los objetos de Weapon
     # Especificar el serializador que se utilizará para convertir los objetos de Weapon a JSON
     serializer_class = WeaponSerializer
 
+    def prepare_bulk_create(self, instances):
+        Weapon.fill_random_stats(instances)  # Crítico y precisión aleatorios para todo el lote a la vez
+
+    def after_bulk_write(self, pks):
+        bump_equipment_versions('weapon', pks)  # Invalida las batallas de quien lleve estas armas
+        bump_reference_version(Weapon)  # Y la lista de armas de la caché
+
 
 # Vista para gestionar las relaciones entre personajes usando el viewset
 class RelationshipViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
@@ -145,10 +367,11 @@ class RelationshipViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
 
 
 # Vista para gestionar los inventarios de personajes usando el viewset
-class InventoryViewSet(LoginRequiredMixin, viewsets.ReadOnlyModelViewSet):
+class InventoryViewSet(LoginRequiredMixin, ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet que maneja las operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     para el modelo Inventory. Usa el serializador InventorySerializer.
+    Es de solo lectura, así que consulta una réplica si las hay (ver juego/routers.py).
     """
     # Definir la consulta que se usará para obtener los objetos de Inventory
     queryset = Inventory.objects.all().prefetch_related('armors',
@@ -158,23 +381,43 @@ class InventoryViewSet(LoginRequiredMixin, viewsets.ReadOnlyModelViewSet):
 
 
 # Vista para gestionar los personajes usando el viewset
-class CharacterViewSet(LoginRequiredMixin, viewsets.ReadOnlyModelViewSet):
+class CharacterViewSet(LoginRequiredMixin, ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet que maneja las operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     para el modelo Character. Usa el serializador CharacterSerializer.
+
+    Con `?faction=slim` la facción se devuelve sin la lista de miembros. Las relaciones de
+    todos los personajes de un listado se cargan en una sola consulta (ver `CharacterListSerializer`),
+    así que el número de consultas no depende del número de personajes.
+    Es de solo lectura, así que consulta una réplica si las hay (ver juego/routers.py).
     """
     # Definir la consulta que se usará para obtener los objetos de Character
     queryset = Character.objects.all().select_related('faction', 'inventory', 'equipped_armor',
-                                                      'equipped_weapon')  # Usamos select_related para optimizar la consulta de relaciones
+                                                      'equipped_weapon').prefetch_related(
+        'inventory__weapons', 'inventory__armors')  # Usamos select_related y prefetch_related para optimizar la consulta de relaciones
     # Especificar el serializador que se utilizará para convertir los objetos de Character a JSON
     serializer_class = CharacterSerializerAll
 
+    def slim_faction(self):
+        """Indica si se ha pedido la representación reducida de la facción"""
+        return self.request.query_params.get('faction') == 'slim'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.slim_faction():
+            queryset = queryset.prefetch_related('faction__members')  # Los miembros de cada facción en una consulta
+        return queryset
+
+    def get_serializer_class(self):
+        return CharacterSerializerSlim if self.slim_faction() else CharacterSerializerAll
+
 
 # Vista para gestionar los personajes usando el viewset
-class CharacterModifyViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
+class CharacterModifyViewSet(LoginRequiredMixin, BulkModelMixin, viewsets.ModelViewSet):
     """
     ViewSet que maneja las operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     para el modelo Character. Usa el serializador CharacterSerializer.
+    Admite operaciones en bloque en `characters-modidy/bulk/` (ver `juego.bulk`).
     """
     # Definir la consulta que se usará para obtener los objetos de Character
     queryset = Character.objects.all().select_related('faction', 'inventory', 'equipped_armor',
@@ -182,6 +425,16 @@ class CharacterModifyViewSet(LoginRequiredMixin, viewsets.ModelViewSet):
     # Especificar el serializador que se utilizará para convertir los objetos de Character a JSON
     serializer_class = CharacterSerializerModify
 
+    def bulk_create_related(self, instances):
+        # Todos los personajes tienen inventario (como los de CharacterCreateView)
+        Inventory.objects.bulk_create([Inventory(character=character) for character in instances],
+                                      batch_size=BULK_BATCH_SIZE)
+
+    def after_bulk_write(self, pks):
+        bump_equipment_versions('character', pks)  # Invalida las batallas de estos personajes
+        bump_faction_stats_version()  # Pueden haber cambiado los miembros de las facciones
+        bump_character_card_versions(pks)  # Y sus tarjetas de la galería
+
 
 class BattleView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
@@ -199,23 +452,26 @@ class BattleView(LoginRequiredMixin, View):
             if char1.id == char2.id:
                 return render(request, "juego/battle.html" ,{'error': 'Un personaje no puede pelear contra si mismo'})
 
-            # Establecer el turno de los personajes
-            turn_player = char1.id  # Empezamos con el jugador 1
+            # Instantánea de las estadísticas de combate: el equipo no cambia durante la batalla,
+            # así que los turnos no necesitan volver a consultar los personajes
+            state = start_battle(
+                CombatStats.from_character(char1), CombatStats.from_character(char2),
+                session_key=request.session.session_key, owner=request.user.pk,
+            )
+            turn_player = state['turn_player']  # Empezamos con el jugador 1
 
-            frase = "Que comience la batalla!"
+            # Guardar el estado de la batalla en el almacén de batallas
+            store = get_battle_store()
+            battle_id = store.new_id()
+            store.set(battle_id, state)
+            add_user_battle(store, request.user.pk, battle_id)
 
-            # Guardar el estado de la batalla en la sesión
-            request.session['battle'] = {
-                'char1': char1.id,
-                'char2': char2.id,
-                'char1_hp': 1000,
-                'char2_hp': 1000,
-                'turn_player': turn_player,
-                'frase': frase,
-            }
+            # En la sesión solo se guarda qué batalla está en curso (una escritura al empezar)
+            request.session['battle'] = {'id': battle_id, 'char1': char1.id, 'char2': char2.id}
 
             # Pasar los personajes seleccionados y el turno al contexto para mostrarlos en la plantilla
             return render(request, "juego/battle.html", {
+                'battle_id': battle_id,
                 'char1': char1,
                 'char2': char2,
                 'turn_player': turn_player,
@@ -226,6 +482,18 @@ class BattleView(LoginRequiredMixin, View):
                       {'form': form, 'error': "Hay un problema con la selección de personajes."})
 
 
+def _owns_battle(request, state):
+    """
+    Si la batalla es de quien hace la petición: las del formulario de batalla por la clave de
+    sesión (sin cargar la sesión) y las de la arena, que no tienen sesión, por el usuario.
+    """
+    session_key = state.get('session_key')
+    if session_key:
+        return session_key == request.session.session_key
+    owner = state.get('owner')
+    return owner is not None and request.user.is_authenticated and request.user.pk == owner
+
+
 class AttackView(View):
     def post(self, request, *args, **kwargs):
         try:
@@ -238,119 +506,280 @@ class AttackView(View):
             if not attacker_id or not ataque_type:
                 return JsonResponse({'error': 'Datos incompletos'}, status=400)
 
-            # Obtener el estado de la batalla desde la sesión
-            battle_state = request.session.get('battle', {})
-            if not battle_state:
+            # Obtener el estado de la batalla desde el almacén de batallas. El cliente envía el
+            # identificador de la batalla; si no lo hace se busca en la sesión
+            battle_id = data.get('battle') or request.session.get('battle', {}).get('id')
+            try:
+                battle_state = _play_stored_turn(
+                    get_battle_store(), battle_id, lambda state: _owns_battle(request, state), attacker_id, ataque_type,
+                )
+            except BattleError as e:
+                return JsonResponse({'error': e.message}, status=e.status)
+            if battle_state is None:
                 return JsonResponse({'error': 'No hay batalla en curso'}, status=400)
 
-            # Obtener IDs de los personajes
-            char1_id = battle_state.get('char1')
-            char2_id = battle_state.get('char2')
-
-            # Obtener los personajes para estadísticas
-            character1 = Character.objects.select_related('equipped_armor', 'equipped_weapon').get(id=char1_id)
-            character2 = Character.objects.select_related('equipped_armor', 'equipped_weapon').get(id=char2_id)
-
-            # Obtener las estadísticas que se necesitarán
-            character1_accuracy = character1.equipped_weapon.accuracy if character1.equipped_weapon.accuracy else 50
-            character2_accuracy = character2.equipped_weapon.accuracy if character2.equipped_weapon.accuracy else 50
-            character1_critic = character1.equipped_weapon.critic if character1.equipped_weapon.critic else 10
-            character2_critic = character2.equipped_weapon.critic if character2.equipped_weapon.critic else 10
-            character1_defense = character1.equipped_armor.defense if character1.equipped_armor.defense else 0
-            character2_defense = character2.equipped_armor.defense if character2.equipped_armor.defense else 0
-
-            # Determinar quién es el atacante y quién el defensor
-            if attacker_id == char1_id:
-                defender_id = char2_id
-            elif attacker_id == char2_id:
-                defender_id = char1_id
-            else:
-                return JsonResponse({'error': 'Atacante no válido'}, status=400)
-
-            # Verificar que sea el turno correcto
-            if battle_state.get('turn_player') != attacker_id:
-                return JsonResponse({'error': 'No es tu turno'}, status=400)
-
-            # Obtener los HP actuales de los personajes
-            char1_hp = battle_state.get('char1_hp', 1000)
-            char2_hp = battle_state.get('char2_hp', 1000)
-
-            # Obtener el atacante y el defensor desde la base de datos
-            attacker = get_object_or_404(Character, id=attacker_id)
-            defender = get_object_or_404(Character, id=defender_id)
-
-            # Determinar el daño según el tipo de ataque
-            if ataque_type == 'fuerte':
-                damage = attacker.equipped_weapon.damage * 1.5
-            elif ataque_type == 'debil':
-                damage = attacker.equipped_weapon.damage
-            else:
-                return JsonResponse({'error': 'Tipo de ataque inválido'}, status=400)
-
-            # Aplicar el daño al defensor
-            if defender_id == char1_id:
-                accuracy = random.randint(0, 100) <= character2_accuracy
-                critic = random.randint(0, 100) <= character2_critic
-                damage = damage * 2 if critic else damage
-                damage = damage - character1_defense if damage > character1_defense else 0
-                damage = damage if accuracy else 0
-                char1_hp -= damage
-                mostrar_danio = str(damage)
-                frase = f"{character2.name}" + " lanza un ataque y realiza " + mostrar_danio + " de daño!!"
-                if not accuracy:
-                    frase = f"{character2.name}" + " lanza un ataque y falla!!"
-                elif critic:
-                    frase = f"{character2.name}" + " lanza un ataque crítico y realiza " + mostrar_danio + " de daño!!"
-            else:
-                accuracy = random.randint(0, 100) <= character1_accuracy
-                critic = random.randint(0, 100) <= character1_critic
-                damage = damage * 2 if critic else damage
-                damage = damage - character2_defense if damage > character2_defense else 0
-                damage = damage if accuracy else 0
-                char2_hp -= damage
-                mostrar_danio = str(damage)
-                frase = f"{character1.name}" + " lanza un ataque y realiza " + mostrar_danio + " de daño!!"
-                if not accuracy:
-                    frase = f"{character1.name}" + " lanza un ataque y falla!!"
-                elif critic:
-                    frase = f"{character1.name}" + " lanza un ataque crítico y realiza " + mostrar_danio + " de daño!!"
+            char1_hp = battle_state['char1_hp']
+            char2_hp = battle_state['char2_hp']
 
             # Verificar si la batalla terminó
-            if char1_hp <= 0:
-                request.session.pop('battle', None)  # Eliminar la batalla de la sesión
-                return JsonResponse({'char1_hp': 0, 'char2_hp': char2_hp, 'turn_player': None, 'winner': f'{character2.name} gana la batalla!! 🏆'})
-
-            if char2_hp <= 0:
-                request.session.pop('battle', None)
-                return JsonResponse({'char1_hp': char1_hp, 'char2_hp': 0, 'turn_player': None, 'winner': f'{character1.name} gana la batalla!! 🏆'})
-
-            # Cambiar el turno al otro jugador
-            next_turn_player = defender_id
-
-            # Guardar el estado de la batalla actualizado
-            request.session['battle'] = {
-                'char1': char1_id,
-                'char2': char2_id,
-                'char1_hp': char1_hp,
-                'char2_hp': char2_hp,
-                'turn_player': next_turn_player,
-                'frase': frase,
-            }
+            if battle_state['winner'] is not None:
+                winner = next(s for s in battle_state['stats'] if s.id == battle_state['winner'])
+                return JsonResponse({
+                    'char1_hp': char1_hp,
+                    'char2_hp': char2_hp,
+                    'turn_player': None,
+                    'winner': winner_phrase(winner),
+                    'seq': battle_state['seq'],
+                })
 
             # Devolver la nueva información de la batalla
             return JsonResponse({
                 'char1_hp': char1_hp,
-                'char1_id': char1_id,
+                'char1_id': battle_state['char1'],
                 'char2_hp': char2_hp,
-                'char2_id': char2_id,
-                'turn_player': next_turn_player,
-                'frase': frase,
+                'char2_id': battle_state['char2'],
+                'turn_player': battle_state['turn_player'],
+                'frase': battle_state['frase'],
+                'seq': battle_state['seq'],
             })
 
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
 
+# ---------------------------------------------------------------------------
+# Arena: API asíncrona para varias batallas simultáneas por usuario
+# ---------------------------------------------------------------------------
+
+# Los canales SSE esperan a que `battle_notifier` avise de un turno. Los turnos jugados en otro
+# proceso (con `FileBattleStore`) no se avisan: con un almacén compartido se comprueba además la
+# batalla cada tantos segundos
+ARENA_POLL_INTERVAL = 1.0
+
+# Cada cuánto (en segundos) se envía un comentario para mantener viva la conexión SSE
+ARENA_KEEPALIVE_INTERVAL = 15
+
+# Sin ASGI el canal SSE no puede quedarse abierto: envía el estado actual, se cierra y pide al
+# navegador que vuelva a conectar pasados estos milisegundos
+ARENA_WSGI_RETRY_MS = 2000
+
+
+def arena_battle_data(battle_id, state):
+    """
+    Representación pública (JSON) del estado de una batalla de la arena.
+    """
+    names = {stats.id: stats.name for stats in state['stats']}
+    return {
+        'id': battle_id,
+        'char1': {'id': state['char1'], 'name': names[state['char1']], 'hp': state['char1_hp']},
+        'char2': {'id': state['char2'], 'name': names[state['char2']], 'hp': state['char2_hp']},
+        'turn_player': state['turn_player'],
+        'frase': state['frase'],
+        'seq': state['seq'],
+        'winner': state['winner'],
+    }
+
+
+async def _arena_user(request):
+    """
+    Devuelve el usuario autenticado o None. Las vistas asíncronas no pueden usar LoginRequiredMixin.
+    """
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+@require_http_methods(['GET', 'POST'])
+async def arena_battles(request):
+    """
+    GET: lista las batallas en curso del usuario.
+    POST: crea una batalla nueva entre `char1` y `char2` y devuelve su estado.
+    """
+    user = await _arena_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+    store = get_battle_store()
+
+    if request.method == 'GET':
+        battles = await sync_to_async(get_user_battles)(store, user.pk)
+        return JsonResponse({'battles': [arena_battle_data(battle_id, state) for battle_id, state in battles]})
+
+    try:
+        data = json.loads(request.body)
+        char1_id, char2_id = int(data['char1']), int(data['char2'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Datos incompletos'}, status=400)
+    if char1_id == char2_id:
+        return JsonResponse({'error': 'Un personaje no puede pelear contra si mismo'}, status=400)
+
+    # Solo pueden combatir los personajes con arma y armadura (los mismos que ofrece el formulario)
+    queryset = CharacterBattleForm.base_fields['character'].queryset
+    characters = {c.id: c async for c in queryset.filter(id__in=[char1_id, char2_id])}
+    if len(characters) != 2:
+        return JsonResponse({'error': 'Hay un problema con la selección de personajes.'}, status=400)
+
+    # La instantánea, las versiones del equipamiento (caché) y el almacén, fuera del bucle de eventos
+    battle_id, state = await sync_to_async(_start_arena_battle)(
+        store, user.pk, characters[char1_id], characters[char2_id],
+    )
+    return JsonResponse(arena_battle_data(battle_id, state), status=201)
+
+
+def _start_arena_battle(store, user_id, char1, char2):
+    """
+    Empieza una batalla de la arena y la guarda en el almacén. Devuelve (id, estado).
+    """
+    state = start_battle(CombatStats.from_character(char1), CombatStats.from_character(char2), owner=user_id)
+    battle_id = store.new_id()
+    store.set(battle_id, state)
+    add_user_battle(store, user_id, battle_id)
+    return battle_id, state
+
+
+@require_http_methods(['GET'])
+async def arena_battle_detail(request, battle_id):
+    """
+    Devuelve el estado de una batalla de la arena. Cualquier usuario autenticado puede verla.
+    """
+    if await _arena_user(request) is None:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+    state = await aget_battle(get_battle_store(), battle_id)
+    if state is None:
+        return JsonResponse({'error': 'No hay batalla en curso'}, status=404)
+    return JsonResponse(arena_battle_data(battle_id, state))
+
+
+@require_http_methods(['POST'])
+async def arena_attack(request, battle_id):
+    """
+    Juega un turno (`attacker` y `ataque`) en una batalla del usuario y devuelve el nuevo estado.
+    Las batallas terminadas se conservan hasta que caducan para que los espectadores vean el resultado.
+    """
+    user = await _arena_user(request)
+    if user is None:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+
+    try:
+        data = json.loads(request.body)
+        attacker_id = int(data['attacker'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Datos incompletos'}, status=400)
+    # El almacén (ficheros) y el bloqueo de la batalla, fuera del bucle de eventos
+    return await sync_to_async(_arena_turn)(get_battle_store(), battle_id, user.pk, attacker_id, data.get('ataque'))
+
+
+def _arena_turn(store, battle_id, user_id, attacker_id, ataque):
+    """
+    Juega un turno de la arena y devuelve la respuesta.
+    """
+    try:
+        state = _play_stored_turn(store, battle_id, lambda state: state.get('owner') == user_id, attacker_id, ataque)
+    except BattleError as e:
+        return JsonResponse({'error': e.message}, status=e.status)
+    if state is None:
+        return JsonResponse({'error': 'No hay batalla en curso'}, status=404)
+    return JsonResponse(arena_battle_data(battle_id, state))
+
+
+def _play_stored_turn(store, battle_id, owns, attacker_id, ataque):
+    """
+    Turno de `AttackView` (la página de batalla) y de la arena: lo juega con la batalla bloqueada
+    (dos ataques a la vez no pueden perder un turno) y guarda el estado. Devuelve el estado nuevo o
+    None si la batalla no existe o no es de quien ataca (`owns(state)`). Lanza `BattleError` si el
+    turno no es válido; si la batalla ha dejado de serlo (409) la borra.
+
+    Las batallas terminadas se conservan hasta que caducan, para que los canales SSE envíen el
+    último turno; su registro se guarda una sola vez, al terminar.
+    """
+    with locked_battle(store, battle_id) as state:
+        if state is None or not owns(state):
+            return None
+        if state['winner'] is not None:
+            raise BattleError('La batalla ya ha terminado')
+        try:
+            play_turn(state, attacker_id, ataque)
+        except BattleError as e:
+            if e.status == 409:
+                store.delete(battle_id)  # La batalla ya no es válida
+            raise
+        store.set(battle_id, state)
+    if state['winner'] is not None:
+        save_battle_logs([state])  # Guardar el registro de la batalla (una sola inserción)
+    return state
+
+
+@require_http_methods(['GET'])
+async def arena_battle_stream(request, battle_id):
+    """
+    Canal SSE (text/event-stream) con los turnos de una batalla.
+    Envía un evento `turn` cada vez que cambia el estado y un evento `end` cuando la batalla
+    termina, se cancela o caduca.
+
+    Con WSGI (`runserver`, `SERVER_MODE=wsgi`) Django lee un iterador asíncrono entero antes de
+    enviar nada, así que se responde con el estado actual y el navegador vuelve a conectar (ver
+    `_arena_battle_snapshot`). La página de batalla no depende del canal: se actualiza con la
+    respuesta de cada ataque.
+    """
+    if await _arena_user(request) is None:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+    store = get_battle_store()
+    if not isinstance(request, ASGIRequest):
+        state = await aget_battle(store, battle_id)
+        return _event_stream_response(_arena_battle_snapshot(request, battle_id, state))
+
+    wait = ARENA_POLL_INTERVAL if store.shared else ARENA_KEEPALIVE_INTERVAL
+
+    async def events():
+        seq = None
+        idle = 0.0
+        with battle_notifier.subscribe(battle_id) as changed:
+            while True:
+                changed.clear()  # Antes de leer: un turno jugado mientras tanto vuelve a activarlo
+                state = await aget_battle(store, battle_id)
+                if state is None:
+                    yield 'event: end\ndata: {}\n\n'
+                    return
+                if state['seq'] != seq:
+                    seq = state['seq']
+                    idle = 0.0
+                    yield f"id: {seq}\nevent: turn\ndata: {json.dumps(arena_battle_data(battle_id, state))}\n\n"
+                    if state['winner'] is not None:
+                        yield 'event: end\ndata: {}\n\n'
+                        return
+                elif idle >= ARENA_KEEPALIVE_INTERVAL:
+                    idle = 0.0
+                    yield ': keepalive\n\n'
+                start = time.monotonic()
+                try:
+                    await asyncio.wait_for(changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                idle += time.monotonic() - start
+
+    return _event_stream_response(events())
+
+
+def _arena_battle_snapshot(request, battle_id, state):
+    """
+    Eventos del canal SSE sin ASGI: el turno actual (si no es el último que recibió el navegador,
+    `Last-Event-ID`) o `end`, y la espera antes de volver a conectar.
+    """
+    yield f'retry: {ARENA_WSGI_RETRY_MS}\n\n'
+    if state is None:
+        yield 'event: end\ndata: {}\n\n'
+        return
+    if request.headers.get('Last-Event-ID') != str(state['seq']):
+        yield f"id: {state['seq']}\nevent: turn\ndata: {json.dumps(arena_battle_data(battle_id, state))}\n\n"
+    if state['winner'] is not None:
+        yield 'event: end\ndata: {}\n\n'
+
+
+def _event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Evita que un proxy (nginx) acumule los eventos
+    return response
+
+
 class CharacterDetailView(LoginRequiredMixin, DetailView):
     """
     Vista basada en clase para mostrar los detalles de un personaje específico.
@@ -389,25 +818,45 @@ class CharacterUpdateView(LoginRequiredMixin, UpdateView):
         return form
 
 class CharacterListView(LoginRequiredMixin, ListView):
+    """
+    Galería de personajes por páginas: la primera página (o la de `?after=<id>`) con la página
+    completa; las siguientes se cargan con `CharacterCardsView` (ver juego/character_cards.py).
+    """
     model = Character
     template_name = 'juego/character.html'
     context_object_name = 'character_list'
 
     def get_queryset(self):
-        # Optimizamos la consulta con select_related y prefetch_related
-        return Character.objects.select_related(
-            'faction', 'equipped_weapon', 'equipped_armor'
-        ).prefetch_related(
-            'inventory__weapons', 'inventory__armors'
-        ).all()
+        characters, self.next_after = character_page(after_param(self.request))
+        return characters
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Añadimos datos adicionales si es necesario
         context['title'] = 'Lista de Personajes'
+        context['cards'] = render_character_cards(self.object_list)  # HTML de cada tarjeta (de la caché si está)
+        if self.next_after is not None:
+            context['next_url'] = f"{reverse('juego:characterView')}?after={self.next_after}"
+            context['next_cards_url'] = f"{reverse('juego:characterCardsView')}?after={self.next_after}"
         return context
 
 
+class CharacterCardsView(LoginRequiredMixin, View):
+    """
+    Página siguiente de la galería de personajes para el scroll infinito: devuelve en JSON el
+    HTML de las tarjetas (`html`) y las direcciones de la página siguiente (`next` para esta
+    vista y `next_page` para la galería), o `next` a null si es la última.
+    """
+
+    def get(self, request):
+        characters, next_after = character_page(after_param(request))
+        data = {'html': ''.join(render_character_cards(characters)), 'next': None, 'next_page': None}
+        if next_after is not None:
+            data['next'] = f"{reverse('juego:characterCardsView')}?after={next_after}"
+            data['next_page'] = f"{reverse('juego:characterView')}?after={next_after}"
+        return JsonResponse(data)
+
+
 class CharacterDeleteView(LoginRequiredMixin, DeleteView):
     model = Character
     template_name = 'juego/character_delete.html'
@@ -511,8 +960,8 @@ class EquipmentCharacterFormView(LoginRequiredMixin, FormView):
         context = super().get_context_data(**kwargs)
         context.setdefault("characters", Character.objects.select_related('equipped_weapon',
                                                                           'equipped_armor').all())  # Mostrar todos los personajes por defecto
-        context.setdefault("weapons", Weapon.objects.all())  # Mostrar todas las armas por defecto
-        context.setdefault("armors", Armor.objects.all())  # Mostrar todas las armaduras por defecto
+        context.setdefault("weapons", reference_objects(Weapon))  # Mostrar todas las armas por defecto (de la caché)
+        context.setdefault("armors", reference_objects(Armor))  # Mostrar todas las armaduras por defecto (de la caché)
         return context
 
 
@@ -609,6 +1058,9 @@ class WeaponListView(LoginRequiredMixin, ListView):
     template_name = 'juego/weapon.html'
     context_object_name = 'weapon_list'
 
+    def get_queryset(self):
+        return reference_objects(Weapon)  # Lista de armas de la caché (ver juego/reference_data.py)
+
 class WeaponDetailView(LoginRequiredMixin, DetailView):
     model = Weapon
     template_name = 'juego/weapon_detail.html'
@@ -636,6 +1088,9 @@ class ArmorListView(LoginRequiredMixin, ListView, UserPassesTestMixin):
     template_name = 'juego/armor.html'
     context_object_name = 'armor_list'
 
+    def get_queryset(self):
+        return reference_objects(Armor)  # Lista de armaduras de la caché (ver juego/reference_data.py)
+
 
 class ArmorDetailView(LoginRequiredMixin, DetailView):
     model = Armor
@@ -778,7 +1233,8 @@ class RelationshipListView(LoginRequiredMixin, View):  # Cambiamos a View para m
     template_name = 'juego/relationship_list.html'
 
     def get(self, request, *args, **kwargs):
-        relation_list = Relationship.objects.all()
+        # Cada relación muestra sus dos personajes con su facción (ver Character.__str__)
+        relation_list = Relationship.objects.select_related('character1__faction', 'character2__faction')
         form = RelationshipForm()
         return render(request, self.template_name, {'relation_list': relation_list, 'form': form})
 
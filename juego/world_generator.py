@@ -0,0 +1,272 @@
+"""
+Generador determinista de mundos sintéticos para pruebas de carga y benchmarks.
+
+Parte de los datos de ejemplo de la migración `0006_auto_20250218_0926` (nombres de facciones,
+lugares, armas, armaduras y personajes) y genera el número de facciones, armas, armaduras,
+personajes (todos con inventario) y relaciones que se pida. Con la misma semilla y los mismos
+parámetros el mundo generado es siempre el mismo.
+
+Para que se parezca a un mundo real los datos están sesgados con una distribución de Zipf
+(`skew` es su exponente): unas pocas facciones tienen la mayoría de los miembros, unas pocas
+armas y armaduras son las más equipadas y unos pocos personajes concentran la mayoría de las
+relaciones.
+
+Todo se escribe por bloques con `bulk_create`, cada bloque en su transacción, así que la memoria
+no depende del número de personajes (salvo un array con sus ids).
+"""
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from juego.faction_stats import bump_faction_stats_version
+from juego.models import Armor, Character, Faction, Inventory, Relationship, Weapon
+from juego.reference_data import bump_reference_version
+from juego.relationship_graph import bump_relationship_graph_version
+
+# Filas que se escriben por bloque
+GENERATOR_CHUNK_SIZE = 5000
+
+# Tamaños por defecto del mundo generado
+DEFAULT_FACTIONS = 50
+DEFAULT_WEAPONS = 500
+DEFAULT_ARMORS = 300
+DEFAULT_CHARACTERS = 10000
+DEFAULT_RELATIONSHIPS = 3.0  # Relaciones por personaje (de media)
+DEFAULT_SKEW = 1.1
+
+# Datos de la migración 0006 a partir de los que se generan los nombres
+SEED_FACTIONS = [
+    ("La Hermandad de Acero", "Fortaleza del Hierro"),
+    ("Los Asesinos Fantasma", "Ciudad Sombría"),
+    ("Los Renegados del Desierto", "Tierras Áridas"),
+    ("Los Centinelas del Caos", "Ruinas Olvidadas"),
+]
+SEED_LOCATIONS = [
+    "Fortaleza del Hierro", "Ciudad Sombría", "Tierras Áridas", "Ruinas Olvidadas", "Bosques Perdidos",
+]
+SEED_WEAPONS = ["Espada del Apocalipsis", "Rifle de Asalto Fantasma", "Martillo del Juicio",
+                "Arco del Cazador Nocturno", "Dagas de la Sombra"]
+SEED_ARMORS = ["Armadura del Titán", "Traje de Sigilo Fantasma", "Coraza del Renegado",
+               "Manto del Caos", "Armadura del Cazador"]
+SEED_CHARACTERS = ["Darius, el Destructor", "Nyx, la Sombra", "Kael, el Martillo", "Selene, la Cazadora",
+                   "Malek, el Caótico", "Rogar, el Errante", "Lyra, la Vengadora", "Thalor, el Exiliado",
+                   "Eryndor, el Hechicero", "Astra, la Guardiana"]
+
+# Tipos de relación y su probabilidad
+RELATIONSHIP_WEIGHTS = {'neutral': 0.3, 'friend': 0.25, 'ally': 0.2, 'enemy': 0.15, 'rival': 0.1}
+
+# Proporción de personajes sin facción, sin arma equipada y sin armadura equipada
+NO_FACTION = 0.1
+NO_WEAPON = 0.15
+NO_ARMOR = 0.25
+
+# Proporción de personajes que están en el lugar de su facción
+AT_FACTION_LOCATION = 0.8
+
+
+class ZipfSampler:
+    """
+    Elige índices entre 0 y n-1 con probabilidad proporcional a 1 / (rango + 1) ** exponente.
+    El rango de cada índice sale de una permutación aleatoria, para que los más elegidos no
+    sean siempre los primeros.
+    """
+
+    def __init__(self, n, exponent, rng):
+        weights = 1.0 / np.arange(1, n + 1) ** exponent
+        self._cdf = np.cumsum(weights / weights.sum())
+        self._order = rng.permutation(n)
+        self._rng = rng
+
+    def sample(self, size):
+        ranks = np.searchsorted(self._cdf, self._rng.random(size), side='right')
+        return self._order[np.minimum(ranks, len(self._order) - 1)]
+
+
+class WorldGenerator:
+    """
+    Genera un mundo sintético reproducible a partir de una semilla.
+    """
+
+    def __init__(self, factions=DEFAULT_FACTIONS, weapons=DEFAULT_WEAPONS, armors=DEFAULT_ARMORS,
+                 characters=DEFAULT_CHARACTERS, relationships=DEFAULT_RELATIONSHIPS, skew=DEFAULT_SKEW,
+                 seed=0, chunk_size=GENERATOR_CHUNK_SIZE, progress=None):
+        if min(factions, weapons, armors) < 1 or characters < 0 or relationships < 0:
+            raise ValueError('Hace falta al menos una facción, un arma y una armadura, y ningún tamaño negativo')
+        self.factions = factions
+        self.weapons = weapons
+        self.armors = armors
+        self.characters = characters
+        self.relationships = relationships
+        self.skew = skew
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.rng = np.random.default_rng(seed)
+        self.rows = defaultdict(int)
+        self.elapsed = 0.0
+
+    def generate(self):
+        """
+        Genera y guarda el mundo. Devuelve las filas escritas por tabla.
+        """
+        start = time.perf_counter()
+        faction_ids, faction_locations = self._generate_factions()
+        weapon_ids = self._generate_weapons()
+        armor_ids = self._generate_armors()
+        character_ids = self._generate_characters(faction_ids, faction_locations, weapon_ids, armor_ids)
+        self._generate_relationships(character_ids)
+        # `bulk_create` no envía señales
+        bump_faction_stats_version()
+        bump_relationship_graph_version()
+        bump_reference_version(Faction, Weapon, Armor)
+        self.elapsed = time.perf_counter() - start
+        return dict(self.rows)
+
+    def _report(self, table, count):
+        self.rows[table] += count
+        if self.progress:
+            self.progress(table, self.rows[table])
+
+    def _generate_factions(self):
+        factions = []
+        for i in range(self.factions):
+            name, location = SEED_FACTIONS[i % len(SEED_FACTIONS)]
+            factions.append(Faction(name=f"{name} {self.seed}-{i + 1}", location=location))
+        with transaction.atomic():
+            Faction.objects.bulk_create(factions, batch_size=self.chunk_size)
+        self._report('faction', len(factions))
+        return np.array([f.id for f in factions]), [f.location for f in factions]
+
+    def _generate_weapons(self):
+        damages = np.clip(self.rng.normal(70, 15, self.weapons), 10, 120).astype(int).tolist()
+        weapons = [
+            Weapon(name=f"{SEED_WEAPONS[i % len(SEED_WEAPONS)]} {i + 1}", damage=damage)
+            for i, damage in enumerate(damages)
+        ]
+        Weapon.fill_random_stats(weapons, rng=self.rng)
+        with transaction.atomic():
+            Weapon.objects.bulk_create(weapons, batch_size=self.chunk_size)
+        self._report('weapon', len(weapons))
+        return np.array([w.id for w in weapons])
+
+    def _generate_armors(self):
+        defenses = np.clip(self.rng.normal(11, 3, self.armors), 1, 30).astype(int).tolist()
+        armors = [
+            Armor(name=f"{SEED_ARMORS[i % len(SEED_ARMORS)]} {i + 1}", defense=defense)
+            for i, defense in enumerate(defenses)
+        ]
+        with transaction.atomic():
+            Armor.objects.bulk_create(armors, batch_size=self.chunk_size)
+        self._report('armor', len(armors))
+        return np.array([a.id for a in armors])
+
+    def _generate_characters(self, faction_ids, faction_locations, weapon_ids, armor_ids):
+        """
+        Crea los personajes por bloques, cada uno con su inventario: el equipo que lleva más
+        algunos objetos más (de media uno de cada tipo). Devuelve el array de ids de los personajes.
+        """
+        factions = ZipfSampler(len(faction_ids), self.skew, self.rng)
+        weapons = ZipfSampler(len(weapon_ids), self.skew, self.rng)
+        armors = ZipfSampler(len(armor_ids), self.skew, self.rng)
+        character_ids = np.zeros(self.characters, dtype=np.int64)
+
+        for offset in range(0, self.characters, self.chunk_size):
+            size = min(self.chunk_size, self.characters - offset)
+            faction_index = factions.sample(size)
+            has_faction = self.rng.random(size) >= NO_FACTION
+            at_faction_location = self.rng.random(size) < AT_FACTION_LOCATION
+            random_location = self.rng.integers(0, len(SEED_LOCATIONS), size)
+            equipped_weapon = np.where(self.rng.random(size) >= NO_WEAPON, weapons.sample(size), -1)
+            equipped_armor = np.where(self.rng.random(size) >= NO_ARMOR, armors.sample(size), -1)
+            extra_weapons = self.rng.poisson(1.0, size)
+            extra_armors = self.rng.poisson(1.0, size)
+            inventory_weapons = weapons.sample(int(extra_weapons.sum()))
+            inventory_armors = armors.sample(int(extra_armors.sum()))
+
+            characters, inventories = [], []
+            weapon_cursor = armor_cursor = 0
+            for i in range(size):
+                number = offset + i + 1
+                if has_faction[i] and at_faction_location[i]:
+                    location = faction_locations[faction_index[i]]
+                else:
+                    location = SEED_LOCATIONS[random_location[i]]
+                characters.append(Character(
+                    name=f"{SEED_CHARACTERS[number % len(SEED_CHARACTERS)]} {number}",
+                    location=location,
+                    faction_id=int(faction_ids[faction_index[i]]) if has_faction[i] else None,
+                    equipped_weapon_id=int(weapon_ids[equipped_weapon[i]]) if equipped_weapon[i] >= 0 else None,
+                    equipped_armor_id=int(armor_ids[equipped_armor[i]]) if equipped_armor[i] >= 0 else None,
+                ))
+                # Inventario: el equipo que lleva y los objetos extra, sin repetir
+                character_weapons = set(inventory_weapons[weapon_cursor:weapon_cursor + extra_weapons[i]].tolist())
+                character_armors = set(inventory_armors[armor_cursor:armor_cursor + extra_armors[i]].tolist())
+                weapon_cursor += extra_weapons[i]
+                armor_cursor += extra_armors[i]
+                if equipped_weapon[i] >= 0:
+                    character_weapons.add(int(equipped_weapon[i]))
+                if equipped_armor[i] >= 0:
+                    character_armors.add(int(equipped_armor[i]))
+                inventories.append((sorted(character_weapons), sorted(character_armors)))
+
+            with transaction.atomic():
+                Character.objects.bulk_create(characters, batch_size=self.chunk_size)
+                created = Inventory.objects.bulk_create(
+                    [Inventory(character_id=c.id) for c in characters], batch_size=self.chunk_size
+                )
+                WeaponThrough = Inventory.weapons.through
+                ArmorThrough = Inventory.armors.through
+                weapon_rows = [
+                    WeaponThrough(inventory_id=inventory.id, weapon_id=int(weapon_ids[w]))
+                    for inventory, (character_weapons, _) in zip(created, inventories) for w in character_weapons
+                ]
+                armor_rows = [
+                    ArmorThrough(inventory_id=inventory.id, armor_id=int(armor_ids[a]))
+                    for inventory, (_, character_armors) in zip(created, inventories) for a in character_armors
+                ]
+                WeaponThrough.objects.bulk_create(weapon_rows, batch_size=self.chunk_size)
+                ArmorThrough.objects.bulk_create(armor_rows, batch_size=self.chunk_size)
+
+            character_ids[offset:offset + size] = [c.id for c in characters]
+            self.rows['inventory'] += len(created)
+            self.rows['inventory_weapons'] += len(weapon_rows)
+            self.rows['inventory_armors'] += len(armor_rows)
+            self._report('character', size)
+        return character_ids
+
+    def _generate_relationships(self, character_ids):
+        """
+        Crea las relaciones por bloques de personajes de origen. El número de relaciones de cada
+        personaje sigue una distribución geométrica y el otro personaje se elige con el sesgo de
+        Zipf, así que unos pocos personajes tienen muchas relaciones.
+        """
+        n = len(character_ids)
+        if n < 2 or not self.relationships:
+            return
+        targets = ZipfSampler(n, self.skew, self.rng)
+        types = list(RELATIONSHIP_WEIGHTS)
+        type_weights = list(RELATIONSHIP_WEIGHTS.values())
+
+        for offset in range(0, n, self.chunk_size):
+            size = min(self.chunk_size, n - offset)
+            counts = self.rng.geometric(1 / (1 + self.relationships), size) - 1
+            sources = np.repeat(np.arange(offset, offset + size), counts)
+            chosen = targets.sample(len(sources))
+            relationship_types = self.rng.choice(len(types), len(sources), p=type_weights)
+
+            # Cada par (origen, destino) una sola vez y nunca un personaje consigo mismo
+            relationships, seen = [], set()
+            for source, target, relationship_type in zip(sources.tolist(), chosen.tolist(), relationship_types.tolist()):
+                if source == target or (source, target) in seen:
+                    continue
+                seen.add((source, target))
+                relationships.append(Relationship(
+                    character1_id=int(character_ids[source]),
+                    character2_id=int(character_ids[target]),
+                    relationship_type=types[relationship_type],
+                ))
+            with transaction.atomic():
+                Relationship.objects.bulk_create(relationships, batch_size=self.chunk_size)
+            self._report('relationship', len(relationships))
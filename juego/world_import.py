@@ -0,0 +1,398 @@
+"""
+Importación masiva del mundo: facciones, armas, armaduras, personajes (con su inventario)
+y relaciones desde ficheros NDJSON o CSV.
+
+Los ficheros se leen en streaming y los registros se escriben por bloques con `bulk_create`
+(o con `COPY` en PostgreSQL para las tablas cuyos ids no hacen falta después: relaciones y
+tablas intermedias del inventario). Las referencias por nombre (la facción, el arma o la armadura
+de un personaje, los personajes de una relación) se resuelven con diccionarios en memoria
+nombre -> id, sin consultas por registro.
+
+Formato de los registros (en NDJSON cada línea lleva además `"type"`; en CSV el tipo sale del
+nombre del fichero, por ejemplo `characters.csv`, y las listas se separan con ';'):
+
+- faction: name, location
+- weapon: name, description, damage, critic, accuracy (crítico y precisión aleatorios si faltan)
+- armor: name, description, defense
+- character: name, location, faction, equipped_weapon, equipped_armor, inventory_weapons, inventory_armors
+- relationship: character1, character2, relationship_type
+
+Los nombres de armas, armaduras y personajes no son únicos: si se repiten, las referencias
+apuntan al último cargado. Todos los personajes importados tienen inventario (vacío si no traen
+objetos). Las líneas NDJSON que no son un objeto JSON válido se descartan como cualquier otro
+registro con errores, sin interrumpir la importación.
+"""
+import csv
+import io
+import json
+import os
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from juego.faction_stats import bump_faction_stats_version
+from juego.models import Armor, Character, Faction, Inventory, Relationship, Weapon
+from juego.reference_data import bump_reference_version
+from juego.relationship_graph import bump_relationship_graph_version
+
+# Registros de cada tipo que se acumulan antes de escribirlos
+IMPORT_CHUNK_SIZE = 5000
+
+# Tipos de registro en orden de dependencia: cada tipo solo referencia a los anteriores
+RECORD_TYPES = ('faction', 'weapon', 'armor', 'character', 'relationship')
+
+# Nombre del fichero CSV (sin extensión) -> tipo de registro
+CSV_TYPES = {f'{record_type}s': record_type for record_type in RECORD_TYPES}
+
+# Número máximo de errores que se guardan para mostrarlos
+MAX_REPORTED_ERRORS = 20
+
+# Tipo de los registros que no se han podido leer (el registro es el mensaje de error)
+INVALID_RECORD = 'invalid'
+
+
+class ImportStats:
+    """
+    Contadores de la importación: filas escritas por tabla, registros descartados y tiempo.
+    """
+
+    def __init__(self):
+        self.rows = defaultdict(int)
+        self.skipped = 0
+        self.errors = []
+        self.start = time.perf_counter()
+
+    def skip(self, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.elapsed if self.elapsed else 0.0
+
+
+def _text(value):
+    """Cadena sin espacios o None si está vacía"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _required(record, field):
+    """Campo obligatorio del registro como cadena; lanza ValueError si falta"""
+    value = _text(record.get(field))
+    if value is None:
+        raise ValueError(f'Falta el campo {field}')
+    return value
+
+
+def _int(value):
+    """Entero o None si está vacío"""
+    value = _text(value)
+    return None if value is None else int(value)
+
+
+def _names(value):
+    """Lista de nombres: acepta una lista (NDJSON) o una cadena separada por ';' (CSV)"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [name for name in (_text(v) for v in value) if name]
+    return [name for name in (_text(v) for v in str(value).split(';')) if name]
+
+
+def csv_record_type(path, record_type=None):
+    """
+    Tipo de los registros de un fichero CSV (el indicado o el que sale del nombre del fichero).
+    Lanza ValueError si no se puede saber.
+    """
+    record_type = record_type or CSV_TYPES.get(os.path.splitext(os.path.basename(path))[0].lower())
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f'No se sabe qué tipo de registros contiene {path}; usa --type')
+    return record_type
+
+
+def read_records(path, record_type=None):
+    """
+    Lee un fichero NDJSON o CSV registro a registro. Devuelve tuplas (número de línea, tipo, registro).
+    Las líneas NDJSON que no se pueden leer se devuelven con el tipo INVALID_RECORD y el error.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        record_type = csv_record_type(path, record_type)
+        with open(path, newline='', encoding='utf-8') as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, record_type, row
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except ValueError as e:
+                    yield line, INVALID_RECORD, f'JSON no válido ({e})'
+                    continue
+                if not isinstance(record, dict):
+                    yield line, INVALID_RECORD, 'El registro no es un objeto JSON'
+                    continue
+                yield line, record_type or record.get('type'), record
+
+
+class WorldImporter:
+    """
+    Acumula los registros por tipo y los escribe por bloques respetando las dependencias:
+    antes de escribir personajes se escriben las facciones, armas y armaduras pendientes,
+    y antes de las relaciones, los personajes pendientes.
+    """
+
+    def __init__(self, chunk_size=IMPORT_CHUNK_SIZE, use_copy=None, progress=None):
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.progress = progress
+        self.stats = ImportStats()
+        self.pending = {record_type: [] for record_type in RECORD_TYPES}
+
+        # Diccionarios nombre -> id con lo que ya existe en la base de datos
+        self.factions = dict(Faction.objects.values_list('name', 'id'))
+        self.weapons = dict(Weapon.objects.order_by('id').values_list('name', 'id'))
+        self.armors = dict(Armor.objects.order_by('id').values_list('name', 'id'))
+        self._characters = None  # Se carga solo si hay relaciones
+
+    @property
+    def characters(self):
+        if self._characters is None:
+            self._characters = dict(Character.objects.order_by('id').values_list('name', 'id').iterator())
+        return self._characters
+
+    def add(self, line, record_type, record):
+        """
+        Añade un registro. Se escribe cuando se acumulan `chunk_size` registros de su tipo.
+        """
+        if record_type == INVALID_RECORD:
+            self.stats.skip(f'Línea {line}: {record}')
+            return
+        if record_type not in RECORD_TYPES:
+            self.stats.skip(f'Línea {line}: tipo de registro desconocido ({record_type})')
+            return
+        self.pending[record_type].append((line, record))
+        if len(self.pending[record_type]) >= self.chunk_size:
+            self.flush(record_type)
+
+    def load(self, records):
+        """Añade todos los registros de un iterable y escribe lo que quede pendiente"""
+        for line, record_type, record in records:
+            self.add(line, record_type, record)
+        return self.finish()
+
+    def finish(self):
+        """
+        Escribe todos los registros pendientes e invalida las cachés que dependen de los datos
+        importados (`bulk_create` y `COPY` no envían señales).
+        """
+        for record_type in RECORD_TYPES:
+            self.flush(record_type)
+        bump_faction_stats_version()
+        bump_relationship_graph_version()
+        bump_reference_version(Faction, Weapon, Armor)
+        return self.stats
+
+    def flush(self, record_type):
+        """Escribe los registros pendientes de un tipo (y antes los de los tipos de los que depende)"""
+        for dependency in RECORD_TYPES[:RECORD_TYPES.index(record_type)]:
+            if self.pending[dependency]:
+                self.flush(dependency)
+        records, self.pending[record_type] = self.pending[record_type], []
+        if not records:
+            return
+        with transaction.atomic():
+            getattr(self, f'_write_{record_type}s')(records)
+        if self.progress:
+            self.progress(self.stats)
+
+    # -- Escritura de cada tipo -------------------------------------------------------------
+
+    def _build(self, records, build):
+        """Construye los objetos de un bloque; los registros con errores se descartan"""
+        objects = []
+        for line, record in records:
+            try:
+                obj = build(record)
+            except (KeyError, ValueError, TypeError) as e:
+                self.stats.skip(f'Línea {line}: {e}')
+                continue
+            if obj is not None:
+                objects.append(obj)
+        return objects
+
+    def _lookup(self, mapping, name, label):
+        """Busca un nombre en un diccionario de ids; lanza ValueError si no existe"""
+        name = _text(name)
+        if name is None:
+            return None
+        try:
+            return mapping[name]
+        except KeyError:
+            raise ValueError(f'{label} desconocida: {name}')
+
+    def _write_factions(self, records):
+        factions = self._build(records, lambda r: Faction(name=_required(r, 'name'), location=_text(r.get('location')) or ''))
+        # Las facciones tienen nombre único: las que ya existen no se vuelven a crear
+        new = {}
+        for faction in factions:
+            if faction.name not in self.factions:
+                new.setdefault(faction.name, faction)
+        created = Faction.objects.bulk_create(list(new.values()), batch_size=self.chunk_size)
+        self.factions.update((faction.name, faction.id) for faction in created)
+        self.stats.rows['faction'] += len(created)
+
+    def _write_weapons(self, records):
+        weapons = self._build(records, lambda r: Weapon(
+            name=_required(r, 'name'),
+            description=_text(r.get('description')) or Weapon._meta.get_field('description').default,
+            damage=_int(r.get('damage')) or 0,
+            critic=_int(r.get('critic')),
+            accuracy=_int(r.get('accuracy')),
+        ))
+        Weapon.fill_random_stats(weapons)
+        Weapon.objects.bulk_create(weapons, batch_size=self.chunk_size)
+        self.weapons.update((weapon.name, weapon.id) for weapon in weapons)
+        self.stats.rows['weapon'] += len(weapons)
+
+    def _write_armors(self, records):
+        armors = self._build(records, lambda r: Armor(
+            name=_required(r, 'name'),
+            description=_text(r.get('description')) or Armor._meta.get_field('description').default,
+            defense=_int(r.get('defense')) or 0,
+        ))
+        Armor.objects.bulk_create(armors, batch_size=self.chunk_size)
+        self.armors.update((armor.name, armor.id) for armor in armors)
+        self.stats.rows['armor'] += len(armors)
+
+    def _write_characters(self, records):
+        inventories = {}
+
+        def build(record):
+            character = Character(
+                name=_required(record, 'name'),
+                location=_text(record.get('location')) or '',
+                faction_id=self._lookup(self.factions, record.get('faction'), 'Facción'),
+                equipped_weapon_id=self._lookup(self.weapons, record.get('equipped_weapon'), 'Arma'),
+                equipped_armor_id=self._lookup(self.armors, record.get('equipped_armor'), 'Armadura'),
+            )
+            weapon_ids = {self._lookup(self.weapons, name, 'Arma') for name in _names(record.get('inventory_weapons'))}
+            armor_ids = {self._lookup(self.armors, name, 'Armadura') for name in _names(record.get('inventory_armors'))}
+            if weapon_ids or armor_ids:
+                inventories[id(character)] = (weapon_ids, armor_ids)
+            return character
+
+        characters = self._build(records, build)
+        Character.objects.bulk_create(characters, batch_size=self.chunk_size)
+        if self._characters is not None:
+            self._characters.update((character.name, character.id) for character in characters)
+        self.stats.rows['character'] += len(characters)
+
+        # Inventarios: una fila por personaje (como los creados desde la web) y las filas de
+        # los objetos en las tablas intermedias
+        created = Inventory.objects.bulk_create([Inventory(character_id=c.id) for c in characters], batch_size=self.chunk_size)
+        self.stats.rows['inventory'] += len(created)
+        weapon_rows, armor_rows = [], []
+        for character, inventory in zip(characters, created):
+            if id(character) not in inventories:
+                continue
+            weapon_ids, armor_ids = inventories[id(character)]
+            weapon_rows += [(inventory.id, weapon_id) for weapon_id in weapon_ids]
+            armor_rows += [(inventory.id, armor_id) for armor_id in armor_ids]
+        self._write_through(Inventory.weapons.through, 'inventory_id', 'weapon_id', weapon_rows)
+        self._write_through(Inventory.armors.through, 'inventory_id', 'armor_id', armor_rows)
+
+    def _write_through(self, through, source, target, rows):
+        """Escribe las filas de una tabla intermedia ManyToMany"""
+        if not rows:
+            return
+        if self.use_copy:
+            self._copy(through._meta.db_table, [source, target], rows)
+        else:
+            through.objects.bulk_create([through(**{source: s, target: t}) for s, t in rows], batch_size=self.chunk_size)
+        self.stats.rows[through._meta.model_name] += len(rows)
+
+    def _write_relationships(self, records):
+        valid_types = {value for value, _ in Relationship._meta.get_field('relationship_type').choices}
+
+        def build(record):
+            character1 = self._lookup(self.characters, record['character1'], 'Personaje')
+            character2 = self._lookup(self.characters, record['character2'], 'Personaje')
+            relationship_type = _text(record.get('relationship_type')) or 'neutral'
+            if character1 is None or character2 is None or character1 == character2:
+                raise ValueError('Relación sin dos personajes distintos')
+            if relationship_type not in valid_types:
+                raise ValueError(f'Tipo de relación desconocido: {relationship_type}')
+            return character1, character2, relationship_type
+
+        rows = list({(c1, c2): (c1, c2, t) for c1, c2, t in self._build(records, build)}.values())
+        if self.use_copy:
+            self._copy_ignoring_conflicts(Relationship._meta.db_table, ['character1_id', 'character2_id', 'relationship_type'], rows)
+        else:
+            Relationship.objects.bulk_create(
+                [Relationship(character1_id=c1, character2_id=c2, relationship_type=t) for c1, c2, t in rows],
+                batch_size=self.chunk_size, ignore_conflicts=True,
+            )
+        self.stats.rows['relationship'] += len(rows)
+
+    # -- COPY de PostgreSQL -----------------------------------------------------------------
+
+    def _copy(self, table, columns, rows):
+        """
+        Escribe filas con `COPY ... FROM STDIN` (formato de texto separado por tabuladores).
+        Funciona con psycopg2 (`copy_expert`) y con psycopg 3 (`copy`).
+        """
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        sql = f'COPY {connection.ops.quote_name(table)} ({", ".join(map(connection.ops.quote_name, columns))}) FROM STDIN'
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                raw.copy_expert(sql, buffer)
+            else:
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def _copy_ignoring_conflicts(self, table, columns, rows):
+        """
+        `COPY` a una tabla temporal y desde ella `INSERT ... ON CONFLICT DO NOTHING`, para no
+        fallar con filas que ya existen (por ejemplo relaciones repetidas).
+        """
+        temporary = f'{table}_import'
+        quoted_columns = ', '.join(map(connection.ops.quote_name, columns))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {temporary} ON COMMIT DROP AS '
+                f'SELECT {quoted_columns} FROM {connection.ops.quote_name(table)} WITH NO DATA'
+            )
+        self._copy(temporary, columns, rows)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {connection.ops.quote_name(table)} ({quoted_columns}) '
+                f'SELECT {quoted_columns} FROM {temporary} ON CONFLICT DO NOTHING'
+            )
+
+
+def _copy_value(value):
+    """Valor en el formato de texto de COPY: \\N para NULL y caracteres especiales escapados"""
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
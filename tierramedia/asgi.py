@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tierramedia.settings')
+# Antes de cargar la configuración: sin conexiones persistentes (ver tierramedia/database.py)
+os.environ.setdefault('SERVER_MODE', 'asgi')
 
 application = get_asgi_application()
@@ -13,6 +13,8 @@ import os
 from pathlib import Path
 import socket
 
+from tierramedia.database import databases_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,10 +23,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-#vzios5+-$aff*=#fnh+uf=b+_imwz)gmw3)owo1_beqeaor5*'
+SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-#vzios5+-$aff*=#fnh+uf=b+_imwz)gmw3)owo1_beqeaor5*')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# En producción (docker-compose.prod.yml) se desactiva con DEBUG=False
+DEBUG = os.environ.get('DEBUG', 'True').lower() in ('1', 'true', 'yes')
 
 ALLOWED_HOSTS = ['*', 'localhost', '127.0.0.1']
 
@@ -37,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Búsqueda de texto y por trigramas (ver juego/search.py)
     'juego.apps.JuegoConfig',
     'debug_toolbar',
     'django_json_widget',
@@ -45,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'juego.middleware.RequestMetricsMiddleware',  # Métricas de rendimiento por ruta (ver /metrics/)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,7 +64,7 @@ ROOT_URLCONF = 'tierramedia.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'juego.metrics.TimedDjangoTemplates',  # DjangoTemplates midiendo el tiempo de renderizado
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,27 +84,13 @@ WSGI_APPLICATION = 'tierramedia.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        # Especifica el backend de la base de datos que se utilizará. En este caso, estamos usando PostgreSQL.
-        "ENGINE": "django.db.backends.postgresql",  # Backend de PostgreSQL
-
-        # Nombre de la base de datos que se utilizará. En este caso, la base de datos se llama "django_db".
-        "NAME": "django_db",  # Nombre de la base de datos
-
-        # Usuario que se usará para conectarse a la base de datos.
-        "USER": "postgres",  # Usuario de la base de datos
+# La configuración sale de DATABASE_URL y de las variables DB_* (ver tierramedia/database.py):
+# conexiones persistentes comprobadas antes de usarlas, pool de psycopg opcional, tiempo máximo
+# por consulta y réplicas de lectura opcionales
+DATABASES = databases_from_env(os.environ, default_url='postgres://postgres:password@db:5432/django_db')
 
-        # Contraseña del usuario para acceder a la base de datos.
-        "PASSWORD": "password",  # Contraseña del usuario de la base de datos
-
-        # Dirección del servidor de la base de datos. Si estás usando Docker, el valor podría ser el nombre del servicio, como "db".
-        "HOST": "db",  # Dirección del host de la base de datos
-
-        # Puerto en el que se ejecuta la base de datos. El valor predeterminado de PostgreSQL es 5432.
-        "PORT": "5432",  # Puerto donde la base de datos escucha
-    }
-}
+# Con réplicas, las vistas de solo lectura leen de ellas (ver juego/routers.py)
+DATABASE_ROUTERS = ['juego.routers.ReadReplicaRouter']
 
 
 # Obtenemos el nombre del host (máquina local) y sus direcciones IP asociadas
@@ -148,6 +139,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Carpeta donde `collectstatic` reúne los ficheros estáticos para que los sirva nginx en producción
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -167,3 +161,55 @@ MEDIA_URL = '/media/'  # Ruta pública para acceder a los archivos de medios
 
 # Definir la ruta en el sistema de archivos donde los archivos de medios serán almacenados
 MEDIA_ROOT = os.path.join(BASE_DIR, 'juego/static/media')  # Ruta física donde se almacenan los archivos
+
+# Hilos que generan en segundo plano las versiones reducidas de las imágenes subidas (ver juego/images.py)
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', 2))
+
+# Almacén del estado de las batallas en curso (ver juego/battle_store.py)
+# Para compartir las batallas entre varios procesos se puede usar 'juego.battle_store.FileBattleStore'
+BATTLE_STORE = {
+    'BACKEND': os.environ.get('BATTLE_STORE_BACKEND', 'juego.battle_store.LocMemBattleStore'),
+    'OPTIONS': {
+        'timeout': 30 * 60,  # Las batallas sin actividad durante 30 minutos se descartan
+        'max_entries': 10000,
+    },
+}
+
+# Caché (versiones de las batallas y estadísticas, datos de referencia...): en memoria del proceso
+# por defecto. Con varios procesos (gunicorn) tiene que ser compartida para que las versiones de la
+# caché (ver juego/signals.py) lleguen a todos: CACHE_URL (redis://...) activa una caché en Redis
+# y CACHE_LOCATION una caché en ficheros
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tierramedia',
+    }
+}
+if os.environ.get('CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_URL'],
+    }
+elif os.environ.get('CACHE_LOCATION'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_LOCATION'],
+    }
+
+# Configuración de Django REST Framework: todas las listas de los ViewSets se paginan por cursor (ver juego/pagination.py)
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'juego.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
+    # Los mismos renderers que por defecto, midiendo el tiempo de serialización (ver juego/metrics.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'juego.metrics.TimedJSONRenderer',
+        'juego.metrics.TimedBrowsableAPIRenderer',
+    ],
+}
+
+# Directorio compartido por los workers de gunicorn en el que cada proceso guarda sus métricas para
+# que `/metrics/` devuelva la suma de todos (ver juego/metrics.py). Sin él, cada proceso las suyas
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+
+# Las peticiones más lentas que esto (en segundos) se registran con sus consultas en el logger 'juego.metrics'
+SLOW_REQUEST_SECONDS = 0.5